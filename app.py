@@ -1,17 +1,23 @@
 import os
 import json
-import shutil
-import hashlib
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 import streamlit as st
 
-from langchain_core.documents import Document
-from rag_engine.loader import load_codebase
-from rag_engine.chunker import chunk_repo_texts, suggest_chunk_config, preview_chunks
-from rag_engine.vector_store import store_in_chroma, load_chroma
-from rag_engine.query_engine import get_llm_chain
-from rag_engine.utils import clone_github_repo, load_webpage_as_document
+from rag_engine.loader import load_codebase, iter_codebase
+from rag_engine.chunker import chunk_repo_texts, iter_chunks, suggest_chunk_config, chunk_config_key, preview_chunks, compare_chunkers
+from rag_engine.vector_store import sync_chroma, load_chroma, load_retriever, store_version
+from rag_engine.query_engine import get_llm_chain, load_llm
+from rag_engine.summarizer import build_summary_tree, load_summary_tree, summary_version, SUMMARY_FILE
+from rag_engine.utils import clone_github_repo, load_webpage_as_document, directory_size, make_db_name
+from rag_engine.crawler import crawl_site, DEFAULT_MAX_DEPTH, DEFAULT_MAX_PAGES
+from rag_engine.resource_pool import get_resource_pool
+from rag_engine.embedding_cache import get_embedding_cache
+from rag_engine.answer_cache import get_answer_cache
+from rag_engine.dedup import cited_sources
+from rag_engine import metrics
+from rag_engine import store_manager
 
 # ───────────────────────────────────────────────
 load_dotenv()
@@ -25,24 +31,59 @@ def is_render():
         or "onrender.com" in os.environ.get("RENDER_EXTERNAL_HOSTNAME", "")
     )
 
-def extract_answer(response):
-    if isinstance(response, str):
-        return response
-    if hasattr(response, "content"):
-        return response.content
-    if isinstance(response, dict):
-        if "content" in response:
-            return response["content"]
-        if "answer" in response:
-            return response["answer"]
-    return str(response)
-
-def make_db_name(source, chunk_size, chunk_overlap):
-    hash_part = hashlib.md5(source.encode()).hexdigest()[:8]
-    return f"{hash_part}_c{chunk_size}_o{chunk_overlap}"
+def show_trace(title, trace):
+    """
+    Renders one metrics trace: time per stage (plus unattributed time) and counters.
+    """
+    stages = trace["stages"]
+    attributed = sum(stage["seconds"] for stage in stages.values())
+    rows = [{"stage": name, "seconds": stage["seconds"], "calls": stage["calls"]}
+            for name, stage in sorted(stages.items(), key=lambda item: -item[1]["seconds"])]
+    rows.append({"stage": "other", "seconds": round(max(0.0, trace["seconds"] - attributed), 4), "calls": ""})
+    st.markdown(f"**{title}** — {trace['seconds']:.2f}s total")
+    st.table(rows)
+    if trace["counters"]:
+        st.json(trace["counters"], expanded=False)
+
+def show_store_manager(current_store=None):
+    """
+    Sidebar panel listing the vector stores on disk, with inspect, delete and
+    prune-to-quota actions. The store in use by this session is never offered
+    for deletion.
+    """
+    with st.sidebar.expander("🗄️ Vector stores"):
+        stores = store_manager.list_stores()
+        usage = store_manager.usage()
+        quota = f" of {usage['quota_bytes'] / 1e6:.0f} MB quota" if usage["quota_bytes"] else ""
+        st.caption(f"{usage['stores']} stores, {usage['size_bytes'] / 1e6:.1f} MB{quota}")
+        if not stores:
+            return
+        st.dataframe([{
+            "store": s["name"],
+            "source": s["source"] or "?",
+            "backend": s["backend"],
+            "chunks": s["chunks"],
+            "MB": round(s["size_bytes"] / 1e6, 1),
+            "last used": time.strftime("%Y-%m-%d %H:%M", time.localtime(s["last_access"])),
+        } for s in stores], hide_index=True)
+        names = {s["name"]: s["path"] for s in stores}
+        inspected = st.selectbox("🔍 Inspect", [""] + list(names), key="store_inspect_select")
+        if inspected:
+            st.json(store_manager.inspect_store(names[inspected]), expanded=False)
+        current = os.path.abspath(current_store) if current_store else None
+        deletable = [name for name, path in names.items() if os.path.abspath(path) != current]
+        to_delete = st.multiselect("🗑️ Stores to delete", deletable, key="store_delete_select")
+        if to_delete and st.button("🗑️ Delete selected", key="store_delete_button"):
+            freed = sum(store_manager.delete_store(names[name]) for name in to_delete)
+            st.success(f"✅ Deleted {len(to_delete)} stores ({freed / 1e6:.1f} MB freed)")
+        if usage["quota_bytes"] and st.button("🧹 Prune to quota", key="store_prune_button"):
+            pruned = store_manager.prune(keep=[current_store] if current_store else ())
+            st.success(f"✅ Removed {len(pruned)} least recently used stores")
 
 docker_mode = is_docker()
 render_mode = is_render()
+pool = get_resource_pool()
+metrics_server = metrics.start_metrics_server()
 
 # --- Remove Ollama/LLM state in cloud (session safety) ---
 if render_mode:
@@ -54,6 +95,8 @@ if "history" not in st.session_state:
     st.session_state.history = []
 if "last_github_url" not in st.session_state:
     st.session_state.last_github_url = None
+if "traces" not in st.session_state:
+    st.session_state.traces = {}
 
 st.set_page_config(page_title="DevHelper AI 🤖", layout="wide")
 st.title("🧠 DevHelper AI - Chat with Your Codebase")
@@ -65,6 +108,14 @@ source_option = st.radio(
     key="source_option"
 )
 path_input, docs = "", []
+web_refreshed = False
+current_store = None
+
+exclude_dirs = st.text_area(
+    "🚫 Folders to exclude (comma-separated)", 
+    ".venv, node_modules, __pycache__", 
+    key="exclude_dirs_textarea"
+).split(",")
 
 if source_option == "📁 Local Folder":
     use_mounted = st.checkbox("📦 Use mounted Docker volume (`/mounted`)", value=docker_mode, key="mounted_checkbox")
@@ -84,15 +135,16 @@ if source_option == "📁 Local Folder":
 elif source_option == "🌐 GitHub Repo":
     github_url = st.text_input("🌐 Enter GitHub repo URL:", key="gh_url_input")
     force_reindex = st.checkbox("🔁 Force re-index this repo", value=False, key="force_reindex_checkbox")
+    sync_changes = st.checkbox("🔄 Sync changed files only", value=False, key="sync_checkbox")
     repo_changed = github_url != st.session_state.last_github_url
-    should_reclone = force_reindex or not os.path.exists("cloned_repo") or repo_changed
+    should_reclone = force_reindex or sync_changes or not os.path.exists("cloned_repo") or repo_changed
     if github_url:
         if should_reclone:
-            if os.path.exists("cloned_repo"):
-                shutil.rmtree("cloned_repo")
             try:
+                # Skips the download when cloned_repo already holds the latest commit
                 with st.spinner("🔄 Cloning GitHub repo..."):
-                    path_input = clone_github_repo(github_url, dest_folder="cloned_repo")
+                    path_input = clone_github_repo(github_url, dest_folder="cloned_repo", exclude_dirs=exclude_dirs,
+                                                   refresh=force_reindex or sync_changes)
                 st.session_state.last_github_url = github_url
                 st.success("✅ Repo cloned successfully.")
             except Exception as e:
@@ -103,17 +155,30 @@ elif source_option == "🌐 GitHub Repo":
 
 elif source_option == "🔗 Website":
     url = st.text_input("🔗 Enter website URL:", key="web_url_input")
+    crawl = st.checkbox("🕸️ Crawl linked pages on the same site", value=False, key="crawl_checkbox")
+    crawl_depth, max_pages = 0, 1
+    if crawl:
+        crawl_depth = st.slider("🔗 Link depth", 1, 5, DEFAULT_MAX_DEPTH, key="crawl_depth_slider")
+        max_pages = st.slider("📄 Max pages", 5, 500, DEFAULT_MAX_PAGES, 5, key="crawl_pages_slider")
+    recrawl = st.button("🔄 Fetch again", key="recrawl_button")
     if url:
-        with st.spinner("🌐 Scraping website..."):
-            doc = load_webpage_as_document(url)
-            docs = [doc]
-            path_input = "web_loaded"
-
-exclude_dirs = st.text_area(
-    "🚫 Folders to exclude (comma-separated)", 
-    ".venv, node_modules, __pycache__", 
-    key="exclude_dirs_textarea"
-).split(",")
+        # Pages are fetched once per (url, depth, pages) per session, not on every rerun
+        web_key = (url.strip(), crawl_depth, max_pages)
+        if recrawl or st.session_state.get("web_key") != web_key:
+            with st.spinner("🌐 Crawling website..." if crawl else "🌐 Scraping website..."):
+                if crawl:
+                    web_docs, crawl_stats = crawl_site(url.strip(), max_depth=crawl_depth, max_pages=max_pages,
+                                                       return_stats=True)
+                    st.caption(
+                        f"🕸️ {crawl_stats['pages']} pages: {crawl_stats['fetched']} downloaded, "
+                        f"{crawl_stats['not_modified']} unchanged, {crawl_stats['failed']} failed"
+                    )
+                else:
+                    web_docs = [load_webpage_as_document(url.strip())]
+            st.session_state.web_key, st.session_state.web_docs = web_key, web_docs
+            web_refreshed = True
+        docs = st.session_state.web_docs
+        path_input = "web_loaded"
 
 # --- LLM Engine Selection ---
 if render_mode:
@@ -135,12 +200,17 @@ smart_mode = st.checkbox("🧠 Auto-Tune Chunk Size", value=True, key="autotune_
 chunk_size, chunk_overlap = 800, 100
 
 if smart_mode and path_input and os.path.isdir(path_input):
-    suggested_size, suggested_overlap = suggest_chunk_config(path_input)
+    suggested_size, suggested_overlap = pool.get_or_create(
+        ("chunk_config", os.path.abspath(path_input), chunk_config_key(path_input)),
+        lambda: suggest_chunk_config(path_input)
+    )
     st.success(f"✨ Auto-Tune: {suggested_size} chunks | {suggested_overlap} overlap")
     chunk_size, chunk_overlap = suggested_size, suggested_overlap
 else:
     chunk_size = st.slider("🧩 Chunk Size", 100, 2000, chunk_size, 100, key="chunk_slider")
     chunk_overlap = st.slider("🔁 Chunk Overlap", 0, 500, chunk_overlap, 50, key="overlap_slider")
+syntax_mode = st.checkbox("🧬 Syntax-aware chunking (functions/classes/sections)", value=False, key="syntax_checkbox")
+chunk_mode = "syntax" if syntax_mode else "text"
 
 # --- MAIN LOGIC ---
 if path_input and (os.path.isdir(path_input) or path_input == "web_loaded"):
@@ -151,56 +221,212 @@ if path_input and (os.path.isdir(path_input) or path_input == "web_loaded"):
             source_key = url.strip()
         else:
             source_key = path_input.strip()
-        db_name = make_db_name(source_key, chunk_size, chunk_overlap)
+        db_name = make_db_name(source_key, chunk_size, chunk_overlap, chunk_mode)
         chroma_path = os.path.join("chroma_store", db_name)
+        current_store = chroma_path
 
-        force_reindex_other = False
+        force_reindex_other, sync_other = False, False
         if source_option != "🌐 GitHub Repo":
             force_reindex_other = st.checkbox("🔁 Force re-index this repo", value=False, key="force_reindex_other")
+            sync_other = st.checkbox("🔄 Sync changed files only", value=False, key="sync_other")
+        summarize = st.checkbox("📝 Precompute repo summary (LLM calls at index time)", value=False, key="summary_checkbox")
 
         with st.spinner("⚙️ Processing project..."):
             do_reindex = force_reindex if source_option == "🌐 GitHub Repo" else force_reindex_other
+            do_sync = sync_changes if source_option == "🌐 GitHub Repo" else sync_other
+            # Freshly fetched pages are synced in: only new or changed pages get embedded
+            do_sync = do_sync or web_refreshed
+            chunks = None
+            built_now = False
 
             # Pass embedding_engine to store/load functions
-            if os.path.exists(chroma_path) and not do_reindex:
-                vectordb = load_chroma(chroma_path, embedding_engine=embedding_engine)
+            store_key = ("store", chroma_path, embedding_engine)
+            if os.path.exists(chroma_path) and not (do_reindex or do_sync):
+                vectordb = pool.get_or_create(
+                    store_key,
+                    lambda: load_chroma(chroma_path, embedding_engine=embedding_engine),
+                    size=lambda _: directory_size(chroma_path)
+                )
+                store_manager.touch(chroma_path)
                 st.success("✅ Loaded existing vector DB")
-                chunks = None
             else:
+                is_new = not os.path.exists(chroma_path)
+                built_now = True
+                embedding_cache = get_embedding_cache()
+                cache_before = embedding_cache.stats()
                 if not docs:
-                    docs = load_codebase(path_input, exclude_dirs=exclude_dirs)
-                chunks = chunk_repo_texts(docs, chunk_size=chunk_size, overlap=chunk_overlap)
-                chunks = [
-                    doc if isinstance(doc, Document) else
-                    Document(page_content=doc.get("page_content", ""), metadata=doc.get("metadata", {}))
-                    for doc in chunks
-                ]
-                vectordb = store_in_chroma(chunks, persist_path=chroma_path, embedding_engine=embedding_engine)
-                st.success("✅ New vector store created")
+                    docs = iter_codebase(path_input, exclude_dirs=exclude_dirs)
+                progress_text = st.empty()
+                with metrics.trace("index") as index_trace:
+                    vectordb, delta = sync_chroma(
+                        docs,
+                        persist_path=chroma_path,
+                        embedding_engine=embedding_engine,
+                        chunker=lambda batch: iter_chunks(batch, chunk_size=chunk_size, overlap=chunk_overlap, mode=chunk_mode),
+                        reset=do_reindex,
+                        progress=lambda p: progress_text.caption(
+                            f"⏳ Indexed {p['files']} files | {p['chunks']} chunks embedded"
+                        )
+                    )
+                st.session_state.traces["index"] = index_trace.as_dict()
+                progress_text.empty()
+                # Compacts the store if the sync left free space, then enforces STORE_QUOTA_MB
+                _, pruned = store_manager.record_build(
+                    chroma_path, source=source_key, engine=embedding_engine,
+                    chunk_size=chunk_size, chunk_overlap=chunk_overlap, mode=chunk_mode
+                )
+                pool.put(store_key, vectordb, directory_size(chroma_path))
+                if is_new or do_reindex:
+                    st.success(f"✅ New vector store created ({delta['chunks_written']} chunks)")
+                else:
+                    st.success(
+                        f"✅ Synced: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+                        f"{len(delta['removed'])} removed files | "
+                        f"{delta['chunks_written']} chunks written, {delta['chunks_deleted']} deleted"
+                    )
+                if delta["failed"]:
+                    st.warning(
+                        f"⚠️ Embedding failed for {len(delta['failed'])} files after retries; "
+                        "they are retried on the next sync"
+                    )
+                skipped = delta["duplicates"] + delta["near_duplicates"]
+                if skipped:
+                    st.caption(
+                        f"♻️ Deduplication: {skipped} chunks not embedded ({delta['duplicates']} exact, "
+                        f"{delta['near_duplicates']} near duplicates, {delta['bytes_saved'] / 1e3:.1f} KB)"
+                    )
+                if pruned:
+                    st.caption(
+                        f"🧹 Disk quota: removed {len(pruned)} least recently used stores "
+                        f"({sum(p['size_bytes'] for p in pruned) / 1e6:.1f} MB)"
+                    )
+                cache_after = embedding_cache.stats()
+                hits = cache_after["hits"] - cache_before["hits"]
+                misses = cache_after["misses"] - cache_before["misses"]
+                st.caption(
+                    f"🗃️ Embedding cache: {hits} hits / {misses} misses "
+                    f"({hits / max(hits + misses, 1):.0%} reused)"
+                )
 
             engine_to_use = "openai" if render_mode else llm_engine
-            qa_chain = get_llm_chain(
-                vectordb,
-                engine=engine_to_use
+            summary_path = os.path.join(chroma_path, SUMMARY_FILE)
+            if summarize and (built_now or not os.path.exists(summary_path)):
+                if not isinstance(docs, list) or not docs:
+                    docs = iter_codebase(path_input, exclude_dirs=exclude_dirs, verbose=0)
+                summary_text = st.empty()
+                with metrics.trace("summary") as summary_trace:
+                    _, summary_stats = build_summary_tree(
+                        docs,
+                        load_llm(engine_to_use, model=os.getenv("SUMMARY_LLM_MODEL")),
+                        chroma_path,
+                        progress=lambda p: summary_text.caption(f"📝 Summarized {p['files']}/{p['total']} files")
+                    )
+                st.session_state.traces["summary"] = summary_trace.as_dict()
+                summary_text.empty()
+                st.caption(
+                    f"📝 Repo summary: {summary_stats['files_summarized']} files summarized, "
+                    f"{summary_stats['files_reused']} reused"
+                )
+
+            # An existing summary tree is used whether or not it was just (re)built
+            tree_version = summary_version(chroma_path)
+            version = f"{store_version(chroma_path)}+{tree_version}" if tree_version else store_version(chroma_path)
+            qa_chain = pool.get_or_create(
+                ("chain", chroma_path, embedding_engine, engine_to_use, version),
+                lambda: get_llm_chain(
+                    vectordb,
+                    engine=engine_to_use,
+                    retriever=load_retriever(vectordb, chroma_path),
+                    db_name=db_name,
+                    store_version=version,
+                    summary_tree=load_summary_tree(chroma_path) if tree_version else None
+                ),
+                depends_on=[store_key]
             )
 
-        if st.checkbox("📜 Preview Chunked Content", key="preview_checkbox"):
-            if 'chunks' not in locals() or chunks is None:
+        # Federated query: answer from other indexed sources too (e.g. client library, docs site)
+        other_stores = {s["path"]: s for s in store_manager.list_stores()
+                        if os.path.abspath(s["path"]) != os.path.abspath(chroma_path)}
+        federated = st.multiselect(
+            "🔀 Also search these indexed sources", list(other_stores),
+            format_func=lambda p: f"{other_stores[p]['source'] or other_stores[p]['name']} ({other_stores[p]['name']})",
+            key="federated_multiselect"
+        ) if other_stores else []
+        if federated:
+            from rag_engine.federated import load_federated_retriever, federation_key, store_key as federated_store_key
+            store_paths = [chroma_path] + federated
+            federation_name, federation_version = federation_key(store_paths)
+            for path in federated:
+                store_manager.touch(path)
+            qa_chain = pool.get_or_create(
+                ("chain", chroma_path, "federated", tuple(federated), engine_to_use, federation_version),
+                lambda: get_llm_chain(
+                    vectordb,
+                    engine=engine_to_use,
+                    retriever=load_federated_retriever(store_paths),
+                    db_name=federation_name,
+                    store_version=federation_version
+                ),
+                depends_on=[store_key] + [federated_store_key(path) for path in federated]
+            )
+            st.caption(f"🔀 Answering from {len(store_paths)} sources in parallel")
+
+        preview = st.checkbox("📜 Preview Chunked Content", key="preview_checkbox")
+        compare = st.checkbox("📊 Compare text vs syntax-aware chunking", key="compare_checkbox")
+        if preview or compare:
+            # docs may be an already-consumed stream from indexing
+            if not isinstance(docs, list) or not docs:
                 docs = load_codebase(path_input, exclude_dirs=exclude_dirs)
-                chunks = chunk_repo_texts(docs, chunk_size=chunk_size, overlap=chunk_overlap)
+        if preview:
+            if 'chunks' not in locals() or chunks is None:
+                chunks = chunk_repo_texts(docs, chunk_size=chunk_size, overlap=chunk_overlap, mode=chunk_mode)
             preview_chunks(chunks)
+        if compare:
+            st.table(compare_chunkers(docs, chunk_size=chunk_size, overlap=chunk_overlap))
 
         query = st.text_input("💬 Ask something about the codebase or page:", key="query_input")
         if query:
-            with st.spinner("🔍 Thinking..."):
+            cached, context_report = None, None
+            with metrics.trace("query") as query_trace:
                 try:
-                    response = qa_chain.invoke({"query": query})
-                    answer = extract_answer(response)
+                    with st.spinner("🔍 Thinking..."):
+                        stream = qa_chain.stream({"query": query})
+                    cached, context_report = stream.cached, stream.context_report
+                    if stream.source_documents:
+                        with st.expander(f"📄 Sources ({len(stream.source_documents)})"):
+                            for doc in stream.source_documents:
+                                source, *copies = cited_sources(doc)
+                                store = f"[{doc.metadata['store']}] " if "store" in doc.metadata else ""
+                                st.caption(store + (source or "Unknown") + (f" (also in: {', '.join(copies)})" if copies else ""))
+                    st.markdown("**🧠 Answer:**")
+                    answer = st.write_stream(stream)
+                    if not isinstance(answer, str):
+                        answer = stream.text or ""
                 except Exception as e:
                     answer = f"❌ Error: {e}"
-                st.markdown("**🧠 Answer:**")
-                st.write(answer)
-                st.session_state.history.append({"q": query, "a": answer})
+                    st.write(answer)
+            st.session_state.traces["query"] = query_trace.as_dict()
+            if cached:
+                answer_stats = get_answer_cache().stats()
+                st.caption(
+                    f"⚡ Cached answer ({cached} match) | cache hit rate: {answer_stats['hit_rate']:.0%}"
+                )
+            if context_report:
+                st.caption(
+                    f"🧮 Context: {context_report['tokens_out']} tokens from {context_report['chunks_out']} chunks "
+                    f"(saved {context_report['tokens_saved']} tokens, {context_report['duplicates']} duplicates dropped)"
+                )
+            st.session_state.history.append({"q": query, "a": answer})
+
+        if st.session_state.traces and st.checkbox("🩺 Show pipeline diagnostics", key="diagnostics_checkbox"):
+            with st.expander("🩺 Diagnostics", expanded=True):
+                for kind, title in (("index", "Last index build"), ("summary", "Last summary build"),
+                                    ("query", "Last question")):
+                    if kind in st.session_state.traces:
+                        show_trace(title, st.session_state.traces[kind])
+                if metrics_server is not None:
+                    host, port = metrics_server.server_address[:2]
+                    st.caption(f"Prometheus metrics: {host}:{port}/metrics")
 
         if st.session_state.history:
             hist_json = json.dumps(st.session_state.history, indent=2)
@@ -215,3 +441,5 @@ if path_input and (os.path.isdir(path_input) or path_input == "web_loaded"):
         st.error(f"❌ Error: {e}")
 else:
     st.info("👈 Please enter a valid folder, GitHub repo, or website.")
+
+show_store_manager(current_store)
@@ -0,0 +1,59 @@
+import os
+import time
+import hashlib
+import numpy as np
+from langchain_core.language_models.fake import FakeListLLM
+from rag_engine.embeddings import ParallelEmbeddings
+from rag_engine.embedding_cache import CachedEmbeddings, EmbeddingCache
+from rag_engine.resource_pool import get_resource_pool
+
+# Engine name the benchmark passes to rag_engine; its pool slots hold the fakes.
+ENGINE = "openai"
+
+class FakeEmbeddingClient:
+    """
+    Offline stand-in for OpenAIEmbeddingClient: the same text always maps to
+    the same unit vector. latency_ms simulates one HTTP round trip per batch.
+    """
+
+    def __init__(self, dim=256, latency_ms=0.0):
+        self.model = f"fake-{dim}"
+        self.dim = dim
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode("utf-8", errors="replace")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim)
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+class SlowFakeLLM(FakeListLLM):
+    latency_ms: float = 0.0
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return super()._call(prompt, stop=stop, run_manager=run_manager, **kwargs)
+
+def install_fake_backends(workdir, dim=256, embed_latency_ms=0.0, llm_latency_ms=0.0):
+    """
+    Puts deterministic embedding and LLM backends into the resource pool
+    under the keys vector_store and query_engine look up, so the real
+    pipeline code runs unchanged without network access. The embedding
+    executor (batching, thread pool) and the on-disk embedding cache are the
+    real ones. Returns the fake embedding client (for call counts).
+    """
+    client = FakeEmbeddingClient(dim=dim, latency_ms=embed_latency_ms)
+    cache = EmbeddingCache(os.path.join(workdir, "embedding_cache.sqlite"))
+    embedding = CachedEmbeddings(ParallelEmbeddings(client), namespace=f"{ENGINE}:{client.model}", cache=cache)
+    llm = SlowFakeLLM(responses=["This is a benchmark answer."], latency_ms=llm_latency_ms)
+    pool = get_resource_pool()
+    pool.put(("embedding", ENGINE, None, True), embedding)
+    pool.put(("llm", ENGINE), llm)
+    return client
@@ -0,0 +1,123 @@
+"""
+Startup-time budget: how long importing what app.py / the CLI import takes.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 500 --repeat 7
+
+Each measurement is a fresh interpreter. Fails (exit code 1) when the median
+import time of a target exceeds the budget, or when a heavy dependency that
+should only load on first use (Chroma, text splitters, bs4, LLM clients...)
+is imported at startup.
+"""
+import os
+import ast
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "750"))
+DEFAULT_REPEAT = 5
+
+# Loaded on first use of the feature that needs them, never at import time
+HEAVY_MODULES = (
+    "langchain_chroma", "chromadb", "langchain_text_splitters", "langchain_core.retrievers",
+    "langchain_core.prompts", "langchain_openai", "langchain_ollama", "bs4", "tiktoken", "streamlit",
+)
+
+def app_modules(path=os.path.join(REPO_ROOT, "app.py")):
+    """
+    The rag_engine modules app.py imports at top level.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("rag_engine"):
+            names = [f"{node.module}.{a.name}" for a in node.names] if node.module == "rag_engine" else [node.module]
+            modules.extend(names)
+        elif isinstance(node, ast.Import):
+            modules.extend(a.name for a in node.names if a.name.startswith("rag_engine"))
+    return list(dict.fromkeys(modules))
+
+def targets():
+    return {"app": app_modules(), "cli": ["rag_engine.cli"]}
+
+_PROBE = """
+import sys, json, time
+started = time.perf_counter()
+{imports}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _slowest(importtime_log, top=5):
+    """
+    Top-level imports by cumulative time, from python -X importtime output.
+    """
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("   "):  # nested import
+            continue
+        rows.append((int(cumulative), name.strip()))
+    return [{"module": name, "ms": round(us / 1000, 1)} for us, name in sorted(rows, reverse=True)[:top]]
+
+def measure(modules, repeat=DEFAULT_REPEAT):
+    """
+    Imports modules in repeat fresh interpreters (after one warm-up run that
+    writes bytecode caches). Returns the median time and what got loaded.
+    """
+    code = _PROBE.format(imports="\n".join(f"import {m}" for m in modules), heavy=HEAVY_MODULES)
+    cmd = [sys.executable, "-X", "importtime", "-c", code]
+    runs = []
+    for _ in range(repeat + 1):
+        proc = subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=REPO_ROOT)
+        runs.append((json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr))
+    runs = runs[1:]
+    seconds = [run["seconds"] for run, _ in runs]
+    median_run = sorted(runs, key=lambda r: r[0]["seconds"])[len(runs) // 2]
+    return {
+        "modules": modules,
+        "median_ms": round(statistics.median(seconds) * 1000, 1),
+        "max_ms": round(max(seconds) * 1000, 1),
+        "heavy": runs[0][0]["heavy"],
+        "slowest": _slowest(median_run[1]),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check import time of the app and CLI against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="max median import time per target (default: IMPORT_BUDGET_MS or 750)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    failed = False
+    report = {"budget_ms": args.budget_ms, "targets": {}}
+    for name, modules in targets().items():
+        result = measure(modules, repeat=max(1, args.repeat))
+        report["targets"][name] = result
+        over = result["median_ms"] > args.budget_ms
+        status = "❌" if over or result["heavy"] else "✅"
+        print(f"{status} {name}: {result['median_ms']} ms median (budget {args.budget_ms:g} ms)", file=sys.stderr)
+        if result["heavy"]:
+            print(f"   heavy modules imported at startup: {', '.join(result['heavy'])}", file=sys.stderr)
+        if over or result["heavy"]:
+            for row in result["slowest"]:
+                print(f"   {row['ms']:>8} ms  {row['module']}", file=sys.stderr)
+        failed = failed or over or bool(result["heavy"])
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Offline benchmark of the indexing and query pipeline on synthetic repos.
+
+    python -m benchmarks.pipeline --sizes 1000,10000,100000 --output head.json
+    python -m benchmarks.pipeline --compare base.json head.json
+
+Each repo size runs in a fresh subprocess so peak RSS is per size.
+Embeddings and the LLM are deterministic fakes (see benchmarks.fakes).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_QUERIES = 40
+CHUNK_SIZE, CHUNK_OVERLAP = 600, 50
+EXCLUDE_DIRS = [".venv", "node_modules", "__pycache__"]
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NATURAL_QUERIES = (
+    "how are payments validated", "where is the invoice total computed", "what does the report module export",
+    "how is the session cache configured", "which function updates customer stock", "how are retries configured",
+    "where are audit events written", "what handles shipment batches",
+)
+
+# Metric -> True if higher is better (used by --compare)
+METRICS = {
+    "load_files_per_sec": True, "chunk_chunks_per_sec": True, "store_chunks_per_sec": True,
+    "index_seconds": False, "peak_rss_mb": False, "store_mb": False,
+    "retrieval_p50_ms": False, "retrieval_p95_ms": False, "query_p50_ms": False, "query_p95_ms": False,
+}
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    pos = (len(values) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=REPO_ROOT).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_size(n_files, workdir, queries=DEFAULT_QUERIES, embed_latency_ms=0.0, llm_latency_ms=0.0, seed=0,
+             backend="chroma"):
+    """
+    Generates one repo and runs load -> chunk -> store -> retrieve -> answer.
+    """
+    from benchmarks.fakes import ENGINE, install_fake_backends
+    from benchmarks.synthetic_repo import generate_repo
+    from rag_engine.loader import load_codebase
+    from rag_engine.chunker import chunk_repo_texts
+    from rag_engine.vector_store import store_in_chroma, load_retriever
+    from rag_engine.query_engine import get_llm_chain
+    from rag_engine.utils import directory_size
+
+    repo_path, store_path = os.path.join(workdir, "repo"), os.path.join(workdir, "store")
+    repo = generate_repo(repo_path, n_files, seed=seed)
+    client = install_fake_backends(workdir, embed_latency_ms=embed_latency_ms, llm_latency_ms=llm_latency_ms)
+    result = {"files": n_files, "repo_mb": round(repo["bytes"] / 1e6, 2)}
+
+    started = time.perf_counter()
+    docs, load_stats = load_codebase(repo_path, exclude_dirs=EXCLUDE_DIRS, verbose=0, return_stats=True)
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    chunks = chunk_repo_texts(docs, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+    chunk_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectordb = store_in_chroma(chunks, persist_path=store_path, embedding_engine=ENGINE, backend=backend)
+    store_seconds = time.perf_counter() - started
+
+    result.update({
+        "files_loaded": load_stats["files_loaded"],
+        "chunks": len(chunks),
+        "load_seconds": round(load_seconds, 3),
+        "chunk_seconds": round(chunk_seconds, 3),
+        "store_seconds": round(store_seconds, 3),
+        "index_seconds": round(load_seconds + chunk_seconds + store_seconds, 3),
+        "load_files_per_sec": round(load_stats["files_seen"] / load_seconds, 1) if load_seconds else 0.0,
+        "chunk_chunks_per_sec": round(len(chunks) / chunk_seconds, 1) if chunk_seconds else 0.0,
+        "store_chunks_per_sec": round(len(chunks) / store_seconds, 1) if store_seconds else 0.0,
+        "embedding_calls": client.calls,
+        "store_mb": round(directory_size(store_path) / 1e6, 2),
+    })
+    del docs, chunks
+
+    # Alternate identifier lookups (symbol index path) with natural-language questions (hybrid path)
+    symbols = repo["symbols"]
+    questions = [
+        f"where is `{symbols[(i * 7919) % len(symbols)]}` defined" if i % 2 == 0 and symbols
+        else NATURAL_QUERIES[i % len(NATURAL_QUERIES)] + f" ({i})"
+        for i in range(queries)
+    ]
+    retriever = load_retriever(vectordb, store_path)
+    retrieval_ms = []
+    for question in questions:
+        started = time.perf_counter()
+        retriever.invoke(question)
+        retrieval_ms.append((time.perf_counter() - started) * 1000)
+
+    chain = get_llm_chain(vectordb, engine=ENGINE, retriever=retriever)
+    query_ms = []
+    for question in questions:
+        started = time.perf_counter()
+        chain.invoke({"query": question})
+        query_ms.append((time.perf_counter() - started) * 1000)
+
+    result.update({
+        "queries": len(questions),
+        "retrieval_p50_ms": round(percentile(retrieval_ms, 0.5), 2),
+        "retrieval_p95_ms": round(percentile(retrieval_ms, 0.95), 2),
+        "query_p50_ms": round(percentile(query_ms, 0.5), 2),
+        "query_p95_ms": round(percentile(query_ms, 0.95), 2),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    })
+    return result
+
+def _run_subprocess(n_files, queries, embed_latency_ms, llm_latency_ms, keep, backend="chroma"):
+    workdir = tempfile.mkdtemp(prefix=f"devhelper_bench_{n_files}_")
+    try:
+        cmd = [sys.executable, "-m", "benchmarks.pipeline", "--single", str(n_files), "--workdir", workdir,
+               "--queries", str(queries), "--embed-latency-ms", str(embed_latency_ms),
+               "--llm-latency-ms", str(llm_latency_ms), "--backend", backend]
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=REPO_ROOT).stdout
+        return json.loads(out.strip().splitlines()[-1])
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def run_all(sizes, queries, embed_latency_ms, llm_latency_ms, repeat=1, keep=False, backend="chroma"):
+    """
+    Runs every size repeat times; each reported metric is the median run.
+    """
+    results = []
+    for n_files in sizes:
+        print(f"⏱️ Benchmarking {n_files} files...", file=sys.stderr)
+        runs = [_run_subprocess(n_files, queries, embed_latency_ms, llm_latency_ms, keep, backend)
+                for _ in range(repeat)]
+        result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        result["runs"] = repeat
+        print(f"✅ {n_files} files: {result['index_seconds']}s to index, "
+              f"query p50 {result['query_p50_ms']} ms", file=sys.stderr)
+        results.append(result)
+    return {
+        "commit": _git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "queries": queries, "repeat": repeat,
+                     "embed_latency_ms": embed_latency_ms, "llm_latency_ms": llm_latency_ms,
+                     "backend": backend},
+        "results": results,
+    }
+
+def compare(base, head, threshold=0.1):
+    """
+    Prints per-size metric changes between two result files.
+    Returns the list of (files, metric, change) regressions beyond threshold.
+    """
+    base_by_size = {r["files"]: r for r in base["results"]}
+    regressions = []
+    print(f"base {base.get('commit')} -> head {head.get('commit')}")
+    for row in head["results"]:
+        old = base_by_size.get(row["files"])
+        if not old:
+            continue
+        print(f"\n{row['files']} files")
+        for metric, higher_is_better in METRICS.items():
+            if metric not in row or not old.get(metric):
+                continue
+            change = (row[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            flag = " ⚠️" if worse > threshold else ""
+            print(f"  {metric:<22} {old[metric]:>12} -> {row[metric]:>12}  {change:+.1%}{flag}")
+            if worse > threshold:
+                regressions.append((row["files"], metric, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ingest/query benchmark on synthetic repos.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated repo sizes in files")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="simulated latency per embedding batch")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated latency per LLM call")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per size; metrics are medians")
+    parser.add_argument("--backend", choices=("chroma", "mmap"), default="chroma", help="vector backend")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--keep", action="store_true", help="keep generated repos and stores")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.1, help="regression threshold for --compare")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            head = json.load(f)
+        return 1 if compare(base, head, args.threshold) else 0
+
+    if args.single:
+        print(json.dumps(run_size(args.single, args.workdir, args.queries,
+                                  args.embed_latency_ms, args.llm_latency_ms, backend=args.backend)))
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run_all(sizes, args.queries, args.embed_latency_ms, args.llm_latency_ms,
+                     repeat=max(1, args.repeat), keep=args.keep, backend=args.backend)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import os
+import json
+import random
+
+WORDS = (
+    "account", "address", "audit", "batch", "billing", "cache", "cart", "config", "customer",
+    "device", "event", "export", "invoice", "ledger", "metric", "order", "payment", "policy",
+    "product", "queue", "report", "session", "shipment", "stock", "tenant", "token", "user",
+)
+
+# Share of generated files per kind; "vendored" files land in directories
+# the loader prunes (node_modules, .venv, __pycache__), "binary" are skipped.
+MIX = (
+    ("python", 0.38), ("javascript", 0.14), ("typescript", 0.14), ("markdown", 0.08),
+    ("config", 0.08), ("vendored", 0.12), ("binary", 0.06),
+)
+VENDORED_DIRS = ("node_modules", ".venv", "__pycache__")
+FILES_PER_DIR = 40
+
+def _name(rng, parts=2):
+    return "_".join(rng.choice(WORDS) for _ in range(parts))
+
+def _python_file(rng, index):
+    lines = [f'"""{_name(rng).replace("_", " ").capitalize()} helpers (module {index})."""', "import os", ""]
+    symbols = []
+    for n in range(rng.randint(2, 10)):
+        if rng.random() < 0.3:
+            cls = "".join(w.capitalize() for w in _name(rng).split("_")) + str(index)
+            symbols.append(cls)
+            lines += [f"class {cls}:", f'    """Keeps {rng.choice(WORDS)} state."""', "",
+                      "    def __init__(self, value):", "        self.value = value", ""]
+            for m in range(rng.randint(1, 4)):
+                lines += [f"    def {_name(rng)}_{m}(self, item):",
+                          f"        return self.value + len(str(item)) * {rng.randint(1, 99)}", ""]
+        else:
+            func = f"{_name(rng)}_{index}_{n}"
+            symbols.append(func)
+            body = [f"    total = {rng.randint(0, 9)}",
+                    f"    for {rng.choice(WORDS)} in range(limit):",
+                    f"        total += {rng.choice(WORDS)} % {rng.randint(2, 17)}"]
+            lines += [f"def {func}(limit, {rng.choice(WORDS)}=None):",
+                      f'    """Computes the {rng.choice(WORDS)} {rng.choice(WORDS)} total."""',
+                      *body, "    return total", "", ""]
+    return "\n".join(lines), symbols
+
+def _js_file(rng, index, typed):
+    lines, symbols = [], []
+    for n in range(rng.randint(2, 8)):
+        func = f"{_name(rng)}{index}x{n}"
+        symbols.append(func)
+        arg = f"{rng.choice(WORDS)}{': number' if typed else ''}"
+        lines += [f"// Handles {rng.choice(WORDS)} {rng.choice(WORDS)} updates",
+                  f"export function {func}({arg}) {{",
+                  f"  const {rng.choice(WORDS)}List = [{', '.join(str(rng.randint(0, 99)) for _ in range(5))}];",
+                  f"  return {rng.choice(WORDS)}List.map((v) => v * 2).length;",
+                  "}", ""]
+    return "\n".join(lines), symbols
+
+def _markdown_file(rng, index):
+    lines = [f"# {_name(rng, 3).replace('_', ' ').title()}", ""]
+    for _ in range(rng.randint(2, 6)):
+        lines += [f"## {_name(rng).replace('_', ' ').title()}", "",
+                  " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 120))) + ".", ""]
+    return "\n".join(lines), []
+
+def _config_file(rng, index):
+    data = {_name(rng): {"enabled": rng.random() < 0.5, "retries": rng.randint(0, 5)} for _ in range(8)}
+    return "\n".join(f"{key}: {json.dumps(value)}" for key, value in data.items()), []
+
+def generate_repo(path, n_files, seed=0):
+    """
+    Writes a deterministic synthetic repository of n_files files under path:
+    Python/JS/TS modules, Markdown docs, YAML config, binary blobs and
+    vendored copies that the loader should prune.
+    Returns {"files": n_files, "bytes": total written, "symbols": [...]}.
+    """
+    rng = random.Random(seed)
+    kinds, weights = zip(*MIX)
+    total_bytes, symbols = 0, []
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "README.md"), "w", encoding="utf-8") as f:
+        f.write("# Synthetic benchmark repo\n\nGenerated by benchmarks/synthetic_repo.py.\n")
+
+    for index in range(1, n_files):
+        kind = rng.choices(kinds, weights)[0]
+        folder = os.path.join(path, "src", f"pkg_{index // FILES_PER_DIR}")
+        if kind == "python":
+            name, (content, found) = f"{_name(rng)}_{index}.py", _python_file(rng, index)
+        elif kind in ("javascript", "typescript"):
+            typed = kind == "typescript"
+            name, (content, found) = f"{_name(rng)}_{index}.{'ts' if typed else 'js'}", _js_file(rng, index, typed)
+        elif kind == "markdown":
+            folder = os.path.join(path, "docs", f"section_{index // FILES_PER_DIR}")
+            name, (content, found) = f"{_name(rng)}_{index}.md", _markdown_file(rng, index)
+        elif kind == "config":
+            name, (content, found) = f"{_name(rng)}_{index}.yaml", _config_file(rng, index)
+        elif kind == "vendored":
+            folder = os.path.join(path, rng.choice(VENDORED_DIRS), f"lib_{index // FILES_PER_DIR}")
+            name, (content, found) = f"vendor_{index}.js", _js_file(rng, index, False)
+            found = []
+        else:
+            folder = os.path.join(path, "assets")
+            name, content, found = f"blob_{index}.txt", None, []
+
+        os.makedirs(folder, exist_ok=True)
+        if content is None:
+            data = b"\x00" + rng.randbytes(rng.randint(256, 4096))
+            with open(os.path.join(folder, name), "wb") as f:
+                f.write(data)
+            total_bytes += len(data)
+        else:
+            with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+                f.write(content)
+            total_bytes += len(content)
+        symbols.extend(found)
+
+    return {"files": n_files, "bytes": total_bytes, "symbols": symbols}
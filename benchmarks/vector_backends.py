@@ -0,0 +1,195 @@
+"""
+Recall and latency of the vector backends on synthetic embeddings.
+
+    python -m benchmarks.vector_backends --sizes 10000,100000 --output backends.json
+    python -m benchmarks.vector_backends --sizes 100000 --dim 1536 --backends mmap-float16,mmap-int8-rerank
+
+Recall@k is measured against exact float32 cosine search. Each store is
+built in one subprocess and served from a fresh one, so the reported RSS
+is what an open store costs a serving process.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from benchmarks.pipeline import REPO_ROOT, percentile, _git_commit
+
+DEFAULT_SIZES = (10000, 100000)
+DEFAULT_DIM = 256
+DEFAULT_QUERIES = 200
+DEFAULT_K = 10
+BATCH = 5000
+# name -> (backend, mmap dtype, rerank)
+BACKENDS = {
+    "chroma": ("chroma", None, False),
+    "mmap-float16": ("mmap", "float16", False),
+    "mmap-int8": ("mmap", "int8", False),
+    "mmap-int8-rerank": ("mmap", "int8", True),
+}
+
+def make_data(n, dim, queries, seed=0):
+    """
+    Clustered unit vectors (like embeddings of related code) and queries
+    drawn near random data points.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 200), dim)).astype(np.float32)
+    data = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    picks = rng.integers(0, n, queries)
+    query_vectors = data[picks] + 0.4 * rng.standard_normal((queries, dim)).astype(np.float32) / np.sqrt(dim) * 4
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return data, query_vectors
+
+def exact_top_k(data, query_vectors, k):
+    scores = query_vectors @ data.T
+    return [set(np.argpartition(-row, k)[:k].tolist()) for row in scores]
+
+class PrecomputedEmbeddings(Embeddings):
+    """
+    Maps the texts "c<row>" to their precomputed vectors, so both backends
+    go through their normal add_texts path without an embedding model.
+    """
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.model = "precomputed"
+
+    def embed_documents(self, texts):
+        return self.vectors[[int(t[1:]) for t in texts]].tolist()
+
+    def embed_query(self, text):
+        return self.vectors[int(text[1:])].tolist()
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def _open(name, path, embedding):
+    backend, dtype, rerank = BACKENDS[name]
+    if backend == "mmap":
+        from rag_engine.mmap_store import MmapVectorStore
+        return MmapVectorStore(path, embedding, dtype=dtype, rerank=rerank)
+    from langchain_chroma import Chroma
+    return Chroma(embedding_function=embedding, persist_directory=path)
+
+def build(name, path, n, dim, queries, seed):
+    data, _ = make_data(n, dim, queries, seed)
+    store = _open(name, path, PrecomputedEmbeddings(data))
+    started = time.perf_counter()
+    for start in range(0, n, BATCH):
+        rows = range(start, min(start + BATCH, n))
+        store.add_texts([f"c{i}" for i in rows], [{"row": i} for i in rows], ids=[str(i) for i in rows])
+    from rag_engine.utils import directory_size
+    return {"build_seconds": round(time.perf_counter() - started, 2),
+            "disk_mb": round(directory_size(path) / 1e6, 1)}
+
+def serve(name, path, n, dim, queries, seed, k):
+    data, query_vectors = make_data(n, dim, queries, seed)
+    truth = exact_top_k(data, query_vectors, k)
+    embedding = PrecomputedEmbeddings(data)
+    del data
+    # Import the backend before measuring, so RSS deltas are the store's own
+    _open(name, tempfile.mkdtemp(), embedding)
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    store = _open(name, path, embedding)
+    open_ms = (time.perf_counter() - started) * 1000
+    rss_open = _rss_mb()
+
+    latencies, hits = [], 0
+    for vector, expected in zip(query_vectors, truth):
+        started = time.perf_counter()
+        docs = store.similarity_search_by_vector(vector.tolist(), k=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(expected & {int(d.metadata["row"]) for d in docs})
+    return {
+        "open_ms": round(open_ms, 1),
+        "rss_open_mb": round(rss_open - rss_before, 1),
+        "rss_after_queries_mb": round(_rss_mb() - rss_before, 1),
+        "recall_at_k": round(hits / (k * len(truth)), 4),
+        "query_p50_ms": round(percentile(latencies, 0.5), 3),
+        "query_p95_ms": round(percentile(latencies, 0.95), 3),
+    }
+
+def _subprocess(args):
+    cmd = [sys.executable, "-m", "benchmarks.vector_backends"] + [str(a) for a in args]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=REPO_ROOT).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def run_all(sizes, names, dim, queries, k, seed=0, keep=False):
+    results = []
+    for n in sizes:
+        for name in names:
+            workdir = tempfile.mkdtemp(prefix=f"devhelper_vectors_{n}_")
+            common = ["--store", os.path.join(workdir, "store"), "--backends", name, "--sizes", n,
+                      "--dim", dim, "--queries", queries, "--k", k, "--seed", seed]
+            print(f"⏱️ {name}: {n} vectors...", file=sys.stderr)
+            try:
+                row = {"vectors": n, "backend": name}
+                row.update(_subprocess(["--phase", "build"] + common))
+                row.update(_subprocess(["--phase", "serve"] + common))
+            finally:
+                if not keep:
+                    shutil.rmtree(workdir, ignore_errors=True)
+            print(f"✅ {name} @ {n}: recall@{k} {row['recall_at_k']}, p50 {row['query_p50_ms']} ms, "
+                  f"open RSS {row['rss_open_mb']} MB, disk {row['disk_mb']} MB", file=sys.stderr)
+            results.append(row)
+    return {
+        "commit": _git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {"dim": dim, "queries": queries, "k": k, "seed": seed},
+        "results": results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare vector backends: recall, latency, memory, disk.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated vector counts")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help=f"comma-separated: {', '.join(BACKENDS)}")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--keep", action="store_true", help="keep the built stores")
+    parser.add_argument("--phase", choices=("build", "serve"), help=argparse.SUPPRESS)
+    parser.add_argument("--store", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    names = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in names if b not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)}")
+
+    if args.phase == "build":
+        print(json.dumps(build(names[0], args.store, sizes[0], args.dim, args.queries, args.seed)))
+        return 0
+    if args.phase == "serve":
+        print(json.dumps(serve(names[0], args.store, sizes[0], args.dim, args.queries, args.seed, args.k)))
+        return 0
+
+    report = run_all(sizes, names, args.dim, args.queries, args.k, args.seed, args.keep)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
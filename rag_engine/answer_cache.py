@@ -0,0 +1,203 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from rag_engine import metrics
+
+DEFAULT_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join("chroma_store", "answer_cache.sqlite"))
+DEFAULT_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+DEFAULT_THRESHOLD = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def normalize_query(query: str) -> str:
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!. ")
+
+def _unit(vectors):
+    import numpy as np
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+class AnswerCache:
+    """
+    Persistent two-tier answer cache backed by SQLite.
+    - Tier 1: exact match on (db_name, model, normalized query).
+    - Tier 2: cosine similarity of the query embedding against cached query
+      embeddings of the same store and model, above a threshold. The cached
+      embeddings are kept in memory as one normalized matrix per store and
+      model, scored with a single matrix product.
+    model names the LLM that wrote the answer, so switching engine or model
+    doesn't return another model's answers.
+    Entries expire after ttl seconds, the least recently used are evicted past
+    max_entries, and entries from an older build of a store (store_version)
+    are dropped on lookup, so re-indexing invalidates them.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 threshold=DEFAULT_THRESHOLD):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._matrices = {}  # (db_name, model) -> (queries, unit embedding matrix)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(answers)")]
+        if columns and "model" not in columns:
+            self._conn.execute("DROP TABLE answers")  # answers cached before the model was part of the key
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "db_name TEXT NOT NULL, model TEXT NOT NULL, query TEXT NOT NULL, version TEXT NOT NULL, "
+            "answer TEXT NOT NULL, embedding BLOB, created REAL NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (db_name, model, query))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers(last_used)")
+        self._conn.commit()
+
+    def _drop_matrices(self, db_name):
+        for key in [key for key in self._matrices if key[0] == db_name]:
+            del self._matrices[key]
+
+    def _matrix(self, db_name, model):
+        """
+        (queries, unit embedding matrix) of a store's cached answers by a
+        model, loaded from the database on first use. Call with the lock held.
+        """
+        import numpy as np
+        key = (db_name, model)
+        if key not in self._matrices:
+            rows = self._conn.execute(
+                "SELECT query, embedding FROM answers WHERE db_name = ? AND model = ? AND embedding IS NOT NULL",
+                (db_name, model)
+            ).fetchall()
+            vectors = [np.frombuffer(blob, dtype=np.float32) for _, blob in rows]
+            # One embedding model per store build; older builds' rows were dropped by version
+            dim = len(vectors[-1]) if vectors else 0
+            queries = [query for (query, _), v in zip(rows, vectors) if len(v) == dim]
+            matrix = _unit([v for v in vectors if len(v) == dim]) if queries else np.zeros((0, 0), np.float32)
+            self._matrices[key] = (queries, matrix)
+        return self._matrices[key]
+
+    def get(self, db_name: str, query: str, version: str = "", query_embedding=None, model: str = ""):
+        """
+        Returns (answer, "exact" | "semantic") or None.
+        query_embedding enables the semantic tier; it may be a callable
+        returning the embedding, called only when the exact tier misses.
+        """
+        norm = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            expired = self._conn.execute(
+                "DELETE FROM answers WHERE db_name = ? AND (version != ? OR created < ?)",
+                (db_name, version, now - self.ttl)
+            ).rowcount
+            if expired:
+                self._drop_matrices(db_name)
+            row = self._conn.execute(
+                "SELECT answer FROM answers WHERE db_name = ? AND model = ? AND query = ?", (db_name, model, norm)
+            ).fetchone()
+            self._conn.commit()
+        kind, hit_query = ("exact", norm) if row else (None, None)
+
+        if row is None and callable(query_embedding):
+            query_embedding = query_embedding()
+        if row is None and query_embedding is not None:
+            with self._lock:
+                queries, matrix = self._matrix(db_name, model)
+            if queries and matrix.shape[1] == len(query_embedding):
+                scores = matrix @ _unit(query_embedding)
+                best = int(scores.argmax())
+                if scores[best] >= self.threshold:
+                    with self._lock:
+                        # Evicted since the matrix was loaded: a miss
+                        row = self._conn.execute(
+                            "SELECT answer FROM answers WHERE db_name = ? AND model = ? AND query = ?",
+                            (db_name, model, queries[best])
+                        ).fetchone()
+                    if row:
+                        hit_query, kind = queries[best], "semantic"
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                metrics.count("answer_cache_misses")
+                return None
+            self.hits[kind] += 1
+            metrics.count("answer_cache_hits", kind=kind)
+            self._conn.execute(
+                "UPDATE answers SET last_used = ? WHERE db_name = ? AND model = ? AND query = ?",
+                (now, db_name, model, hit_query)
+            )
+            self._conn.commit()
+        return row[0], kind
+
+    def put(self, db_name: str, query: str, answer: str, version: str = "", query_embedding=None,
+            model: str = ""):
+        import numpy as np
+        now = time.time()
+        norm = normalize_query(query)
+        vector = np.asarray(query_embedding, dtype=np.float32) if query_embedding is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(db_name, model, query, version, answer, embedding, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (db_name, model, norm, version, answer, vector.tobytes() if vector is not None else None, now, now)
+            )
+            # Rows evicted here may stay in a loaded matrix; get() checks a semantic hit still exists
+            self._conn.execute(
+                "DELETE FROM answers WHERE rowid IN ("
+                "SELECT rowid FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+            loaded = self._matrices.get((db_name, model))
+            if loaded is not None and vector is not None:
+                queries, matrix = loaded
+                if not queries:
+                    self._matrices[(db_name, model)] = ([norm], _unit(vector[None, :]))
+                elif matrix.shape[1] == len(vector):
+                    if norm in queries:
+                        matrix = matrix.copy()
+                        matrix[queries.index(norm)] = _unit(vector)
+                        self._matrices[(db_name, model)] = (queries, matrix)
+                    else:
+                        self._matrices[(db_name, model)] = (queries + [norm], np.vstack([matrix, _unit(vector)]))
+
+    def invalidate(self, db_name: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers WHERE db_name = ?", (db_name,))
+            self._conn.commit()
+            self._drop_matrices(db_name)
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        hits = self.hits["exact"] + self.hits["semantic"]
+        lookups = hits + self.misses
+        return {
+            "exact_hits": self.hits["exact"],
+            "semantic_hits": self.hits["semantic"],
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+def get_answer_cache(path=DEFAULT_CACHE_PATH) -> AnswerCache:
+    """
+    Returns the process-wide answer cache for a path.
+    """
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = AnswerCache(path)
+        return _caches[path]
@@ -1,32 +1,97 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+import hashlib
 import os
-import streamlit as st
+import time
+from rag_engine.code_splitter import split_code_document
+from rag_engine.embeddings import estimate_tokens
+from rag_engine import metrics
 
-def chunk_repo_texts(docs, chunk_size=600, overlap=50):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
-    readme_chunks = []
-    other_chunks = []
+CHUNK_MODES = ("text", "syntax")
+
+def _as_document(doc):
+    if isinstance(doc, Document):
+        return doc
+    return Document(
+        page_content=doc.get("page_content", ""),
+        metadata=doc.get("metadata", {})
+    )
 
+def iter_chunks(docs, chunk_size=600, overlap=50, mode="text"):
+    """
+    Streaming counterpart of chunk_repo_texts: yields chunks document by
+    document, so only one file's chunks are held in memory at a time.
+    README ranking is handled at retrieval time (see lexical_index), so
+    README chunks are no longer duplicated here.
+    - mode="text": one character splitter for every file type.
+    - mode="syntax": one chunk per function/class (Python, JS/TS) or section
+      (Markdown), small siblings merged up to ~chunk_size characters worth of
+      tokens; other files fall back to the text splitter.
+    Splitting time is recorded as the "chunk" stage.
+    """
+    if mode not in CHUNK_MODES:
+        raise ValueError(f"Unknown chunk mode: choose one of {CHUNK_MODES}.")
+    return metrics.timed_iter("chunk", _iter_chunks(docs, chunk_size, overlap, mode))
+
+def _iter_chunks(docs, chunk_size, overlap, mode):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+    code_fallback = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap, add_start_index=True)
     for doc in docs:
-        if not isinstance(doc, Document):
-            doc = Document(
-                page_content=doc.get("page_content", ""),
-                metadata=doc.get("metadata", {})
-            )
+        doc = _as_document(doc)
+        chunks = split_code_document(doc, chunk_size // 4, code_fallback) if mode == "syntax" else None
+        chunks = chunks if chunks is not None else splitter.split_documents([doc])
+        metrics.count("chunks", len(chunks))
+        yield from chunks
 
-        if "readme.md" in doc.metadata.get("source", "").lower():
-            readme_chunks.extend(splitter.split_documents([doc]) * 2)
-        else:
-            other_chunks.extend(splitter.split_documents([doc]))
+def chunk_repo_texts(docs, chunk_size=600, overlap=50, mode="text"):
+    return list(iter_chunks(docs, chunk_size=chunk_size, overlap=overlap, mode=mode))
 
-    return readme_chunks + other_chunks
+def compare_chunkers(docs, chunk_size=600, overlap=50):
+    """
+    Runs every chunk mode over the same documents and reports chunk count,
+    total (estimated) tokens to embed and chunking time per mode.
+    Embedding and storing are not run: that would bill the embedding API for
+    every mode on each comparison, and their cost scales with the tokens
+    column (the index stages of each real run are in metrics).
+    """
+    docs = [_as_document(doc) for doc in docs]
+    report = {}
+    for mode in CHUNK_MODES:
+        started = time.perf_counter()
+        chunks = chunk_repo_texts(docs, chunk_size=chunk_size, overlap=overlap, mode=mode)
+        report[mode] = {
+            "chunks": len(chunks),
+            "tokens": sum(estimate_tokens(c.page_content) for c in chunks),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    return report
+
+SUGGEST_EXTENSIONS = (".py", ".md", ".txt", ".js", ".ts", ".json")
+
+def chunk_config_key(path):
+    """
+    Fingerprint of the files suggest_chunk_config reads (path, size and
+    mtime of each), to cache its result: it changes whenever one of them
+    does, at the cost of a stat per file instead of reading them all.
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith(SUGGEST_EXTENSIONS):
+                full_path = os.path.join(root, file)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                digest.update(f"{os.path.relpath(full_path, path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
 
 def suggest_chunk_config(path):
     total_lines = 0
     for root, _, files in os.walk(path):
         for file in files:
-            if file.endswith((".py", ".md", ".txt", ".js", ".ts", ".json")):
+            if file.endswith(SUGGEST_EXTENSIONS):
                 try:
                     with open(os.path.join(root, file), 'r', encoding='utf-8', errors='ignore') as f:
                         total_lines += len(f.readlines())
@@ -40,7 +105,10 @@ def suggest_chunk_config(path):
         return 1200, 150
 
 def preview_chunks(chunks):
+    import streamlit as st
     st.markdown(f"📦 Showing {len(chunks)} chunks:")
     for i, c in enumerate(chunks[:5]):
         st.code(c.page_content, language='text')
-        st.caption(f"📄 {c.metadata.get('source', 'Unknown')} | Chunk #{i+1}")
+        symbol = c.metadata.get("symbol")
+        lines = f" | lines {c.metadata['start_line']}-{c.metadata['end_line']}" if "start_line" in c.metadata else ""
+        st.caption(f"📄 {c.metadata.get('source', 'Unknown')}{f' | {symbol}' if symbol else ''}{lines} | Chunk #{i+1}")
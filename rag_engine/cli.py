@@ -0,0 +1,361 @@
+"""
+Headless DevHelper: build stores and answer questions without the UI.
+
+    python -m rag_engine index ./my-project
+    python -m rag_engine index https://github.com/XessX/devhelper-ai --summarize
+    python -m rag_engine ask ./my-project -q "Where is the retriever built?"
+    python -m rag_engine ask ./my-project --file questions.jsonl --parallel 8 --output answers.jsonl
+    python -m rag_engine ask ./my-service -q "How does the client retry?" --also <client store> --also <docs store>
+    python -m rag_engine stores list
+    python -m rag_engine stores prune --quota-mb 2048 --dry-run
+
+Stores are named like the app names them (source as entered + chunk
+settings), so a store built here is picked up by the UI as is.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from rag_engine import metrics
+from rag_engine.utils import make_db_name, is_valid_github_repo_url
+
+STORE_ROOT = "chroma_store"
+DEFAULT_EXCLUDE = ".venv, node_modules, __pycache__"
+DEFAULT_CHUNK = (800, 100)
+DEFAULT_PARALLEL = int(os.getenv("CLI_PARALLEL", "4"))
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+def _default_engine():
+    return "ollama" if os.getenv("USE_OLLAMA", "0") == "1" else "openai"
+
+def _is_url(source):
+    return source.startswith(("http://", "https://"))
+
+def resolve_source(args):
+    """
+    Returns (source_key, path_or_None, docs_or_None) for a local path,
+    GitHub URL or web page, fetching remote sources when indexing.
+    """
+    source = args.source.strip()
+    exclude_dirs = args.exclude.split(",")
+    if not _is_url(source):
+        if not os.path.isdir(source):
+            raise ValueError(f"❌ Not a folder: {source}")
+        return source, source, None
+    if not getattr(args, "fetch", False):
+        # Asking: a GitHub store's chunk settings were auto-tuned on its clone
+        from rag_engine.utils import _read_source_marker
+        marker = _read_source_marker(args.clone_dir) or {}
+        return source, args.clone_dir if marker.get("url") == source else None, None
+    if is_valid_github_repo_url(source):
+        from rag_engine.utils import clone_github_repo
+        _log(f"🔄 Cloning {source}...")
+        # Indexing is an explicit sync: always check for a newer commit
+        return source, clone_github_repo(source, dest_folder=args.clone_dir, exclude_dirs=exclude_dirs,
+                                         refresh=True), None
+    if args.crawl_depth:
+        from rag_engine.crawler import crawl_site, DEFAULT_MAX_PAGES
+        max_pages = args.max_pages or DEFAULT_MAX_PAGES
+        _log(f"🕸️ Crawling {source} (depth {args.crawl_depth}, up to {max_pages} pages)...")
+        docs, stats = crawl_site(source, max_depth=args.crawl_depth, max_pages=max_pages, return_stats=True)
+        _log(f"🕸️ {stats['pages']} pages: {stats['fetched']} downloaded, {stats['not_modified']} unchanged")
+        return source, None, docs
+    from rag_engine.utils import load_webpage_as_document
+    _log(f"🌐 Fetching {source}...")
+    return source, None, [load_webpage_as_document(source)]
+
+def resolve_chunk_config(args, path):
+    """
+    Explicit --chunk-size/--overlap win; otherwise auto-tune local folders
+    exactly like the app's default "Auto-Tune Chunk Size" mode.
+    """
+    if args.chunk_size:
+        return args.chunk_size, args.overlap if args.overlap is not None else DEFAULT_CHUNK[1]
+    if path and os.path.isdir(path):
+        from rag_engine.chunker import suggest_chunk_config
+        return suggest_chunk_config(path)
+    return DEFAULT_CHUNK
+
+def _store_path(args, source_key, chunk_size, chunk_overlap):
+    mode = "syntax" if args.syntax else "text"
+    return os.path.join(args.store_root, make_db_name(source_key, chunk_size, chunk_overlap, mode))
+
+def cmd_index(args):
+    from rag_engine.loader import iter_codebase
+    from rag_engine.chunker import iter_chunks
+    from rag_engine.vector_store import sync_chroma
+
+    args.fetch = True
+    source_key, path, docs = resolve_source(args)
+    chunk_size, chunk_overlap = resolve_chunk_config(args, path)
+    chroma_path = _store_path(args, source_key, chunk_size, chunk_overlap)
+    mode = "syntax" if args.syntax else "text"
+    exclude_dirs = args.exclude.split(",")
+
+    _log(f"⚙️ Indexing {source_key} -> {chroma_path} (chunks {chunk_size}/{chunk_overlap}, {mode})")
+    with metrics.trace("index") as index_trace:
+        _, delta = sync_chroma(
+            docs if docs is not None else iter_codebase(path, exclude_dirs=exclude_dirs, verbose=0),
+            persist_path=chroma_path,
+            embedding_engine=args.engine,
+            chunker=lambda batch: iter_chunks(batch, chunk_size=chunk_size, overlap=chunk_overlap, mode=mode),
+            reset=args.reset,
+            backend=args.backend,
+            dedup=False if args.no_dedup else None,
+            progress=lambda p: _log(f"⏳ {p['files']} files | {p['chunks']} chunks embedded")
+        )
+    report = {
+        "source": source_key,
+        "store": chroma_path,
+        "added": len(delta["added"]), "changed": len(delta["changed"]), "removed": len(delta["removed"]),
+        "unchanged": delta["unchanged"], "failed": delta["failed"],
+        "chunks_written": delta["chunks_written"], "chunks_deleted": delta["chunks_deleted"],
+        "duplicates": delta["duplicates"], "near_duplicates": delta["near_duplicates"],
+        "dedup_bytes_saved": delta["bytes_saved"],
+        "trace": index_trace.as_dict(),
+    }
+
+    if args.summarize:
+        from rag_engine.query_engine import load_llm
+        from rag_engine.summarizer import build_summary_tree
+        summary_docs = docs if docs is not None else iter_codebase(path, exclude_dirs=exclude_dirs, verbose=0)
+        _, report["summary"] = build_summary_tree(
+            summary_docs,
+            load_llm(args.engine, model=os.getenv("SUMMARY_LLM_MODEL")),
+            chroma_path,
+            progress=lambda p: _log(f"📝 Summarized {p['files']}/{p['total']} files")
+        )
+
+    from rag_engine.store_manager import record_build
+    _, pruned = record_build(chroma_path, source=source_key, engine=args.engine,
+                             chunk_size=chunk_size, chunk_overlap=chunk_overlap, mode=mode)
+    report["pruned"] = [store["name"] for store in pruned]
+
+    _log(f"✅ {report['added']} added, {report['changed']} changed, {report['removed']} removed files | "
+         f"{report['chunks_written']} chunks written, "
+         f"{report['duplicates'] + report['near_duplicates']} duplicates skipped")
+    if report["failed"]:
+        _log(f"⚠️ Embedding failed for {len(report['failed'])} files; they are retried on the next index run")
+    print(json.dumps(report))
+    return 1 if report["failed"] else 0
+
+def read_questions(args):
+    """
+    Yields (id, question). --file takes JSONL (question/query, or title +
+    body like requests.jsonl; id/request_id) or plain text, one per line.
+    """
+    if args.question:
+        for i, question in enumerate(args.question, start=1):
+            yield str(i), question
+        return
+    stream = sys.stdin if args.file == "-" else open(args.file, "r", encoding="utf-8")
+    with stream:
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = line
+            if not isinstance(item, dict):
+                yield str(number), str(item)
+                continue
+            question = item.get("question") or item.get("query")
+            if not question:
+                question = "\n\n".join(str(item[k]) for k in ("title", "body") if item.get(k))
+            yield str(item.get("id") or item.get("request_id") or number), question
+
+def _answer(chain, question_id, question):
+    from rag_engine.dedup import cited_sources
+    started = time.perf_counter()
+    with metrics.trace("query") as query_trace:
+        try:
+            result = chain.invoke({"query": question})
+            error = None
+        except Exception as e:
+            result, error = {}, str(e)
+    counters = query_trace.counters
+    return {
+        "id": question_id,
+        "question": question,
+        "answer": result.get("result") if isinstance(result, dict) else result,
+        "cached": result.get("cached") if isinstance(result, dict) else None,
+        "sources": list(dict.fromkeys(
+            (f"[{d.metadata['store']}] " if "store" in d.metadata else "") + source
+            for d in (result.get("source_documents") or []) for source in cited_sources(d)
+        )) if isinstance(result, dict) else [],
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "tokens_in": counters.get("llm_tokens_in", 0),
+        "tokens_out": counters.get("llm_tokens_out", 0),
+        "error": error,
+    }
+
+def cmd_ask(args):
+    from rag_engine.vector_store import load_chroma, load_retriever, store_version
+    from rag_engine.query_engine import get_llm_chain
+    from rag_engine.summarizer import load_summary_tree, summary_version
+
+    if args.store:
+        chroma_path, db_name = args.store, os.path.basename(os.path.normpath(args.store))
+    else:
+        source_key, path, _ = resolve_source(args)
+        chunk_size, chunk_overlap = resolve_chunk_config(args, path)
+        chroma_path = _store_path(args, source_key, chunk_size, chunk_overlap)
+        db_name = os.path.basename(chroma_path)
+    if not os.path.isdir(chroma_path):
+        _log(f"❌ No store at {chroma_path}. Build it first with: python -m rag_engine index {args.source or ''}")
+        return 1
+
+    from rag_engine.store_manager import touch
+    touch(chroma_path)
+    vectordb = load_chroma(chroma_path, embedding_engine=args.engine)
+    retriever, version = load_retriever(vectordb, chroma_path), store_version(chroma_path)
+    summary_tree = load_summary_tree(chroma_path)
+    if summary_tree:
+        version = f"{version}+{summary_version(chroma_path)}"  # answers may come from the summary
+    if args.also:
+        from rag_engine.federated import load_federated_retriever, federation_key
+        store_paths = [chroma_path] + [name if os.path.isdir(name) else os.path.join(args.store_root, name)
+                                       for name in args.also]
+        missing = [path for path in store_paths if not os.path.isdir(path)]
+        if missing:
+            _log(f"❌ No store at {', '.join(missing)}")
+            return 1
+        for path in store_paths[1:]:
+            touch(path)
+        retriever = load_federated_retriever(store_paths)
+        db_name, version = federation_key(store_paths)
+        summary_tree = None  # one store's summary can't answer for all of them
+        _log(f"🔀 Searching {len(store_paths)} stores")
+    chain = get_llm_chain(
+        vectordb,
+        engine=args.engine,
+        retriever=retriever,
+        db_name=None if args.no_cache else db_name,
+        store_version=version,
+        summary_tree=summary_tree
+    )
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    write_lock = threading.Lock()
+    answered = failed = 0
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+            futures = [pool.submit(_answer, chain, qid, question) for qid, question in read_questions(args)]
+            for future in as_completed(futures):
+                row = future.result()
+                with write_lock:
+                    out.write(json.dumps(row) + "\n")
+                    out.flush()
+                answered += 1
+                failed += row["error"] is not None
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    _log(f"✅ {answered} questions answered ({failed} failed) in {time.perf_counter() - started:.1f}s")
+    return 1 if failed else 0
+
+def cmd_stores(args):
+    from rag_engine import store_manager
+
+    def path_of(name):
+        return name if os.path.isdir(name) else os.path.join(args.store_root, name)
+
+    if args.action == "list":
+        result = {"usage": store_manager.usage(args.store_root, quota_mb=args.quota_mb),
+                  "stores": store_manager.list_stores(args.store_root)}
+    elif args.action == "prune":
+        pruned = store_manager.prune(args.store_root, quota_mb=args.quota_mb, dry_run=args.dry_run,
+                                     min_idle=0 if args.force else store_manager.DEFAULT_MIN_IDLE)
+        result = {"dry_run": args.dry_run, "pruned": pruned,
+                  "freed_bytes": sum(store["size_bytes"] for store in pruned)}
+    else:
+        if not args.stores:
+            raise ValueError(f"❌ Name the store(s) to {args.action}.")
+        result = []
+        for name in args.stores:
+            path = path_of(name)
+            if not os.path.isdir(path):
+                raise ValueError(f"❌ No store at {path}")
+            if args.action == "inspect":
+                result.append(store_manager.inspect_store(path))
+            elif args.action == "compact":
+                result.append({"store": name, "reclaimed_bytes": store_manager.compact_store(path, min_free=0)})
+            else:
+                result.append({"store": name, "freed_bytes": store_manager.delete_store(path)})
+    print(json.dumps(result, indent=2))
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m rag_engine", description="DevHelper AI without the UI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def common(p, source_required=True):
+        p.add_argument("source", nargs=None if source_required else "?",
+                       help="local folder, GitHub repo URL or web page URL (as entered in the app)")
+        p.add_argument("--engine", choices=("openai", "ollama"), default=_default_engine())
+        p.add_argument("--chunk-size", type=int, help="default: auto-tuned for folders, 800 otherwise")
+        p.add_argument("--overlap", type=int)
+        p.add_argument("--syntax", action="store_true", help="syntax-aware chunking")
+        p.add_argument("--exclude", default=DEFAULT_EXCLUDE, help="comma-separated folders to skip")
+        p.add_argument("--store-root", default=STORE_ROOT)
+        p.add_argument("--clone-dir", default="cloned_repo")
+
+    index = sub.add_parser("index", help="build or sync the store for a source")
+    common(index)
+    index.add_argument("--reset", action="store_true", help="rebuild from scratch")
+    index.add_argument("--summarize", action="store_true", help="precompute the repo summary tree")
+    index.add_argument("--backend", choices=("chroma", "mmap"),
+                       help="vector backend of a new store (default: VECTOR_BACKEND); with --reset, converts")
+    index.add_argument("--no-dedup", action="store_true", help="embed duplicate chunks too (default: DEDUP)")
+    index.add_argument("--crawl-depth", type=int, default=0, help="web pages: follow same-site links this deep")
+    index.add_argument("--max-pages", type=int, help="web pages: crawl at most this many (default: CRAWL_MAX_PAGES)")
+    index.set_defaults(func=cmd_index)
+
+    ask = sub.add_parser("ask", help="answer questions against an indexed source")
+    common(ask, source_required=False)
+    questions = ask.add_mutually_exclusive_group(required=True)
+    questions.add_argument("-q", "--question", action="append", help="a question (repeatable)")
+    questions.add_argument("--file", help="JSONL or text file of questions ('-' for stdin)")
+    ask.add_argument("--store", help="store directory (instead of resolving it from source)")
+    ask.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL, help="questions answered at once")
+    ask.add_argument("--output", help="JSONL results file (default: stdout)")
+    ask.add_argument("--no-cache", action="store_true", help="bypass the answer cache")
+    ask.add_argument("--also", action="append", metavar="STORE",
+                     help="also search this store (name under --store-root or path; repeatable)")
+    ask.set_defaults(func=cmd_ask)
+
+    stores = sub.add_parser("stores", help="list, inspect, compact, delete or prune stores")
+    stores.add_argument("action", choices=("list", "inspect", "compact", "delete", "prune"))
+    stores.add_argument("stores", nargs="*", help="store names (or paths) for inspect/compact/delete")
+    stores.add_argument("--store-root", default=STORE_ROOT)
+    stores.add_argument("--quota-mb", type=int, help="prune: target size (default: STORE_QUOTA_MB)")
+    stores.add_argument("--dry-run", action="store_true", help="prune: only report what would be removed")
+    stores.add_argument("--force", action="store_true", help="prune: also evict stores used in the last minutes")
+    stores.set_defaults(func=cmd_stores)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "ask" and not (args.source or args.store):
+        _log("❌ Give a source or --store.")
+        return 2
+    try:
+        return args.func(args)
+    except (ValueError, RuntimeError, ImportError) as e:
+        _log(str(e) if str(e).startswith("❌") else f"❌ {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
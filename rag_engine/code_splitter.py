@@ -0,0 +1,248 @@
+import os
+import re
+import ast
+from collections import namedtuple
+from langchain_core.documents import Document
+from rag_engine.embeddings import estimate_tokens
+
+LANGUAGES = {
+    ".py": "python",
+    ".js": "javascript", ".jsx": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".md": "markdown",
+}
+
+# Line span (1-based, inclusive) of one syntactic unit and the symbol enclosing it.
+Unit = namedtuple("Unit", "start end symbol")
+
+JS_SYMBOL_RE = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?"
+    r"(?:function\s*\*?|class|interface|type|enum|const|let|var)\s+([A-Za-z_$][\w$]*)",
+    re.M
+)
+MD_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+PY_DEFS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+# A single function may run this far past the budget before it is cut:
+# splitting a slightly-too-long body costs an extra chunk plus overlap.
+UNIT_SLACK = 1.5
+
+def language_of(source: str):
+    return LANGUAGES.get(os.path.splitext(source)[1].lower())
+
+def _span_tokens(lines, start, end):
+    return estimate_tokens("".join(lines[start - 1:end]))
+
+def _python_units(text, lines, budget):
+    tree = ast.parse(text)
+
+    def walk(nodes, first, last, prefix):
+        scope = prefix.rstrip(".")
+        units, cursor = [], first
+        for node in nodes:
+            if not isinstance(node, PY_DEFS):
+                continue
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            end = node.end_lineno
+            if start > cursor:
+                units.append(Unit(cursor, start - 1, scope))
+            name = prefix + node.name
+            # Classes too big for one chunk are split into their methods
+            if isinstance(node, ast.ClassDef) and _span_tokens(lines, start, end) > budget * UNIT_SLACK:
+                units.extend(walk(node.body, start, end, name + "."))
+            else:
+                units.append(Unit(start, end, name))
+            cursor = end + 1
+        if cursor <= last:
+            units.append(Unit(cursor, last, scope))
+        return units
+
+    return walk(tree.body, 1, len(lines), "")
+
+# After one of these (or at the start) a '/' opens a regex literal, not a division
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORD_RE = re.compile(r"(?:^|[^\w$])(?:return|typeof|instanceof|in|of|new|delete|void|throw|case|do|else|yield|await)\s*$")
+
+def _skip_string(text, i):
+    """
+    Index just past the string or template literal opening at i. A template's
+    ${...} is skipped as code, so it may hold braces and nested literals.
+    """
+    quote, j, n = text[i], i + 1, len(text)
+    while j < n and text[j] != quote:
+        if text[j] == "\\":
+            j += 1
+        elif text[j] == "\n" and quote != "`":
+            break
+        elif quote == "`" and text.startswith("${", j):
+            j = _skip_braces(text, j + 2)
+            continue
+        j += 1
+    return j + 1
+
+def _skip_braces(text, j):
+    depth, n = 1, len(text)
+    while j < n:
+        c = text[j]
+        if c in "\"'`":
+            j = _skip_string(text, j)
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return j + 1
+        j += 1
+    return n
+
+def _skip_regex(text, i):
+    """
+    Index just past the regex literal opening at i, or None if the line
+    ends first (then the '/' was a division after all).
+    """
+    j, n, in_class = i + 1, len(text), False
+    while j < n:
+        c = text[j]
+        if c == "\\":
+            j += 2
+            continue
+        if c == "\n":
+            return None
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            return j + 1
+        j += 1
+    return None
+
+def _js_units(text, lines):
+    """
+    Splits at top-level statement boundaries: a newline at brace depth 0
+    right after '}' or ';', or a blank line. Strings, template literals,
+    regex literals and comments are skipped so braces inside them don't count.
+    """
+    units, depth, line, unit_start, last_sig = [], 0, 1, 1, ""
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c in "\"'`":
+            j = _skip_string(text, i)
+            line += text.count("\n", i, min(j, n))
+            i, last_sig = j, c
+            continue
+        if c == "/" and not text.startswith(("//", "/*"), i) and (
+                not last_sig or last_sig in REGEX_PRECEDERS or REGEX_KEYWORD_RE.search(text, max(0, i - 12), i)):
+            j = _skip_regex(text, i)
+            if j is not None:
+                i, last_sig = j, "/"
+                continue
+        if text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j == -1 else j
+            continue
+        if text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            j = n if j == -1 else j + 2
+            line += text.count("\n", i, j)
+            i = j
+            continue
+        if c in "{([":
+            depth += 1
+        elif c in "})]":
+            depth = max(0, depth - 1)
+        if c == "\n":
+            blank = not lines[line - 1].strip() if line - 1 < len(lines) else True
+            if depth == 0 and (last_sig in ("}", ";") or blank) and line >= unit_start:
+                units.append(Unit(unit_start, line, ""))
+                unit_start = line + 1
+            line += 1
+        elif not c.isspace():
+            last_sig = c
+        i += 1
+    if unit_start <= len(lines):
+        units.append(Unit(unit_start, len(lines), ""))
+
+    named = []
+    for unit in units:
+        match = JS_SYMBOL_RE.search("".join(lines[unit.start - 1:unit.end]))
+        named.append(unit._replace(symbol=match.group(1) if match else ""))
+    return named
+
+def _markdown_units(lines):
+    units, start, heading, in_fence = [], 1, "", False
+    for number, text in enumerate(lines, start=1):
+        if text.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else MD_HEADING_RE.match(text)
+        if match and number > start:
+            units.append(Unit(start, number - 1, heading))
+            start = number
+        if match:
+            heading = match.group(2)
+    if start <= len(lines):
+        units.append(Unit(start, len(lines), heading))
+    return units
+
+def _merge(units, lines, budget):
+    """
+    Merges consecutive small units while they fit in the token budget.
+    """
+    merged = []
+    for unit in units:
+        if not "".join(lines[unit.start - 1:unit.end]).strip():
+            continue
+        if merged and _span_tokens(lines, merged[-1].start, unit.end) <= budget:
+            prev = merged[-1]
+            symbols = [s for s in prev.symbol.split(", ") + [unit.symbol] if s]
+            merged[-1] = Unit(prev.start, unit.end, ", ".join(dict.fromkeys(symbols)))
+        else:
+            merged.append(unit)
+    return merged
+
+def split_code_document(doc: Document, budget_tokens: int, fallback_splitter):
+    """
+    Splits a document into one chunk per function/class/section (small
+    siblings merged up to budget_tokens). Units over UNIT_SLACK x budget are
+    cut with fallback_splitter (which must set add_start_index=True).
+    Returns None for languages it doesn't handle or code that doesn't parse.
+    Chunk metadata gains language, symbol, start_line and end_line.
+    """
+    source = doc.metadata.get("source", "")
+    language = language_of(source)
+    if language is None:
+        return None
+    text = doc.page_content
+    lines = text.splitlines(keepends=True)
+    if not lines:
+        return []
+
+    try:
+        if language == "python":
+            units = _python_units(text, lines, budget_tokens)
+        elif language == "markdown":
+            units = _markdown_units(lines)
+        else:
+            units = _js_units(text, lines)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+    chunks = []
+    for unit in _merge(units, lines, budget_tokens):
+        unit_text = "".join(lines[unit.start - 1:unit.end])
+        meta = {**doc.metadata, "language": language, "symbol": unit.symbol}
+        if estimate_tokens(unit_text) <= budget_tokens * UNIT_SLACK:
+            chunks.append(Document(page_content=unit_text, metadata={
+                **meta, "start_line": unit.start, "end_line": unit.end,
+            }))
+            continue
+        for piece in fallback_splitter.create_documents([unit_text]):
+            offset = piece.metadata.get("start_index", 0)
+            start = unit.start + unit_text.count("\n", 0, max(offset, 0))
+            chunks.append(Document(page_content=piece.page_content, metadata={
+                **meta, "start_line": start, "end_line": start + piece.page_content.count("\n"),
+            }))
+    return chunks
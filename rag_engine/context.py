@@ -0,0 +1,163 @@
+import os
+import hashlib
+from functools import lru_cache
+from langchain_core.documents import Document
+from rag_engine.embeddings import estimate_tokens
+from rag_engine.dedup import cited_sources, DUPLICATE_SEPARATOR, MIN_SHINGLES, SHINGLE_SIZE
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+OVERLAP_THRESHOLD = 0.8
+MMR_LAMBDA = 0.7
+
+@lru_cache(maxsize=8)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        name = tiktoken.encoding_name_for_model(model or "")
+    except KeyError:
+        name = "cl100k_base"
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        # Encoding files are fetched on first use; offline hosts fall back to estimates
+        return None
+
+def count_tokens(text: str, model: str = None) -> int:
+    """
+    Real token count for the target model when tiktoken is available,
+    otherwise a ~4 chars/token estimate (e.g. for Ollama models).
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _similarity(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def _containment(a: set, b: set) -> float:
+    """
+    Share of a's shingles that are also in b.
+    """
+    return len(a & b) / len(a) if a else 0.0
+
+def _shingles(text, size=SHINGLE_SIZE):
+    from rag_engine.lexical_index import tokenize
+    terms = tokenize(text)
+    return {" ".join(terms[i:i + size]) for i in range(len(terms) - size + 1)}
+
+def _span(doc: Document, start_key, end_key):
+    start = doc.metadata.get(start_key)
+    end = doc.metadata.get(end_key, start)
+    return (start, end) if isinstance(start, int) and isinstance(end, int) else None
+
+def _adjacent(a: Document, b: Document) -> bool:
+    """
+    Same file (of the same store) and touching or overlapping chunk indexes / line spans.
+    """
+    if a.metadata.get("source") != b.metadata.get("source") or a.metadata.get("store") != b.metadata.get("store"):
+        return False
+    for start_key, end_key in (("chunk", "chunk_end"), ("start_line", "end_line")):
+        span_a, span_b = _span(a, start_key, end_key), _span(b, start_key, end_key)
+        if span_a and span_b:
+            return span_b[0] <= span_a[1] + 1 and span_a[0] <= span_b[1] + 1
+    return False
+
+def _before(a: Document, b: Document) -> bool:
+    for key in ("chunk", "start_line"):
+        if isinstance(a.metadata.get(key), int) and isinstance(b.metadata.get(key), int):
+            return a.metadata[key] <= b.metadata[key]
+    return True
+
+def _join(first: Document, second: Document) -> Document:
+    """
+    Concatenates two neighbouring chunks, dropping the text they share
+    because of chunk overlap.
+    """
+    a, b = first.page_content, second.page_content
+    shared = 0
+    for k in range(min(len(a), len(b), 2000), 0, -1):
+        if a.endswith(b[:k]):
+            shared = k
+            break
+    metadata = dict(first.metadata)
+    duplicates = cited_sources(first)[1:] + cited_sources(second)[1:]
+    if duplicates:
+        metadata["duplicate_sources"] = DUPLICATE_SEPARATOR.join(dict.fromkeys(duplicates))
+    for start_key, end_key in (("chunk", "chunk_end"), ("start_line", "end_line")):
+        span_a, span_b = _span(first, start_key, end_key), _span(second, start_key, end_key)
+        if span_a and span_b:
+            metadata[start_key] = min(span_a[0], span_b[0])
+            metadata[end_key] = max(span_a[1], span_b[1])
+    return Document(page_content=a + ("" if shared else "\n") + b[shared:], metadata=metadata)
+
+def assemble_context(docs, budget_tokens: int = DEFAULT_TOKEN_BUDGET, model: str = None,
+                     mmr_lambda: float = MMR_LAMBDA, overlap_threshold: float = OVERLAP_THRESHOLD):
+    """
+    Turns retrieved chunks (best first) into prompt context:
+    1. drops exact duplicates and chunks mostly contained in a better one
+       (chunks under MIN_SHINGLES shingles only when identical),
+    2. reorders by MMR (retrieval rank vs. term overlap with already picked chunks),
+    3. merges neighbouring chunks of the same file,
+    4. packs chunks until budget_tokens (counted for model) is reached.
+    Returns (docs, report) where report counts tokens before/after and what was dropped.
+    """
+    from rag_engine.lexical_index import tokenize
+    docs = list(docs)
+    tokens_in = sum(count_tokens(d.page_content, model) for d in docs)
+    report = {"chunks_in": len(docs), "tokens_in": tokens_in, "duplicates": 0, "merged": 0, "over_budget": 0}
+
+    unique, hashes, shingles = [], set(), []
+    for doc in docs:
+        digest = hashlib.sha1(doc.page_content.encode("utf-8", errors="replace")).hexdigest()
+        grams = _shingles(doc.page_content)
+        contained = len(grams) >= MIN_SHINGLES and any(
+            _containment(grams, kept) >= overlap_threshold for kept in shingles)
+        if digest in hashes or contained:
+            report["duplicates"] += 1
+            continue
+        hashes.add(digest)
+        shingles.append(grams)
+        unique.append(doc)
+
+    terms = [set(tokenize(d.page_content)) for d in unique]
+    n = len(unique)
+    remaining, order = list(range(n)), []
+    while remaining:
+        def mmr(i):
+            relevance = 1.0 - i / n
+            redundancy = max((_similarity(terms[i], terms[j]) for j in order), default=0.0)
+            return mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        best = max(remaining, key=mmr)
+        order.append(best)
+        remaining.remove(best)
+
+    merged = []
+    for doc in (unique[i] for i in order):
+        for pos, kept in enumerate(merged):
+            if _adjacent(kept, doc):
+                first, second = (kept, doc) if _before(kept, doc) else (doc, kept)
+                merged[pos] = _join(first, second)
+                report["merged"] += 1
+                break
+        else:
+            merged.append(doc)
+
+    packed, used = [], 0
+    for doc in merged:
+        cost = count_tokens(doc.page_content, model)
+        if used + cost > budget_tokens:
+            report["over_budget"] += 1
+            continue
+        packed.append(doc)
+        used += cost
+
+    report.update({
+        "chunks_out": len(packed),
+        "tokens_out": used,
+        "tokens_saved": max(0, tokens_in - used),
+    })
+    return packed, report
@@ -0,0 +1,256 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from urllib.parse import urljoin, urldefrag, urlparse
+from urllib.robotparser import RobotFileParser
+from langchain_core.documents import Document
+from rag_engine.utils import http_session, HTTP_TIMEOUT
+from rag_engine.resource_pool import get_resource_pool
+from rag_engine import metrics
+
+DEFAULT_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "2"))
+DEFAULT_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "50"))
+DEFAULT_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "8"))
+DEFAULT_HOST_DELAY = float(os.getenv("CRAWL_HOST_DELAY", "0.25"))
+DEFAULT_CACHE_PATH = os.getenv("CRAWL_CACHE_PATH", os.path.join("chroma_store", "crawl_cache.sqlite"))
+USER_AGENT = "DevHelperAI-Crawler/1.0"
+
+BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "svg", "iframe",
+                    "nav", "footer", "aside", "form", "button")
+BOILERPLATE_RE = re.compile(r"(^|[-_ ])(nav|navbar|menu|sidebar|footer|breadcrumbs?|cookie|banner|toc)($|[-_ ])", re.I)
+MAIN_SELECTORS = ("main", "article", "[role=main]", "#content", ".content", "#main", ".main", ".markdown-body")
+SKIP_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".pdf", ".zip", ".gz", ".tar",
+                   ".mp4", ".mp3", ".woff", ".woff2", ".ttf", ".css", ".js", ".xml", ".json")
+
+def extract_main_content(html: str, url: str):
+    """
+    Returns (title, text, links) of a page: text of its main content with
+    navigation, headers, footers and scripts removed, and the absolute,
+    fragment-free links found anywhere on it.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        link = urldefrag(urljoin(url, anchor["href"].strip()))[0]
+        if link.startswith(("http://", "https://")):
+            links.append(link)
+
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    # Site headers go, but an article's own <header> (its title) stays
+    for tag in soup("header"):
+        if not tag.find_parent(("main", "article")):
+            tag.decompose()
+    for tag in soup.find_all(attrs={"class": BOILERPLATE_RE}) + soup.find_all(id=BOILERPLATE_RE):
+        if tag.name not in ("html", "body", "main", "article") and not tag.decomposed:
+            tag.decompose()
+
+    root = None
+    for selector in MAIN_SELECTORS:
+        root = soup.select_one(selector)
+        if root is not None and root.get_text(strip=True):
+            break
+        root = None
+    root = root or soup.body or soup
+    lines = (line.strip() for line in root.get_text("\n").splitlines())
+    text = "\n".join(line for line in lines if line)
+    return title, text, list(dict.fromkeys(links))
+
+class PageCache:
+    """
+    Validators and extracted content of crawled pages, so a re-crawl sends
+    conditional GETs (If-None-Match / If-Modified-Since) and reuses the
+    stored text and links on a 304.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, title TEXT, "
+            "text TEXT NOT NULL, links TEXT NOT NULL, fetched REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, title, text, links FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, title, text, links = row
+        return {"etag": etag, "last_modified": last_modified, "title": title,
+                "text": text, "links": json.loads(links)}
+
+    def put(self, url, etag, last_modified, title, text, links):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, title, text, links, fetched) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, title, text, json.dumps(links), time.time())
+            )
+            self._conn.commit()
+
+def get_page_cache(path=DEFAULT_CACHE_PATH) -> PageCache:
+    """
+    Returns the process-wide page cache for a path (pooled, so crawls
+    share one connection).
+    """
+    return get_resource_pool().get_or_create(("page_cache", path), lambda: PageCache(path))
+
+def _origin(url):
+    parts = urlparse(url)
+    return parts.scheme, parts.netloc.lower()
+
+def _fetch(session, url, headers):
+    return session.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+
+class _Politeness:
+    """
+    Per-host request spacing (host_delay, or the site's robots.txt
+    Crawl-delay if longer) and robots.txt rules.
+    """
+
+    def __init__(self, session, host_delay, respect_robots):
+        self.session = session
+        self.host_delay = host_delay
+        self.respect_robots = respect_robots
+        self._hosts = {}  # netloc -> {"lock", "next", "robots"}
+
+    async def _host(self, url):
+        scheme, netloc = _origin(url)
+        host = self._hosts.get(netloc)
+        if host is not None:
+            await host["ready"].wait()
+            return host
+        host = self._hosts[netloc] = {"lock": asyncio.Lock(), "ready": asyncio.Event(), "next": 0.0,
+                                      "robots": None, "delay": self.host_delay}
+        try:
+            if self.respect_robots:
+                robots = RobotFileParser(f"{scheme}://{netloc}/robots.txt")
+                response = await asyncio.to_thread(_fetch, self.session, robots.url, {"User-Agent": USER_AGENT})
+                if response.status_code == 200:
+                    robots.parse(response.text.splitlines())
+                    host["robots"] = robots
+                    host["delay"] = max(self.host_delay, float(robots.crawl_delay(USER_AGENT) or 0))
+        except Exception:
+            pass  # no readable robots.txt: everything is allowed
+        finally:
+            host["ready"].set()
+        return host
+
+    async def allowed(self, url):
+        host = await self._host(url)
+        return host["robots"] is None or host["robots"].can_fetch(USER_AGENT, url)
+
+    async def wait(self, url):
+        host = await self._host(url)
+        async with host["lock"]:
+            delay = host["next"] - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            host["next"] = time.monotonic() + host["delay"]
+
+async def _crawl(start_url, max_depth, max_pages, concurrency, session, cache, politeness, stats):
+    origin = _origin(start_url)
+    queue = asyncio.Queue()
+    seen = {start_url}
+    pages = {}
+    queue.put_nowait((start_url, 0))
+
+    def enqueue(links, depth):
+        for link in links:
+            if len(seen) >= max_pages:
+                return
+            if link in seen or _origin(link) != origin or urlparse(link).path.lower().endswith(SKIP_EXTENSIONS):
+                continue
+            seen.add(link)
+            queue.put_nowait((link, depth))
+
+    async def visit(url, depth):
+        if not await politeness.allowed(url):
+            stats["skipped_robots"] += 1
+            return
+        cached = cache.get(url) if cache else None
+        headers = {"User-Agent": USER_AGENT}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        await politeness.wait(url)
+        response = await asyncio.to_thread(_fetch, session, url, headers)
+        if response.status_code == 304 and cached:
+            stats["not_modified"] += 1
+            title, text, links = cached["title"], cached["text"], cached["links"]
+        elif response.status_code == 200:
+            if "html" not in response.headers.get("Content-Type", "text/html"):
+                stats["skipped_non_html"] += 1
+                return
+            stats["fetched"] += 1
+            title, text, links = await asyncio.to_thread(extract_main_content, response.text, response.url or url)
+            if cache:
+                cache.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), title, text, links)
+        else:
+            stats["failed"] += 1
+            return
+        if text:
+            pages[url] = Document(page_content=text, metadata={"source": url, "title": title})
+        if depth < max_depth:
+            enqueue(links, depth + 1)
+
+    async def worker():
+        while True:
+            url, depth = await queue.get()
+            try:
+                await visit(url, depth)
+            except Exception:
+                stats["failed"] += 1
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    await queue.join()
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    # Discovery order varies with timing; return pages in a stable order
+    return [pages[url] for url in sorted(pages)]
+
+def crawl_site(start_url: str, max_depth: int = DEFAULT_MAX_DEPTH, max_pages: int = DEFAULT_MAX_PAGES,
+               concurrency: int = DEFAULT_CONCURRENCY, host_delay: float = DEFAULT_HOST_DELAY,
+               session=None, cache=None, respect_robots: bool = True, return_stats: bool = False):
+    """
+    Crawls a website from start_url as Documents (one per page, main content only).
+    - Follows same-origin links up to max_depth hops and max_pages pages.
+    - Up to concurrency requests in flight over a pooled session, spaced
+      host_delay seconds apart per host; robots.txt is honoured.
+    - cache (a PageCache, default: shared on-disk cache; False to disable)
+      turns re-crawls into conditional GETs, so unchanged pages are not
+      downloaded again.
+    - return_stats=True returns (docs, stats) instead of docs.
+    """
+    session = session or http_session()
+    if cache is None:
+        cache = get_page_cache()
+    stats = {"fetched": 0, "not_modified": 0, "failed": 0, "skipped_robots": 0, "skipped_non_html": 0}
+    politeness = _Politeness(session, host_delay, respect_robots)
+    with metrics.span("crawl"):
+        docs = asyncio.run(_crawl(urldefrag(start_url)[0], max_depth, max_pages, concurrency,
+                                  session, cache or None, politeness, stats))
+    stats["pages"] = len(docs)
+    metrics.count("pages_fetched", stats["fetched"])
+    metrics.count("pages_not_modified", stats["not_modified"])
+    return (docs, stats) if return_stats else docs
@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+from langchain_core.documents import Document
+
+DEDUP_INDEX_FILE = "devhelper_dedup.json"
+DEFAULT_DEDUP = os.getenv("DEDUP", "1") == "1"
+# Estimated Jaccard similarity of 5-word shingles above which two chunks are near-duplicates
+DEFAULT_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+SHINGLE_SIZE = 5
+MIN_SHINGLES = 10        # shorter chunks are only deduplicated when identical
+NUM_PERM = 64
+BANDS = 16               # LSH bands of NUM_PERM // BANDS rows each
+PRIME = (1 << 31) - 1
+DUPLICATE_SEPARATOR = "\n"
+
+WORD_RE = re.compile(r"\S+")
+
+def _permutations():
+    import numpy as np
+    rng = np.random.default_rng(1)
+    return (rng.integers(1, PRIME, NUM_PERM, dtype=np.uint64),
+            rng.integers(0, PRIME, NUM_PERM, dtype=np.uint64))
+
+_PERMUTATIONS = None
+
+def exact_hash(text: str) -> str:
+    """
+    Hash of a chunk's text with whitespace runs collapsed, so re-indented
+    copies (e.g. license headers) count as identical.
+    """
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8", errors="replace")).hexdigest()
+
+def minhash(text: str):
+    """
+    NUM_PERM-value MinHash signature (uint32 array) of a chunk's 5-word
+    shingles, or None for chunks with fewer than MIN_SHINGLES shingles.
+    """
+    global _PERMUTATIONS
+    import numpy as np
+    words = WORD_RE.findall(text)
+    if len(words) - SHINGLE_SIZE + 1 < MIN_SHINGLES:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    if _PERMUTATIONS is None:
+        _PERMUTATIONS = _permutations()
+    a, b = _PERMUTATIONS
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8", errors="replace")) for s in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    # (a * x + b) mod PRIME stays below 2^63 for 32-bit x
+    return ((hashes[:, None] * a + b) % PRIME).min(axis=0).astype(np.uint32)
+
+def _bands(signature):
+    rows = NUM_PERM // BANDS
+    return [f"{band}:{signature[band * rows:(band + 1) * rows].tobytes().hex()}" for band in range(BANDS)]
+
+def _signature(hex_string):
+    import numpy as np
+    return np.frombuffer(bytes.fromhex(hex_string), dtype=np.uint32) if hex_string else None
+
+def _location(doc: Document):
+    return {key: value for key, value in doc.metadata.items()
+            if key != "duplicate_sources" and isinstance(value, (str, int, float, bool))}
+
+def cited_sources(doc: Document):
+    """
+    Every source a retrieved chunk stands for: its own plus those of the
+    duplicate chunks dropped in its favour.
+    """
+    extra = doc.metadata.get("duplicate_sources") or ""
+    return list(dict.fromkeys([doc.metadata.get("source", "")] + [s for s in extra.split(DUPLICATE_SEPARATOR) if s]))
+
+class DedupIndex:
+    """
+    Exact hashes and MinHash/LSH signatures of the chunks a store keeps, and
+    the duplicate chunks dropped in favour of each; persisted next to the
+    store and kept in step with it by chunk ID.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.chunks = {}        # kept chunk_id -> {"hash", "signature", "duplicates": {chunk_id: {"bytes", "metadata"}}}
+        self.hashes = {}        # exact hash -> kept chunk_id
+        self.buckets = {}       # LSH band key -> set(kept chunk_id)
+        self.duplicate_of = {}  # dropped chunk_id -> kept chunk_id
+
+    def _insert(self, chunk_id, entry):
+        self.chunks[chunk_id] = entry
+        self.hashes.setdefault(entry["hash"], chunk_id)
+        signature = _signature(entry["signature"])
+        if signature is not None:
+            for key in _bands(signature):
+                self.buckets.setdefault(key, set()).add(chunk_id)
+        for dup_id in entry["duplicates"]:
+            self.duplicate_of[dup_id] = chunk_id
+
+    def _unlink(self, chunk_id):
+        entry = self.chunks.pop(chunk_id)
+        if self.hashes.get(entry["hash"]) == chunk_id:
+            del self.hashes[entry["hash"]]
+        signature = _signature(entry["signature"])
+        if signature is not None:
+            for key in _bands(signature):
+                ids = self.buckets.get(key)
+                if ids is not None:
+                    ids.discard(chunk_id)
+                    if not ids:
+                        del self.buckets[key]
+        return entry
+
+    def _near(self, signature):
+        best, best_score = None, self.threshold
+        candidates = set()
+        for key in _bands(signature):
+            candidates.update(self.buckets.get(key, ()))
+        for chunk_id in sorted(candidates):
+            score = float((_signature(self.chunks[chunk_id]["signature"]) == signature).mean())
+            if score >= best_score:
+                best, best_score = chunk_id, score
+        return best
+
+    def match(self, chunk_id: str, doc: Document):
+        """
+        Registers a chunk about to be stored. Returns (kept_id, kind): the
+        kept chunk it duplicates and "exact" or "near", in which case it is
+        recorded as that chunk's duplicate and must not be stored; or
+        (None, None) for a new chunk, which is now kept.
+        """
+        digest = exact_hash(doc.page_content)
+        kept_id, kind = self.hashes.get(digest), "exact"
+        signature = None
+        if kept_id is None:
+            signature = minhash(doc.page_content)
+            kept_id, kind = (self._near(signature), "near") if signature is not None and self.threshold else (None, None)
+        if kept_id is None:
+            self._insert(chunk_id, {"hash": digest, "duplicates": {},
+                                    "signature": signature.tobytes().hex() if signature is not None else None})
+            return None, None
+        duplicate = {"kind": kind, "bytes": len(doc.page_content.encode("utf-8", errors="replace")),
+                     "metadata": _location(doc)}
+        if kind == "near":
+            # Its text differs from the kept chunk's: keep it, to store if the kept chunk goes away
+            duplicate["text"] = doc.page_content
+        self.chunks[kept_id]["duplicates"][chunk_id] = duplicate
+        self.duplicate_of[chunk_id] = kept_id
+        return kept_id, kind
+
+    def remove(self, chunk_ids):
+        """
+        Forgets chunks. Duplicates of a removed kept chunk that are not
+        removed too must now be stored themselves: returns [(chunk_id,
+        old_id, text, metadata)] for the caller to store.
+        - An exact duplicate takes over the kept chunk: text is None, store
+          old_id's text (an embedding cache hit, not a new embedding).
+        - Otherwise each near duplicate is matched again and, if it is new,
+          returned with its own text (old_id is None).
+        - Near duplicates recorded without their text are returned with
+          neither; the caller re-chunks their file.
+        """
+        removed = set(chunk_ids)
+        for chunk_id in removed:
+            kept_id = self.duplicate_of.pop(chunk_id, None)
+            if kept_id is not None:
+                self.chunks[kept_id]["duplicates"].pop(chunk_id, None)
+        restored = []
+        for chunk_id in chunk_ids:
+            if chunk_id not in self.chunks:
+                continue
+            entry = self._unlink(chunk_id)
+            duplicates = {dup_id: dup for dup_id, dup in entry["duplicates"].items() if dup_id not in removed}
+            for dup_id in duplicates:
+                del self.duplicate_of[dup_id]
+            exact = [dup_id for dup_id, dup in duplicates.items() if dup.get("kind") == "exact"]
+            if exact:
+                new_id = exact[0]
+                metadata = duplicates.pop(new_id)["metadata"]
+                self._insert(new_id, {"hash": entry["hash"], "signature": entry["signature"], "duplicates": duplicates})
+                restored.append((new_id, chunk_id, None, metadata))
+                continue
+            for dup_id, dup in duplicates.items():
+                if "text" not in dup:
+                    restored.append((dup_id, None, None, dup["metadata"]))
+                elif self.match(dup_id, Document(page_content=dup["text"], metadata=dup["metadata"]))[0] is None:
+                    restored.append((dup_id, None, dup["text"], dup["metadata"]))
+        return restored
+
+    def forget(self, chunk_id: str):
+        """
+        Drops a kept chunk together with its duplicates, without handing
+        over. Returns the metadata of the duplicates.
+        """
+        if chunk_id not in self.chunks:
+            return []
+        duplicates = self._unlink(chunk_id)["duplicates"]
+        for dup_id in duplicates:
+            self.duplicate_of.pop(dup_id, None)
+        return [dup["metadata"] for dup in duplicates.values()]
+
+    def annotate(self, docs):
+        """
+        Sets metadata["duplicate_sources"] on retrieved chunks: the other
+        sources (newline-separated) of the duplicates dropped in their favour.
+        """
+        for doc in docs:
+            entry = self.chunks.get(doc.id) if doc.id else None
+            if not entry or not entry["duplicates"]:
+                continue
+            own = doc.metadata.get("source", "")
+            sources = dict.fromkeys(dup["metadata"].get("source", "") for dup in entry["duplicates"].values())
+            doc.metadata["duplicate_sources"] = DUPLICATE_SEPARATOR.join(s for s in sources if s and s != own)
+        return docs
+
+    def stats(self):
+        duplicates = [dup for entry in self.chunks.values() for dup in entry["duplicates"].values()]
+        return {"kept": len(self.chunks), "duplicates": len(duplicates),
+                "bytes_saved": sum(dup["bytes"] for dup in duplicates)}
+
+    def save(self, persist_path: str):
+        os.makedirs(persist_path, exist_ok=True)
+        path = os.path.join(persist_path, DEDUP_INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"threshold": self.threshold, "chunks": self.chunks}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, persist_path: str):
+        """
+        Loads the dedup index of a store; returns None if the store has none.
+        """
+        path = os.path.join(persist_path, DEDUP_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        index = cls(threshold=data.get("threshold", DEFAULT_THRESHOLD))
+        for chunk_id, entry in data.get("chunks", {}).items():
+            index._insert(chunk_id, entry)
+        return index
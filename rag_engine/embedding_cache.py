@@ -0,0 +1,183 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from langchain_core.embeddings import Embeddings
+from rag_engine import metrics
+
+DEFAULT_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("chroma_store", "embedding_cache.sqlite"))
+DEFAULT_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def _key(namespace: str, text: str) -> str:
+    return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8", errors="replace")).hexdigest()
+
+def _as_float32(vector):
+    # Round-trip through float32 so fresh and cached vectors are identical.
+    return array("f", vector).tolist()
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding cache backed by SQLite.
+    - Keyed by (embedding engine/model, hash of text), so it is shared by every
+      store regardless of source or chunk settings.
+    - Size-bounded: least recently used vectors are evicted past max_bytes.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, namespace: str, texts):
+        """
+        Returns a list aligned with texts: the cached vector, or None on a miss.
+        """
+        keys = [_key(namespace, t) for t in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})",
+                        [time.time()] + batch
+                    )
+            self._conn.commit()
+
+        vectors = []
+        for key in keys:
+            blob = found.get(key)
+            if blob is None:
+                self.misses += 1
+                vectors.append(None)
+            else:
+                self.hits += 1
+                vectors.append(array("f", blob).tolist())
+        return vectors
+
+    def put_many(self, namespace: str, texts, vectors):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = array("f", vector).tobytes()
+            rows.append((_key(namespace, text), blob, len(blob), now))
+        with self._lock:
+            for key, _, size, _ in rows:
+                old = self._conn.execute("SELECT size FROM embeddings WHERE key = ?", (key,)).fetchone()
+                self._total_bytes -= old[0] if old else 0
+                self._total_bytes += size
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Evict down to 90% of the budget so we don't evict on every insert.
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_used ASC LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+            freed = 0
+            dropped = []
+            for key, size in rows:
+                if self._total_bytes - freed <= target:
+                    break
+                dropped.append((key,))
+                freed += size
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", dropped)
+            self._total_bytes -= freed
+        self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": self._total_bytes,
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+def get_embedding_cache(path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES) -> EmbeddingCache:
+    """
+    Returns the process-wide cache for a path (one SQLite connection per file).
+    """
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(path, max_bytes=max_bytes)
+        return _caches[path]
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps a LangChain embeddings object so only texts the cache has never
+    seen are sent to the provider.
+    """
+
+    def __init__(self, underlying: Embeddings, namespace: str, cache: EmbeddingCache = None):
+        self.underlying = underlying
+        self.namespace = namespace
+        self.cache = cache or get_embedding_cache()
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        with metrics.span("embedding_cache"):
+            vectors = self.cache.get_many(self.namespace, texts)
+            missing = {}
+            for i, (text, vector) in enumerate(zip(texts, vectors)):
+                if vector is None:
+                    missing.setdefault(text, []).append(i)
+            metrics.count("embedding_cache_hits", len(texts) - sum(len(idx) for idx in missing.values()))
+            metrics.count("embedding_cache_misses", sum(len(idx) for idx in missing.values()))
+            if missing:
+                new_texts = list(missing)
+                new_vectors = [_as_float32(v) for v in self.underlying.embed_documents(new_texts)]
+                self.cache.put_many(self.namespace, new_texts, new_vectors)
+                for text, vector in zip(new_texts, new_vectors):
+                    for i in missing[text]:
+                        vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text):
+        namespace = self.namespace + ":query"
+        with metrics.span("embedding_cache"):
+            vector = self.cache.get_many(namespace, [text])[0]
+            metrics.count("embedding_cache_hits" if vector is not None else "embedding_cache_misses")
+            if vector is None:
+                vector = _as_float32(self.underlying.embed_query(text))
+                self.cache.put_many(namespace, [text], [vector])
+        return vector
@@ -0,0 +1,215 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.embeddings import Embeddings
+from rag_engine import metrics
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+
+DEFAULT_MODELS = {
+    "openai": os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002"),
+    "ollama": os.getenv("OLLAMA_EMBEDDING_MODEL", "llama3"),
+}
+
+class RetryableEmbeddingError(Exception):
+    """
+    Raised for failures worth retrying (429, 5xx, timeouts).
+    retry_after is the server's hint in seconds, if it sent one.
+    """
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English and code; good enough for batching.
+    return len(text) // 4 + 1
+
+def _session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _refused(error):
+    """
+    True when no connection could be opened at all (server not running,
+    unknown host), as opposed to one that dropped mid-request.
+    """
+    from urllib3.exceptions import NewConnectionError
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+def _post(session, url, payload, headers=None, timeout=60):
+    try:
+        response = session.post(url, json=payload, headers=headers, timeout=timeout)
+    except requests.Timeout as e:
+        raise RetryableEmbeddingError(f"Embedding request failed: {e}")
+    except requests.ConnectionError as e:
+        if _refused(e):
+            # Retrying a server that isn't running only delays the error
+            raise ConnectionError(f"❌ Cannot reach the embedding server at {url}. Is it running?") from e
+        raise RetryableEmbeddingError(f"Embedding request failed: {e}")
+    if response.status_code == 429 or response.status_code >= 500:
+        retry_after = response.headers.get("Retry-After")
+        try:
+            retry_after = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            retry_after = None
+        raise RetryableEmbeddingError(f"Embedding API returned {response.status_code}", retry_after)
+    if response.status_code != 200:
+        raise ValueError(f"❌ Embedding API error {response.status_code}: {response.text[:200]}")
+    return response.json()
+
+class OpenAIEmbeddingClient:
+    """
+    Minimal client for the OpenAI /embeddings endpoint (or any compatible server).
+    """
+    def __init__(self, model=None, api_key=None, base_url=None, timeout=60, pool_size=8):
+        self.model = model or DEFAULT_MODELS["openai"]
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = (base_url or OPENAI_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.session = _session(pool_size)
+
+    def embed(self, texts):
+        data = _post(
+            self.session,
+            f"{self.base_url}/embeddings",
+            {"model": self.model, "input": list(texts)},
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=self.timeout,
+        )
+        rows = sorted(data["data"], key=lambda row: row["index"])
+        return [row["embedding"] for row in rows]
+
+class OllamaEmbeddingClient:
+    """
+    Minimal client for Ollama's batch /api/embed endpoint.
+    """
+    def __init__(self, model=None, base_url=None, timeout=120, pool_size=8):
+        self.model = model or DEFAULT_MODELS["ollama"]
+        self.base_url = (base_url or OLLAMA_HOST).rstrip("/")
+        self.timeout = timeout
+        self.session = _session(pool_size)
+
+    def embed(self, texts):
+        data = _post(
+            self.session,
+            f"{self.base_url}/api/embed",
+            {"model": self.model, "input": list(texts)},
+            timeout=self.timeout,
+        )
+        return data["embeddings"]
+
+class ParallelEmbeddings(Embeddings):
+    """
+    Embeds texts in token-sized batches, several batches at a time.
+    - Batches are cut at max_batch_tokens (estimated) or max_batch_size texts.
+    - 429s, 5xx, timeouts and dropped connections are retried with
+      exponential backoff. A 429 pauses every worker (honouring Retry-After),
+      not just the one that hit it.
+    - A server that refuses connections fails at once (ConnectionError).
+    - Only a batch that still fails after max_retries fails the call, with
+      RetryableEmbeddingError; sync_chroma then skips those files and
+      carries on (see vector_store).
+    """
+
+    def __init__(self, client, max_workers=4, max_batch_tokens=8000, max_batch_size=256,
+                 max_retries=6, backoff=1.0, max_backoff=60.0):
+        self.client = client
+        self.model = client.model
+        self.max_workers = max_workers
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+
+    def _batches(self, texts):
+        batches, current, tokens = [], [], 0
+        for i, text in enumerate(texts):
+            cost = estimate_tokens(text)
+            if current and (tokens + cost > self.max_batch_tokens or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(i)
+            tokens += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _wait_for_pause(self):
+        with self._lock:
+            delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _embed_with_retry(self, texts):
+        attempt = 0
+        while True:
+            self._wait_for_pause()
+            try:
+                return self.client.embed(texts)
+            except RetryableEmbeddingError as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = e.retry_after
+                if delay is None:
+                    delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                with self._lock:
+                    self.retries += 1
+                    self._pause_until = max(self._pause_until, time.monotonic() + delay)
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        batches = self._batches(texts)
+        vectors = [None] * len(texts)
+        workers = max(1, min(self.max_workers, len(batches)))
+        retries = self.retries
+        with metrics.span("embed"), ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(lambda idx: self._embed_with_retry([texts[i] for i in idx]), batches)
+            for idx, batch_vectors in zip(batches, results):
+                for i, vector in zip(idx, batch_vectors):
+                    vectors[i] = vector
+        # Counted here, in the caller's thread, so they land in its trace
+        metrics.count("embedding_requests", len(batches))
+        metrics.count("embedding_texts", len(texts))
+        metrics.count("embedding_tokens", sum(estimate_tokens(t) for t in texts))
+        metrics.count("embedding_retries", self.retries - retries)
+        return vectors
+
+    def embed_query(self, text):
+        with metrics.span("embed"):
+            vector = self._embed_with_retry([text])[0]
+        metrics.count("embedding_requests")
+        metrics.count("embedding_texts")
+        metrics.count("embedding_tokens", estimate_tokens(text))
+        return vector
+
+def make_embeddings(engine: str, model: str = None, max_workers: int = None):
+    """
+    Builds the parallel embedding executor for an engine ('openai' or 'ollama').
+    """
+    max_workers = max_workers or int(os.getenv("EMBEDDING_WORKERS", "4"))
+    if engine == "openai":
+        client = OpenAIEmbeddingClient(model=model, pool_size=max_workers)
+        if not client.api_key:
+            raise ValueError("❌ OPENAI_API_KEY is not set.")
+        return ParallelEmbeddings(client, max_workers=max_workers)
+    if engine == "ollama":
+        # Local Ollama serves one model at a time; keep concurrency modest.
+        client = OllamaEmbeddingClient(model=model, pool_size=max_workers)
+        return ParallelEmbeddings(client, max_workers=min(max_workers, 2), max_batch_tokens=4000)
+    raise ValueError("Unknown embedding engine: choose 'openai' or 'ollama'.")
@@ -0,0 +1,152 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, List
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from rag_engine.resource_pool import get_resource_pool
+from rag_engine.lexical_index import cosine_search
+from rag_engine import metrics
+
+DEFAULT_TIMEOUT = float(os.getenv("FEDERATED_TIMEOUT", "10"))
+DEFAULT_WORKERS = int(os.getenv("FEDERATED_WORKERS", "8"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """
+    Process-wide pool for store queries. Not a with-block per query: a store
+    that times out keeps its thread until it finishes, and the query must
+    not wait for it.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, DEFAULT_WORKERS), thread_name_prefix="federated")
+        return _executor
+
+def _scored(retriever, query: str, k: int):
+    """
+    A store's results as [(doc, score)], best first.
+    - Hybrid retrievers score their own fusion (see HybridRetriever.scored).
+    - Plain vector retrievers score cosine similarity, whatever the backend.
+    - Anything else is scored by rank.
+    """
+    if hasattr(retriever, "scored"):
+        return retriever.scored(query)
+    vectordb = getattr(retriever, "vectorstore", None)
+    if vectordb is not None:
+        return cosine_search(vectordb, query, k)
+    return [(doc, 1.0 / (rank + 1)) for rank, doc in enumerate(retriever.invoke(query))]
+
+class FederatedRetriever(BaseRetriever):
+    """
+    Queries several stores at once and merges their results by score
+    (cosine similarity to the query), so one question can span a service
+    repo, its client library and its docs site without a merged store.
+    - stores: [{"label", "retriever", "timeout" (optional)}]; each store
+      embeds the query with its own engine.
+    - Stores run in parallel; one that errors or runs past its timeout
+      (default FEDERATED_TIMEOUT seconds, counted from when its query
+      starts running) is left out of the answer, so a question takes about
+      as long as the slowest store that answers. A store still queued
+      behind busy workers after its timeout is cancelled; one that gets to
+      run has its full timeout.
+    - Each result carries its store's label in metadata["store"].
+    """
+
+    stores: List[Any]
+    k: int = 4
+    timeout: float = DEFAULT_TIMEOUT
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        executor = _get_executor()
+        started = {}  # position -> monotonic time its query started running
+
+        def run(position, retriever):
+            started[position] = time.monotonic()
+            return _scored(retriever, query, self.k)
+
+        submitted = time.monotonic()
+        futures = {executor.submit(run, position, store["retriever"]): position
+                   for position, store in enumerate(self.stores)}
+        pending = set(futures)
+        merged = []
+        while pending:
+            now = time.monotonic()
+            deadlines = []
+            for future in list(pending):
+                position = futures[future]
+                store = self.stores[position]
+                if future.done():
+                    pending.discard(future)
+                    try:
+                        results = future.result()
+                    except Exception:
+                        metrics.count("federated_errors")
+                        continue
+                    for rank, (doc, score) in enumerate(results):
+                        doc.metadata["store"] = store["label"]
+                        merged.append((-score, rank, position, doc))
+                    continue
+                deadline = started.get(position, submitted) + (store.get("timeout") or self.timeout)
+                if now >= deadline:
+                    future.cancel()
+                    pending.discard(future)
+                    metrics.count("federated_timeouts")
+                    continue
+                deadlines.append(deadline)
+            if pending:
+                wait(pending, timeout=min(deadlines) - now, return_when=FIRST_COMPLETED)
+        merged.sort(key=lambda item: item[:3])
+        return [doc for _, _, _, doc in merged[:self.k]]
+
+def store_key(path):
+    """
+    Pool key of the store at path, opened with the engine it was built with.
+    """
+    from rag_engine.store_manager import read_store_info
+    return ("store", path, read_store_info(path).get("engine") or "openai")
+
+def load_federated_retriever(store_paths, k: int = 4, timeout: float = None):
+    """
+    Federated retriever over existing stores (paths under the store root).
+    Each store opens with the embedding engine it was built with (pooled
+    like a single store) and is labelled with the source it was built from.
+    """
+    from rag_engine.vector_store import load_chroma, load_retriever
+    from rag_engine.store_manager import read_store_info
+    from rag_engine.utils import directory_size
+    pool = get_resource_pool()
+    stores = []
+    for path in store_paths:
+        if not os.path.isdir(path):
+            raise ValueError(f"❌ No store at {path}")
+        info = read_store_info(path)
+        key = store_key(path)
+        engine = key[2]
+        vectordb = pool.get_or_create(
+            key,
+            lambda: load_chroma(path, embedding_engine=engine),
+            size=lambda _: directory_size(path)
+        )
+        name = os.path.basename(os.path.normpath(path))
+        label = info.get("source") or name
+        if any(store["label"] == label for store in stores):
+            label = f"{label} ({name})"  # same source indexed with other chunk settings
+        stores.append({"label": label, "path": path, "vectordb": vectordb,
+                       "retriever": load_retriever(vectordb, path, k=k)})
+    return FederatedRetriever(stores=stores, k=k, timeout=DEFAULT_TIMEOUT if timeout is None else timeout)
+
+def federation_key(store_paths):
+    """
+    (db_name, store_version) of a set of stores for the answer cache: the
+    same stores in any order share cached answers, which go stale as soon
+    as any of them changes.
+    """
+    from rag_engine.vector_store import store_version
+    paths = sorted(store_paths, key=lambda p: os.path.basename(os.path.normpath(p)))
+    return ("+".join(os.path.basename(os.path.normpath(p)) for p in paths),
+            "+".join(store_version(p) for p in paths))
@@ -0,0 +1,277 @@
+import os
+import re
+import json
+import math
+from collections import Counter
+from typing import Any, List
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+LEXICAL_INDEX_FILE = "devhelper_lexical.json"
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*")
+SUBWORD_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+SYMBOL_RES = (
+    # Python
+    re.compile(r"^\s*(?:async\s+)?def\s+([A-Za-z_]\w*)|^\s*class\s+([A-Za-z_]\w*)", re.M),
+    # JavaScript / TypeScript
+    re.compile(
+        r"\bfunction\s*\*?\s*([A-Za-z_$][\w$]*)"
+        r"|\bclass\s+([A-Za-z_$][\w$]*)"
+        r"|\b(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)"
+    ),
+)
+BACKTICK_RE = re.compile(r"`([^`]+)`")
+CALL_RE = re.compile(r"([A-Za-z_$][A-Za-z0-9_$]*)\(\)")
+
+def tokenize(text: str):
+    """
+    Lowercased terms: each identifier as a whole plus its snake/camel parts,
+    so `clone_github_repo` matches both the exact name and "github repo".
+    """
+    terms = []
+    for ident in IDENTIFIER_RE.findall(text):
+        lowered = ident.lower()
+        terms.append(lowered)
+        parts = [p.lower() for p in SUBWORD_RE.findall(ident)]
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+def extract_symbols(text: str):
+    """
+    Names of functions/classes defined in a chunk.
+    """
+    names = set()
+    for pattern in SYMBOL_RES:
+        for match in pattern.finditer(text):
+            names.update(group for group in match.groups() if group)
+    return sorted(names)
+
+def _looks_like_code(token: str) -> bool:
+    return "_" in token or any(c.isupper() for c in token[1:])
+
+def query_identifiers(query: str):
+    """
+    Identifiers a query names explicitly: `backticked`, called() or
+    code-shaped tokens.
+    """
+    idents = set()
+    for quoted in BACKTICK_RE.findall(query):
+        idents.update(IDENTIFIER_RE.findall(quoted))
+    idents.update(CALL_RE.findall(query))
+    idents.update(t for t in IDENTIFIER_RE.findall(query) if _looks_like_code(t))
+    return idents
+
+def _is_readme(source: str) -> bool:
+    return "readme" in source.lower()
+
+class LexicalIndex:
+    """
+    In-process BM25 inverted index plus a symbol index (function/class name ->
+    defining chunks), persisted next to the Chroma store and kept in step
+    with it by chunk ID.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, readme_boost=1.5):
+        self.k1 = k1
+        self.b = b
+        self.readme_boost = readme_boost
+        self.chunks = {}     # chunk_id -> {"source", "length", "tf", "symbols"}
+        self.postings = {}   # term -> set(chunk_id)
+        self.symbols = {}    # symbol -> set(chunk_id)
+        self.total_length = 0
+
+    def add(self, chunk_id: str, doc: Document):
+        if chunk_id in self.chunks:
+            self.remove([chunk_id])
+        terms = tokenize(doc.page_content)
+        entry = {
+            "source": doc.metadata.get("source", ""),
+            "length": len(terms),
+            "tf": dict(Counter(terms)),
+            "symbols": extract_symbols(doc.page_content),
+        }
+        self._insert(chunk_id, entry)
+
+    def _insert(self, chunk_id, entry):
+        self.chunks[chunk_id] = entry
+        self.total_length += entry["length"]
+        for term in entry["tf"]:
+            self.postings.setdefault(term, set()).add(chunk_id)
+        for name in entry["symbols"]:
+            self.symbols.setdefault(name, set()).add(chunk_id)
+
+    def remove(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            entry = self.chunks.pop(chunk_id, None)
+            if entry is None:
+                continue
+            self.total_length -= entry["length"]
+            for term in entry["tf"]:
+                ids = self.postings.get(term)
+                if ids is not None:
+                    ids.discard(chunk_id)
+                    if not ids:
+                        del self.postings[term]
+            for name in entry["symbols"]:
+                ids = self.symbols.get(name)
+                if ids is not None:
+                    ids.discard(chunk_id)
+                    if not ids:
+                        del self.symbols[name]
+
+    def _boost(self, chunk_id):
+        return self.readme_boost if _is_readme(self.chunks[chunk_id]["source"]) else 1.0
+
+    def search(self, query: str, k: int = 20):
+        """
+        BM25 top-k as [(chunk_id, score)], with README sources boosted.
+        """
+        n = len(self.chunks)
+        if not n:
+            return []
+        avg_len = self.total_length / n or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            ids = self.postings.get(term)
+            if not ids:
+                continue
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            for chunk_id in ids:
+                entry = self.chunks[chunk_id]
+                tf = entry["tf"][term]
+                norm = tf + self.k1 * (1 - self.b + self.b * entry["length"] / avg_len)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ranked = sorted(((cid, s * self._boost(cid)) for cid, s in scores.items()),
+                        key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+    def lookup_symbols(self, query: str):
+        """
+        IDs of chunks that define an identifier named in the query.
+        """
+        ids = []
+        for name in sorted(query_identifiers(query)):
+            ids.extend(sorted(self.symbols.get(name, ())))
+        return list(dict.fromkeys(ids))
+
+    def save(self, persist_path: str):
+        os.makedirs(persist_path, exist_ok=True)
+        path = os.path.join(persist_path, LEXICAL_INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"chunks": self.chunks}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, persist_path: str):
+        """
+        Loads the index of a store; returns None if the store has none.
+        """
+        path = os.path.join(persist_path, LEXICAL_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        index = cls()
+        for chunk_id, entry in data.get("chunks", {}).items():
+            index._insert(chunk_id, entry)
+        return index
+
+def cosine_search(vectordb, query: str, k: int):
+    """
+    [(doc, cosine similarity)] of a vector search, best first. Every backend
+    scores the same way, so hits from different stores can be merged:
+    memory-mapped stores score cosine themselves; Chroma's distances depend
+    on its metric, so its hits are scored from their stored vectors.
+    """
+    import numpy as np
+    embedding = vectordb.embeddings.embed_query(query)
+    if hasattr(vectordb, "similarity_search_by_vector_with_score"):  # MmapVectorStore
+        return vectordb.similarity_search_by_vector_with_score(embedding, k)
+    docs = vectordb.similarity_search_by_vector(embedding, k=k)
+    if not docs:
+        return []
+    found = vectordb.get(ids=[doc.id for doc in docs], include=["embeddings"])
+    vectors = dict(zip(found["ids"], found["embeddings"]))
+    matrix = np.asarray([vectors[doc.id] for doc in docs], dtype=np.float32)
+    query_vector = np.asarray(embedding, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+    scores = (matrix @ query_vector) / np.where(norms > 0, norms, 1.0)
+    return sorted(zip(docs, scores.tolist()), key=lambda item: -item[1])
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses BM25/symbol hits with vector hits by reciprocal rank fusion.
+    Queries naming an identifier the symbol index knows are answered from
+    the lexical side alone, without an embedding call.
+    With a dedup index, results cite the sources of their dropped duplicates.
+    """
+
+    vectordb: Any
+    index: Any
+    dedup: Any = None
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _fetch(self, chunk_ids):
+        if not chunk_ids:
+            return {}
+        found = self.vectordb.get(ids=list(chunk_ids))
+        return {
+            chunk_id: Document(id=chunk_id, page_content=text, metadata=meta or {})
+            for chunk_id, text, meta in zip(found["ids"], found["documents"], found["metadatas"])
+        }
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return [doc for doc, _ in self.scored(query)]
+
+    def scored(self, query: str):
+        """
+        Top-k as [(doc, score)], used to merge across stores; the order is
+        still the fused one.
+        - Vector hits score their cosine similarity to the query (see
+          cosine_search), which is comparable between stores, unlike ranks.
+        - BM25-only hits score the similarity of the weakest vector hit,
+          since vector search ranked them lower still.
+        - A chunk defining a named symbol scores 1.0; the BM25 hits after
+          it (no embedding call is made) score by rank, at most 0.5.
+        """
+        results = self._search(query)
+        if self.dedup is not None:
+            self.dedup.annotate([doc for doc, _ in results])
+        return results
+
+    def _search(self, query: str):
+        top_score = 2.0 / (self.rrf_k + 1)
+        symbol_ids = self.index.lookup_symbols(query)
+        lexical = self.index.search(query, self.fetch_k)
+
+        if symbol_ids:
+            ids = list(dict.fromkeys(symbol_ids + [cid for cid, _ in lexical]))[:self.k]
+            scores = {cid: 1.0 for cid in symbol_ids}
+            for rank, (chunk_id, _) in enumerate(lexical):
+                scores.setdefault(chunk_id, 1.0 / (self.rrf_k + rank + 1) / top_score)
+            docs = self._fetch(ids)
+            return [(docs[cid], scores[cid]) for cid in ids if cid in docs]
+
+        scores, vector_docs, relevance = {}, {}, {}
+        for rank, (chunk_id, _) in enumerate(lexical):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        for rank, (doc, similarity) in enumerate(cosine_search(self.vectordb, query, self.fetch_k)):
+            key = doc.id or f"{doc.metadata.get('source', '')}#{doc.metadata.get('chunk', rank)}"
+            vector_docs[key] = doc
+            relevance[key] = similarity
+            boost = self.index.readme_boost if _is_readme(doc.metadata.get("source", "")) else 1.0
+            scores[key] = scores.get(key, 0.0) + boost / (self.rrf_k + rank + 1)
+
+        top = sorted(scores, key=lambda cid: -scores[cid])[:self.k]
+        docs = dict(vector_docs)
+        docs.update(self._fetch([cid for cid in top if cid not in vector_docs]))
+        floor = min(relevance.values(), default=0.0)
+        return [(docs[cid], relevance.get(cid, floor)) for cid in top if cid in docs]
@@ -1,49 +1,148 @@
 import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from langchain_core.documents import Document
+from rag_engine import metrics
 
 VALID_EXTENSIONS = (".py", ".md", ".txt", ".js", ".ts", ".jsx", ".tsx", ".env", ".yaml", ".gitignore")
+DEFAULT_WORKERS = int(os.getenv("LOADER_WORKERS", "8"))
+
+def _looks_binary(head: bytes) -> bool:
+    return b'\x00' in head or head.startswith((b'\xff\xfe', b'\xfe\xff'))
 
 def is_binary(file_path):
     try:
         with open(file_path, 'rb') as f:
-            chunk = f.read(1024)
-            if b'\x00' in chunk or chunk.startswith((b'\xff\xfe', b'\xfe\xff')):
-                return True
+            return _looks_binary(f.read(1024))
     except:
         return True
-    return False
 
-def load_codebase(base_path: str, include_exts=None, exclude_dirs=None) -> List[Document]:
-    include_exts = include_exts or VALID_EXTENSIONS
-    exclude_dirs = [d.strip() for d in (exclude_dirs or []) if d.strip()]
-    docs = []
+def iter_source_files(base_path: str, include_exts=None, exclude_dirs=None, stats=None):
+    """
+    Yields matching file paths in deterministic order (files of a directory,
+    sorted, then its subdirectories). Excluded directories are pruned before
+    descending, so nothing under node_modules/.venv is ever listed.
+    """
+    include_exts = tuple(include_exts or VALID_EXTENSIONS)
+    excluded = {d.strip() for d in (exclude_dirs or []) if d.strip()}
+    stats = stats if stats is not None else {}
+    stack = [base_path]
 
-    for root, _, files in os.walk(base_path):
-        if any(part in root.split(os.sep) for part in exclude_dirs):
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
             continue
 
-        for file in files:
-            file_path = os.path.join(root, file)
-
-            if not file.lower().endswith(tuple(include_exts)):
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in excluded:
+                        stats["dirs_pruned"] = stats.get("dirs_pruned", 0) + 1
+                    else:
+                        subdirs.append(entry.path)
+                    continue
+            except OSError:
                 continue
+            stats["files_seen"] = stats.get("files_seen", 0) + 1
+            if entry.name.lower().endswith(include_exts):
+                yield entry.path
+        stack.extend(reversed(subdirs))
+
+def _read_source_file(file_path: str):
+    """
+    Reads a file once: sniffs the first KB for binary content, then decodes.
+    Returns (content, size, None) or (None, size, reason).
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+    except Exception as e:
+        return None, 0, str(e)
+    if _looks_binary(raw[:1024]):
+        return None, len(raw), "binary"
+    return raw.decode('utf-8', errors='replace'), len(raw), None
+
+def _new_stats():
+    return {"files_seen": 0, "dirs_pruned": 0, "files_loaded": 0,
+            "skipped_binary": 0, "skipped_error": 0, "bytes_read": 0}
 
-            if is_binary(file_path):
+def iter_codebase(base_path: str, include_exts=None, exclude_dirs=None,
+                  max_workers: int = DEFAULT_WORKERS, verbose: int = 1, stats=None):
+    """
+    Yields matching text files under base_path as Documents, reading files
+    on a thread pool. Order is deterministic regardless of worker count, and
+    only a bounded window of reads is in flight, so memory does not grow
+    with repo size.
+    - verbose: 0 = silent, 1 = summary line, 2 = one line per file.
+    - stats: optional dict filled in with load statistics.
+    Time spent walking and reading is recorded as the "load" stage.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(_new_stats())
+    return metrics.timed_iter("load", _iter_codebase(base_path, include_exts, exclude_dirs,
+                                                     max_workers, verbose, stats))
+
+def _iter_codebase(base_path, include_exts, exclude_dirs, max_workers, verbose, stats):
+    started = time.perf_counter()
+    paths = iter_source_files(base_path, include_exts, exclude_dirs, stats)
+    window = max(1, max_workers) * 4
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        in_flight = deque()
+        for file_path in paths:
+            in_flight.append((file_path, pool.submit(_read_source_file, file_path)))
+            if len(in_flight) >= window:
+                doc = _collect(base_path, *in_flight.popleft(), stats, verbose)
+                if doc is not None:
+                    yield doc
+        while in_flight:
+            doc = _collect(base_path, *in_flight.popleft(), stats, verbose)
+            if doc is not None:
+                yield doc
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    metrics.count("files_loaded", stats["files_loaded"])
+    metrics.count("files_skipped", stats["skipped_binary"], reason="binary")
+    metrics.count("files_skipped", stats["skipped_error"], reason="error")
+    metrics.count("bytes_read", stats["bytes_read"])
+    if verbose >= 1:
+        print(f"📄 Total documents loaded: {stats['files_loaded']} "
+              f"({stats['seconds']}s, {stats['dirs_pruned']} dirs pruned)")
+
+def _collect(base_path, file_path, future, stats, verbose):
+    content, size, error = future.result()
+    if content is None:
+        if error == "binary":
+            stats["skipped_binary"] += 1
+            if verbose >= 2:
                 print(f"⛔ Skipped binary or non-UTF file: {file_path}")
-                continue
+        else:
+            stats["skipped_error"] += 1
+            if verbose >= 2:
+                print(f"⚠️ Skipped {file_path}: {error}")
+        return None
 
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    content = f.read()
-
-                docs.append(Document(
-                    page_content=content,
-                    metadata={"source": os.path.relpath(file_path, base_path)}
-                ))
-                print(f"✅ Loaded: {file_path}")
-            except Exception as e:
-                print(f"⚠️ Skipped {file_path}: {e}")
-
-    print(f"📄 Total documents loaded: {len(docs)}")
-    return docs
+    stats["files_loaded"] += 1
+    stats["bytes_read"] += size
+    if verbose >= 2:
+        print(f"✅ Loaded: {file_path}")
+    return Document(
+        page_content=content,
+        metadata={"source": os.path.relpath(file_path, base_path)}
+    )
+
+def load_codebase(base_path: str, include_exts=None, exclude_dirs=None,
+                  max_workers: int = DEFAULT_WORKERS, verbose: int = 1, return_stats: bool = False) -> List[Document]:
+    """
+    Loads the whole codebase into a list (see iter_codebase for streaming).
+    - return_stats=True returns (docs, stats) instead of docs.
+    """
+    stats = {}
+    docs = list(iter_codebase(base_path, include_exts, exclude_dirs, max_workers, verbose, stats))
+    return (docs, stats) if return_stats else docs
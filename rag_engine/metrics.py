@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "devhelper"
+DEFAULT_METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+_lock = threading.Lock()
+_stages = {}       # stage -> [seconds, calls]
+_counters = {}     # (name, labels) -> value
+_last_traces = {}  # kind -> finished trace dict
+_local = threading.local()
+_active_trace = contextvars.ContextVar("devhelper_trace", default=None)
+_server = None
+_server_failed = set()  # (host, port) that could not be bound
+_DONE = object()
+
+class Trace:
+    """
+    Per-run breakdown (one index build, one question): stage times and
+    counters recorded by the thread that opened it while it is active.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.started = time.time()
+        self.seconds = 0.0
+        self.stages = {}
+        self.counters = {}
+
+    def as_dict(self):
+        return {
+            "kind": self.kind,
+            "started": self.started,
+            "seconds": round(self.seconds, 4),
+            "stages": {k: {"seconds": round(s, 4), "calls": c} for k, (s, c) in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+def _record(stage, seconds):
+    with _lock:
+        entry = _stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+        trace = _active_trace.get()
+        if trace is not None:
+            entry = trace.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+@contextmanager
+def _timer():
+    """
+    Yields a one-item list that holds the block's self time on exit: its
+    duration minus that of timers nested inside it on the same thread.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    frame = [0.0]  # time spent in nested timers
+    result = [0.0]
+    stack.append(frame)
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        elapsed = time.perf_counter() - started
+        stack.pop()
+        if stack:
+            stack[-1][0] += elapsed
+        result[0] = max(0.0, elapsed - frame[0])
+
+@contextmanager
+def span(stage):
+    """
+    Times a pipeline stage. Spans nest: a stage's recorded time excludes
+    the time of stages opened inside it, so the breakdown adds up.
+    """
+    with _timer() as result:
+        yield
+    _record(stage, result[0])
+
+def timed_iter(stage, iterable):
+    """
+    Wraps an iterator so only the time spent producing items counts towards
+    stage (not the time the consumer spends on them). The whole iteration is
+    recorded as one call when it ends or is abandoned.
+    """
+    iterator = iter(iterable)
+    total = 0.0
+    try:
+        while True:
+            with _timer() as result:
+                item = next(iterator, _DONE)
+            total += result[0]
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        _record(stage, total)
+
+def count(name, value=1, **labels):
+    """
+    Adds value to a counter, e.g. count("embedding_cache_hits", 12).
+    """
+    if not value:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+        trace = _active_trace.get()
+        if trace is not None:
+            label = name + "".join(f"[{v}]" for _, v in key[1])
+            trace.counters[label] = trace.counters.get(label, 0) + value
+
+@contextmanager
+def trace(kind):
+    """
+    Collects the stages and counters of one run; afterwards last_trace(kind)
+    returns its breakdown.
+    """
+    current = Trace(kind)
+    token = _active_trace.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - started
+        _active_trace.reset(token)
+        with _lock:
+            _last_traces[kind] = current.as_dict()
+
+def last_trace(kind):
+    with _lock:
+        return _last_traces.get(kind)
+
+def snapshot():
+    """
+    All metrics as a JSON-serializable dict.
+    """
+    with _lock:
+        return {
+            "stages": {k: {"seconds": round(s, 4), "calls": c} for k, (s, c) in _stages.items()},
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(_counters.items())
+            ],
+            "last_traces": dict(_last_traces),
+        }
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _last_traces.clear()
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+def prometheus_text():
+    """
+    Metrics in the Prometheus text exposition format.
+    """
+    with _lock:
+        stages = sorted(_stages.items())
+        counters = sorted(_counters.items())
+    lines = [f"# HELP {PREFIX}_stage_seconds Time spent per pipeline stage (excluding nested stages).",
+             f"# TYPE {PREFIX}_stage_seconds summary"]
+    for stage, (seconds, calls) in stages:
+        lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {seconds:.6f}')
+        lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {calls}')
+    typed = set()
+    for (name, labels), value in counters:
+        metric = f"{PREFIX}_{name}_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = json.dumps(snapshot()).encode("utf-8"), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = prometheus_text().encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_metrics_server(port=None, host=None):
+    """
+    Serves /metrics (Prometheus text) and /metrics.json on a background
+    thread. port defaults to METRICS_PORT; without either nothing starts.
+    host defaults to METRICS_HOST (127.0.0.1: local scrapers only).
+    Safe to call on every Streamlit rerun: only one server per process, and
+    a port that is already taken logs a warning once instead of failing.
+    """
+    global _server
+    port = port or os.getenv("METRICS_PORT")
+    if not port:
+        return None
+    address = (host or DEFAULT_METRICS_HOST, int(port))
+    with _lock:
+        if _server is None and address not in _server_failed:
+            try:
+                _server = ThreadingHTTPServer(address, _MetricsHandler)
+            except OSError as e:
+                _server_failed.add(address)
+                logging.getLogger(__name__).warning("⚠️ Metrics server not started on %s:%s: %s", *address, e)
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,396 @@
+import os
+import json
+import uuid
+import sqlite3
+import threading
+from typing import List
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from rag_engine.vector_store import MMAP_META_FILE
+
+DTYPES = ("float16", "int8", "float32")
+DEFAULT_DTYPE = os.getenv("MMAP_DTYPE", "int8")
+DEFAULT_RERANK = os.getenv("MMAP_RERANK", "0") == "1"
+RERANK_FACTOR = 4        # candidates re-scored at full precision per result
+SCAN_BYTES = 1 << 20     # float32 working set per scoring block (cache-sized)
+
+VECTORS_FILE = "devhelper_vectors.bin"
+SCALES_FILE = "devhelper_vectors.scale"
+FULL_FILE = "devhelper_vectors.f32"
+ALIVE_FILE = "devhelper_vectors.alive"
+ROWS_FILE = "devhelper_vectors.sqlite"
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+class MmapVectorStore(VectorStore):
+    """
+    In-process vector store: unit-normalized embeddings in a memory-mapped
+    float16 or int8 (per-row scale) matrix, texts and metadata in a SQLite
+    sidecar keyed by row. Search is an exact, vectorized cosine top-k over
+    the matrix; with rerank=True the best k * RERANK_FACTOR candidates are
+    re-scored against a float32 copy. Opening a store maps its files
+    without reading them, so many stores can be open at once.
+    - dtype and rerank are fixed when the store is created.
+    - Chunk IDs are upserted in place; deleted rows are masked until compact().
+    """
+
+    def __init__(self, persist_path: str, embedding_function, dtype: str = None, rerank: bool = None):
+        self.persist_path = persist_path
+        self._embedding = embedding_function
+        self._lock = threading.RLock()
+        os.makedirs(persist_path, exist_ok=True)
+        self._meta_path = os.path.join(persist_path, MMAP_META_FILE)
+        self._meta = self._read_meta()
+        if self._meta is None:
+            dtype = dtype or DEFAULT_DTYPE
+            if dtype not in DTYPES:
+                raise ValueError(f"Unknown vector dtype: choose one of {DTYPES}.")
+            self._meta = {"dim": None, "count": 0, "dtype": dtype,
+                          "rerank": DEFAULT_RERANK if rerank is None else bool(rerank)}
+            self._write_meta()
+        self._meta_mtime = self._mtime()
+        self._maps = None
+        self._conn = sqlite3.connect(os.path.join(persist_path, ROWS_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+            "text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    # ─────────── files ───────────
+    def _path(self, name):
+        return os.path.join(self.persist_path, name)
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self._meta_path)
+        except OSError:
+            return 0.0
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, self._meta_path)
+        self._meta_mtime = self._mtime()
+
+    def _files(self):
+        """
+        (file name, dtype, values per row) of every per-row matrix this store keeps.
+        """
+        dim = self._meta["dim"]
+        files = [(VECTORS_FILE, self._meta["dtype"], dim), (ALIVE_FILE, "uint8", 1)]
+        if self._meta["dtype"] == "int8":
+            files.append((SCALES_FILE, "float32", 1))
+        if self._meta["rerank"]:
+            files.append((FULL_FILE, "float32", dim))
+        return files
+
+    def _mapped(self):
+        """
+        Read-only memory maps of the matrices, reopened when another
+        process (or this one) has written to the store since.
+        """
+        with self._lock:
+            mtime = self._mtime()
+            if mtime != self._meta_mtime:
+                self._meta = self._read_meta() or self._meta
+                self._meta_mtime = mtime
+                self._maps = None
+            count = self._meta["count"]
+            if self._maps is None or self._maps["count"] != count:
+                self._maps = {"count": count}
+                for name, dtype, width in (self._files() if count else []):
+                    shape = (count, width) if width > 1 else (count,)
+                    self._maps[name] = np.memmap(self._path(name), dtype=dtype, mode="r", shape=shape)
+            return self._maps
+
+    def _encode(self, vectors):
+        """
+        Per-file row data for unit vectors: the scan matrix in the store's
+        dtype, its int8 scales, the float32 rerank copy and the alive flags.
+        """
+        dtype = self._meta["dtype"]
+        data = {ALIVE_FILE: np.ones(len(vectors), dtype=np.uint8)}
+        if dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            data[VECTORS_FILE] = np.round(vectors / scales[:, None]).astype(np.int8)
+            data[SCALES_FILE] = scales.astype(np.float32)
+        else:
+            data[VECTORS_FILE] = vectors.astype(dtype)
+        if self._meta["rerank"]:
+            data[FULL_FILE] = vectors
+        return data
+
+    def _write_rows(self, rows, data, count):
+        """
+        Writes encoded rows: overwrites rows < count in place, appends the rest
+        (which must be count, count + 1, ...).
+        """
+        for name, dtype, width in self._files():
+            values = data[name]
+            append = rows >= count
+            if append.any():
+                with open(self._path(name), "ab") as f:
+                    f.write(np.ascontiguousarray(values[append]).tobytes())
+            if (~append).any():
+                shape = (count, width) if width > 1 else (count,)
+                target = np.memmap(self._path(name), dtype=dtype, mode="r+", shape=shape)
+                target[rows[~append]] = values[~append]
+                target.flush()
+                del target
+
+    # ─────────── VectorStore interface ───────────
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def add_texts(self, texts, metadatas=None, *, ids=None, **kwargs) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [i or uuid.uuid4().hex for i in ids] if ids else [uuid.uuid4().hex for _ in texts]
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None) -> List[str]:
+        """
+        Upserts precomputed embeddings (add_texts without the embedding call).
+        """
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        # Last occurrence of a repeated ID wins, as with an upsert
+        latest = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        keep = sorted(latest.values())
+        vectors = _normalize(embeddings)[keep]
+        texts, metadatas, ids = [texts[i] for i in keep], [metadatas[i] for i in keep], [ids[i] for i in keep]
+
+        with self._lock:
+            self._mapped()  # pick up writes made by other processes
+            if self._meta["dim"] is None:
+                self._meta["dim"] = int(vectors.shape[1])
+            elif vectors.shape[1] != self._meta["dim"]:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match the store's {self._meta['dim']}.")
+            existing = self._rows_of(ids)
+            count = self._meta["count"]
+            rows = []
+            for chunk_id in ids:
+                if chunk_id in existing:
+                    rows.append(existing[chunk_id])
+                else:
+                    rows.append(count)
+                    count += 1
+            rows = np.asarray(rows, dtype=np.int64)
+            order = np.argsort(rows, kind="stable")  # appended rows must be written in row order
+            encoded = {name: values[order] for name, values in self._encode(vectors).items()}
+            self._write_rows(rows[order], encoded, self._meta["count"])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (row, id, text, metadata) VALUES (?, ?, ?, ?)",
+                [(int(row), chunk_id, text, json.dumps(meta or {}))
+                 for row, chunk_id, text, meta in zip(rows, ids, texts, metadatas)]
+            )
+            self._conn.commit()
+            self._meta["count"] = count
+            self._write_meta()
+            self._maps = None
+        return ids
+
+    def _rows_of(self, ids):
+        found = {}
+        ids = list(ids)
+        for start in range(0, len(ids), 900):
+            part = ids[start:start + 900]
+            query = f"SELECT id, row FROM rows WHERE id IN ({','.join('?' * len(part))})"
+            found.update(self._conn.execute(query, part).fetchall())
+        return found
+
+    def _documents(self, rows):
+        found = {}
+        rows = [int(r) for r in rows]
+        for start in range(0, len(rows), 900):
+            part = rows[start:start + 900]
+            query = f"SELECT row, id, text, metadata FROM rows WHERE row IN ({','.join('?' * len(part))})"
+            for row, chunk_id, text, meta in self._conn.execute(query, part):
+                found[row] = Document(id=chunk_id, page_content=text, metadata=json.loads(meta))
+        return found
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return False
+        with self._lock:
+            self._mapped()
+            rows = sorted(self._rows_of(ids).values())
+            if rows:
+                alive = np.memmap(self._path(ALIVE_FILE), dtype=np.uint8, mode="r+", shape=(self._meta["count"],))
+                alive[rows] = 0
+                alive.flush()
+                del alive
+                self._conn.executemany("DELETE FROM rows WHERE row = ?", [(r,) for r in rows])
+                self._conn.commit()
+                self._write_meta()  # readers reopen their maps
+                self._maps = None
+        return True
+
+    def get(self, ids=None, **kwargs):
+        """
+        Chroma-compatible get: {"ids", "documents", "metadatas"} for ids (all rows if None).
+        """
+        with self._lock:
+            if ids is None:
+                rows = [r for (r,) in self._conn.execute("SELECT row FROM rows ORDER BY row")]
+            else:
+                by_id = self._rows_of(ids)
+                rows = [by_id[i] for i in ids if i in by_id]
+            docs = self._documents(rows)
+        docs = [docs[r] for r in rows if r in docs]
+        return {"ids": [d.id for d in docs], "documents": [d.page_content for d in docs],
+                "metadatas": [d.metadata for d in docs]}
+
+    def get_by_ids(self, ids):
+        found = self.get(ids=list(ids))
+        return [Document(id=i, page_content=t, metadata=m)
+                for i, t, m in zip(found["ids"], found["documents"], found["metadatas"])]
+
+    def count(self):
+        """
+        Number of live chunks.
+        """
+        return self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def row_count(self):
+        """
+        Rows in the matrices, including deleted ones not yet compacted away.
+        """
+        return self._mapped()["count"]
+
+    def reset_collection(self):
+        """
+        Empties the store (keeps its dtype and rerank settings).
+        """
+        with self._lock:
+            self._maps = None
+            for name, _, _ in self._files() if self._meta["dim"] else []:
+                open(self._path(name), "wb").close()
+            self._conn.execute("DELETE FROM rows")
+            self._conn.commit()
+            self._meta.update({"dim": None, "count": 0})
+            self._write_meta()
+
+    def _scores(self, query_vector):
+        maps = self._mapped()
+        count = maps["count"]
+        if not count:
+            return maps, np.empty(0, dtype=np.float32)
+        matrix = maps[VECTORS_FILE]
+        scores = np.empty(count, dtype=np.float32)
+        step = max(64, SCAN_BYTES // (4 * matrix.shape[1]))
+        buffer = np.empty((step, matrix.shape[1]), dtype=np.float32)
+        for start in range(0, count, step):
+            block = buffer[:min(step, count - start)]
+            np.copyto(block, matrix[start:start + step], casting="unsafe")
+            np.matmul(block, query_vector, out=scores[start:start + step])
+        if SCALES_FILE in maps:
+            scores *= maps[SCALES_FILE]
+        scores[maps[ALIVE_FILE] == 0] = -np.inf
+        return maps, scores
+
+    def _full_rows(self, maps, rows):
+        """
+        float32 copies of rows for re-ranking, read with pread where available:
+        faulting them in through the map would also pull in (and keep mapped)
+        the readahead around every row.
+        """
+        if not hasattr(os, "pread"):
+            return np.asarray(maps[FULL_FILE][rows])
+        row_bytes = 4 * self._meta["dim"]
+        fd = os.open(self._path(FULL_FILE), os.O_RDONLY)
+        try:
+            data = b"".join(os.pread(fd, row_bytes, int(r) * row_bytes) for r in rows)
+        finally:
+            os.close(fd)
+        return np.frombuffer(data, dtype=np.float32).reshape(len(rows), -1)
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4):
+        """
+        Returns [(doc, cosine similarity)], best first.
+        """
+        query_vector = _normalize(embedding)[0]
+        maps, scores = self._scores(query_vector)
+        alive = int(np.isfinite(scores).sum())
+        if not alive:
+            return []
+        n = min(k * RERANK_FACTOR if FULL_FILE in maps else k, alive)
+        top = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+        if FULL_FILE in maps:
+            top = np.sort(top)  # sequential reads of the float32 copy
+            scores = dict(zip(top.tolist(), (self._full_rows(maps, top) @ query_vector).tolist()))
+        else:
+            scores = dict(zip(top.tolist(), scores[top].tolist()))
+        best = sorted(scores, key=lambda r: -scores[r])[:k]
+        docs = self._documents(best)
+        return [(docs[r], float(scores[r])) for r in best if r in docs]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    def compact(self):
+        """
+        Rewrites the matrices without deleted rows. Returns bytes reclaimed.
+        """
+        with self._lock:
+            maps = self._mapped()
+            count = maps["count"]
+            if not count:
+                return 0
+            live = np.flatnonzero(maps[ALIVE_FILE])
+            if len(live) == count:
+                return 0
+            before = sum(os.path.getsize(self._path(name)) for name, _, _ in self._files())
+            for name, _, _ in self._files():
+                tmp_path = self._path(name) + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(np.ascontiguousarray(maps[name][live]).tobytes())
+                os.replace(tmp_path, self._path(name))
+            # Renumber rows in two passes so the primary key never collides
+            self._conn.execute("UPDATE rows SET row = -row - 1")
+            self._conn.executemany("UPDATE rows SET row = ? WHERE row = ?",
+                                   [(new, -int(old) - 1) for new, old in enumerate(live)])
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._meta["count"] = len(live)
+            self._write_meta()
+            self._maps = None
+            after = sum(os.path.getsize(self._path(name)) for name, _, _ in self._files())
+        return max(0, before - after)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, *, ids=None, persist_path="chroma_store", **kwargs):
+        store = cls(persist_path, embedding, dtype=kwargs.get("dtype"), rerank=kwargs.get("rerank"))
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
@@ -1,10 +1,15 @@
 import os
+import re
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
+from rag_engine.answer_cache import get_answer_cache, normalize_query
+from rag_engine.summarizer import overview_context
+from rag_engine.resource_pool import get_resource_pool
+from rag_engine.context import assemble_context, count_tokens, DEFAULT_TOKEN_BUDGET
+from rag_engine.dedup import cited_sources
+from rag_engine import metrics
 
 def is_render():
     """
@@ -15,9 +20,15 @@ def is_render():
         or "onrender.com" in os.environ.get("RENDER_EXTERNAL_HOSTNAME", "")
     )
 
-def load_llm(engine: str = None):
+DEFAULT_LLM_MODELS = {
+    "openai": os.getenv("OPENAI_LLM_MODEL", "gpt-4"),
+    "ollama": os.getenv("OLLAMA_LLM_MODEL", "llama3"),
+}
+
+def load_llm(engine: str = None, model: str = None):
     """
     Load the appropriate LLM engine (OpenAI or Ollama), bulletproof against cloud/Ollama conflicts.
+    The chat model is set independently of the embedding model (see rag_engine.embeddings).
     """
     # 🚨 Force OpenAI in Render/cloud mode (never allow Ollama).
     if is_render():
@@ -39,48 +50,45 @@ def load_llm(engine: str = None):
             from langchain_ollama import OllamaLLM
         except ImportError:
             raise ImportError("langchain_ollama is not installed. Please install it to use Ollama locally.")
-        return OllamaLLM(model="llama3")
+        return OllamaLLM(model=model or DEFAULT_LLM_MODELS["ollama"])
     else:
         try:
             from langchain_openai import ChatOpenAI
         except ImportError:
             raise ImportError("langchain_openai is not installed. Please install it to use OpenAI.")
         return ChatOpenAI(
-            model="gpt-4",
+            model=model or DEFAULT_LLM_MODELS["openai"],
             temperature=0,
             openai_api_key=os.getenv("OPENAI_API_KEY")
         )
 
-def get_llm_chain(vectordb, engine: str = None):
-    """
-    Returns a chain that handles retrieval-augmented QA and project summary, using the right LLM.
-    """
-    llm = load_llm(engine)
-    retriever = vectordb.as_retriever()
+NO_FILES_MESSAGE = "No files found to summarize."
 
-    class SmartChain:
-        def __init__(self):
-            self.qa_chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
+# Triggers for project summary, matched as whole words (so "report" or
+# `clone_github_repo` don't count as "repo")
+SUMMARY_TRIGGERS = [
+    "readme", "overview", "this repo", "this repository", "this project", "this codebase",
+    "the repo", "the repository", "the project", "the codebase",
+]
+SUMMARY_TRIGGER_RE = re.compile(r"\b(" + "|".join(re.escape(t) for t in SUMMARY_TRIGGERS) + r")\b")
+# A trigger qualified by a specific topic ("overview of the retry logic",
+# "the retry logic in the project") asks about that topic, not the project
+PROJECT_PHRASE = r"(?:this|the|our)\s+(?:repo|repository|project|codebase)\b"
+TOPIC_RE = re.compile(
+    r"\b(?:(?:overview|summary)\s+(?:of|for)|summari[sz]e)\s+(?!(?:the\s+)?readme\b|it\b|" + PROJECT_PHRASE + r")\w"
+    r"|\b(?!(?:is|are|s)\b)\w+\s+(?:in|within|across|throughout)\s+" + PROJECT_PHRASE
+)
 
-        def invoke(self, inputs: dict):
-            query = inputs.get("query") or inputs.get("question")
-            if not query:
-                return "❌ No question provided."
+# Same wording as LangChain's default "stuff" QA prompt used by RetrievalQA.
+# Prompts are plain str.format templates: langchain_core.prompts costs ~0.4s to import.
+QA_PROMPT = """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
 
-            # Triggers for project summary
-            summary_triggers = [
-                "readme", "project", "repo", "what this repo", "what is this repo",
-                "what this codebase", "what does this repo do", "describe this repository",
-                "summary of this repo"
-            ]
-            if any(k in query.lower() for k in summary_triggers):
-                docs = retriever.invoke("project overview")
-                if not docs:
-                    return "No files found to summarize."
-                docs = docs[:12]  # Limit for context size
-                file_list = "\n".join(doc.metadata.get("source", "") for doc in docs)
-                code_snippets = "\n\n".join(doc.page_content[:1500] for doc in docs)
-                prompt = PromptTemplate.from_template("""
+{context}
+
+Question: {question}
+Helpful Answer:"""
+
+SUMMARY_PROMPT = """
 You are an expert software assistant.
 
 Below are the main files and key code/documentation snippets from a software project:
@@ -95,14 +103,252 @@ User Question:
 {question}
 
 Based on the above files and their content, give a clear, practical summary of what this repository or codebase does, what kind of project it is, its main components, and what its main files or code blocks implement. If possible, infer the purpose from the filenames and code. Do not guess; use only the provided code and files.
-""")
-                prompt_text = prompt.format_prompt(
+"""
+
+# Overview questions answered verbatim from a precomputed repo summary
+OVERVIEW_QUERIES = {
+    "what does this repo do", "what is this repo", "describe this repository",
+    "summary of this repo", "what does this codebase do", "what is this project",
+}
+
+TREE_SUMMARY_PROMPT = """You are an expert software assistant.
+
+Below is a precomputed overview of a software project: a repository summary followed by summaries of its folders.
+
+{overview}
+
+User Question:
+{question}
+
+Answer using only the overview above.
+"""
+
+def format_context(docs) -> str:
+    """
+    Chunk texts for a prompt. Chunks from a federated query (see
+    rag_engine.federated) are headed by their store and file, so the
+    answer can tell the sources apart.
+    """
+    return "\n\n".join(
+        f"[{doc.metadata['store']}] {doc.metadata.get('source', '')}\n{doc.page_content}"
+        if "store" in doc.metadata else doc.page_content
+        for doc in docs
+    )
+
+def is_summary_query(query: str, index=None) -> bool:
+    """
+    Whether a question asks about the project as a whole. With index (a
+    LexicalIndex), questions naming a symbol the store defines never are.
+    """
+    query_lower = query.lower()
+    if not SUMMARY_TRIGGER_RE.search(query_lower) or TOPIC_RE.search(query_lower):
+        return False
+    return not (index is not None and index.lookup_symbols(query))
+
+class StreamingAnswer:
+    """
+    Iterable of answer tokens with the retrieved source documents attached.
+    Once fully consumed, .text holds the whole answer and on_complete(text)
+    has been called (used to fill the answer cache).
+    context_report is the assemble_context report of the prompt, if any.
+    """
+
+    def __init__(self, tokens, source_documents=None, cached=None, on_complete=None, context_report=None):
+        self._tokens = tokens
+        self.source_documents = source_documents or []
+        self.cached = cached
+        self.context_report = context_report
+        self.text = None
+        self._on_complete = on_complete
+
+    def __iter__(self):
+        parts = []
+        for token in self._tokens:
+            if token:
+                parts.append(token)
+                yield token
+        self.text = "".join(parts)
+        if self._on_complete:
+            self._on_complete(self.text)
+
+def answer_text(response):
+    """
+    Plain answer text from whatever the LLM or QA chain returned.
+    """
+    if isinstance(response, str):
+        return response
+    if hasattr(response, "content"):
+        return response.content
+    if isinstance(response, dict):
+        for key in ("result", "answer", "content"):
+            if key in response:
+                return answer_text(response[key])
+    return str(response)
+
+def get_llm_chain(vectordb, engine: str = None, retriever=None, db_name: str = None,
+                  store_version: str = "", answer_cache=None, summary_tree=None,
+                  context_budget: int = DEFAULT_TOKEN_BUDGET):
+    """
+    Returns a chain that handles retrieval-augmented QA and project summary, using the right LLM.
+    - retriever (e.g. vector_store.load_retriever, or federated.load_federated_retriever
+      to answer from several stores) overrides plain vector search.
+    - With db_name set, answers are cached per store and LLM (see
+      rag_engine.answer_cache); store_version ties cached answers to the
+      current build of the store.
+    - With summary_tree (see rag_engine.summarizer), overview questions are
+      answered from the precomputed summaries instead of retrieved chunks.
+    - Retrieved chunks are deduplicated, diversified and packed into
+      context_budget tokens of the LLM's model (see rag_engine.context).
+    - invoke() returns the whole answer; stream() yields it token by token.
+    """
+    llm_engine = "openai" if is_render() else engine
+    llm = get_resource_pool().get_or_create(("llm", llm_engine), lambda: load_llm(engine))
+    retriever = retriever or vectordb.as_retriever()
+    model_name = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+    # Cached answers are per LLM: another engine or model doesn't get them
+    answer_model = f"{llm_engine}:{model_name or ''}"
+    if db_name and answer_cache is None:
+        answer_cache = get_answer_cache()
+
+    class SmartChain:
+        def __init__(self):
+            self.answer_cache = answer_cache if db_name else None
+
+        def _embed_query(self, query):
+            try:
+                return vectordb.embeddings.embed_query(query)
+            except Exception:
+                return None
+
+        def _lookup(self, query):
+            """
+            Returns (cached, query_embedding); cached is (answer, kind) or None.
+            The query is embedded only when the exact tier misses; the
+            embedding is returned for _remember.
+            """
+            if self.answer_cache is None:
+                return None, None
+            embedded = []
+
+            def embed():
+                embedded.append(self._embed_query(query))
+                return embedded[0]
+
+            with metrics.span("answer_cache"):
+                cached = self.answer_cache.get(db_name, query, store_version, embed, model=answer_model)
+            return cached, (embedded[0] if embedded else None)
+
+        def _remember(self, query, answer, query_embedding):
+            # "No files" only means retrieval found nothing this time: not an answer to keep
+            if self.answer_cache is not None and answer != NO_FILES_MESSAGE:
+                with metrics.span("answer_cache"):
+                    self.answer_cache.put(db_name, query, answer, store_version, query_embedding,
+                                          model=answer_model)
+
+        def _count_llm_call(self, prompt_text):
+            metrics.count("llm_calls")
+            metrics.count("llm_tokens_in", count_tokens(prompt_text, model_name))
+
+        def _finish(self, query, answer, query_embedding, llm_called):
+            if llm_called:
+                metrics.count("llm_tokens_out", count_tokens(answer, model_name))
+            self._remember(query, answer, query_embedding)
+
+        def _prepare(self, query):
+            """
+            Retrieves context and builds the prompt for either branch.
+            Returns (prompt_text, docs, answer, context_report); when answer
+            is set it is final and no LLM call is needed.
+            """
+            summary = is_summary_query(query, getattr(retriever, "index", None))
+            if summary and summary_tree and summary_tree.get("repo"):
+                if normalize_query(query) in OVERVIEW_QUERIES:
+                    return None, [], summary_tree["repo"], None
+                prompt_text = TREE_SUMMARY_PROMPT.format(
+                    overview=overview_context(summary_tree),
+                    question=query.strip()
+                )
+                return prompt_text, [], None, None
+
+            if summary:
+                with metrics.span("retrieve"):
+                    docs = retriever.invoke("project overview")
+                if not docs:
+                    return None, [], NO_FILES_MESSAGE, None
+                with metrics.span("context"):
+                    docs, report = assemble_context(docs, context_budget, model_name)
+                file_list = "\n".join(dict.fromkeys(
+                    (f"[{doc.metadata['store']}] " if "store" in doc.metadata else "") + source
+                    for doc in docs for source in cited_sources(doc)
+                ))
+                code_snippets = format_context(docs)
+                prompt_text = SUMMARY_PROMPT.format(
                     file_list=file_list.strip(),
                     code_snippets=code_snippets.strip(),
                     question=query.strip()
-                ).to_string()
-                return llm.invoke(prompt_text)
-            # Default: use vanilla QA
-            return self.qa_chain.invoke({"query": query})
+                )
+                return prompt_text, docs, None, report
+
+            # Default: "stuff" the assembled chunks into a QA prompt
+            with metrics.span("retrieve"):
+                docs = retriever.invoke(query)
+            with metrics.span("context"):
+                docs, report = assemble_context(docs, context_budget, model_name)
+            prompt_text = QA_PROMPT.format(
+                context=format_context(docs),
+                question=query
+            )
+            return prompt_text, docs, None, report
+
+        def invoke(self, inputs: dict):
+            query = inputs.get("query") or inputs.get("question")
+            if not query:
+                return "❌ No question provided."
+
+            cached, query_embedding = self._lookup(query)
+            if cached:
+                answer, kind = cached
+                return {"query": query, "result": answer, "source_documents": [], "cached": kind,
+                        "context_report": None}
+
+            prompt_text, docs, answer, report = self._prepare(query)
+            llm_called = answer is None
+            if llm_called:
+                self._count_llm_call(prompt_text)
+                with metrics.span("llm"):
+                    answer = answer_text(llm.invoke(prompt_text))
+            self._finish(query, answer, query_embedding, llm_called)
+            return {"query": query, "result": answer, "source_documents": docs, "cached": None,
+                    "context_report": report}
+
+        def stream(self, inputs: dict):
+            """
+            Streaming counterpart of invoke: retrieval runs up front (so
+            source_documents are available immediately), then iterating the
+            returned StreamingAnswer yields answer tokens as the LLM produces them.
+            """
+            query = inputs.get("query") or inputs.get("question")
+            if not query:
+                return StreamingAnswer(["❌ No question provided."])
+
+            cached, query_embedding = self._lookup(query)
+            if cached:
+                answer, kind = cached
+                return StreamingAnswer([answer], cached=kind)
+
+            prompt_text, docs, answer, report = self._prepare(query)
+            if answer is not None:
+                return StreamingAnswer(
+                    [answer],
+                    on_complete=lambda text: self._remember(query, text, query_embedding)
+                )
+            self._count_llm_call(prompt_text)
+            tokens = metrics.timed_iter("llm", (answer_text(chunk) for chunk in llm.stream(prompt_text)))
+            return StreamingAnswer(
+                tokens,
+                source_documents=docs,
+                on_complete=lambda answer: self._finish(query, answer, query_embedding, True),
+                context_report=report
+            )
 
     return SmartChain()
@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ITEMS = int(os.getenv("RESOURCE_POOL_MAX_ITEMS", "32"))
+DEFAULT_MAX_BYTES = int(os.getenv("RESOURCE_POOL_MAX_MB", "1024")) * 1024 * 1024
+
+class ResourcePool:
+    """
+    Thread-safe LRU pool of long-lived handles (vector stores, embedding
+    clients, LLM clients, chains), shared by every session in the process.
+    - Each key is built once, even when several threads ask for it at once.
+    - Evicts least recently used entries past max_items or max_bytes, using
+      the size estimate given when the entry was created.
+    - An entry built on other entries (a chain holding a vector store) names
+      them in depends_on, and is dropped whenever one of them is evicted,
+      invalidated or replaced, so it cannot keep their memory alive.
+    """
+
+    def __init__(self, max_items=DEFAULT_MAX_ITEMS, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()   # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._dependents = {}         # key -> keys of entries built on it
+        self._dependencies = {}       # key -> depends_on given for it
+
+    def get_or_create(self, key, factory, size=0, depends_on=()):
+        """
+        Returns the pooled value for key, building it with factory() on a miss.
+        size is a byte estimate, or a callable taking the new value.
+        depends_on lists the keys of pooled entries the value holds.
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._items:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return self._items[key][0]
+            value = factory()
+            self.put(key, value, size(value) if callable(size) else size, depends_on)
+            with self._lock:
+                self.misses += 1
+                self._key_locks.pop(key, None)
+            return value
+
+    def put(self, key, value, size=0, depends_on=()):
+        with self._lock:
+            self._remove(key)
+            self._items[key] = (value, size)
+            self._bytes += size
+            self._dependencies[key] = tuple(depends_on)
+            for dependency in depends_on:
+                self._dependents.setdefault(dependency, set()).add(key)
+            self._evict()
+
+    def invalidate(self, match):
+        """
+        Drops one key, or every key for which match(key) is true.
+        """
+        with self._lock:
+            keys = [k for k in self._items if match(k)] if callable(match) else [match]
+            for key in keys:
+                self._remove(key)
+
+    def _remove(self, key):
+        """
+        Drops key and, recursively, the entries that depend on it.
+        Returns how many entries were dropped. Caller holds the lock.
+        """
+        removed = 0
+        if key in self._items:
+            self._bytes -= self._items.pop(key)[1]
+            removed += 1
+        for dependency in self._dependencies.pop(key, ()):
+            self._dependents.get(dependency, set()).discard(key)
+        for dependent in self._dependents.pop(key, ()):
+            removed += self._remove(dependent)
+        return removed
+
+    def _evict(self):
+        while len(self._items) > 1 and (len(self._items) > self.max_items or self._bytes > self.max_bytes):
+            self.evictions += self._remove(next(iter(self._items)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+_pool = ResourcePool()
+
+def get_resource_pool() -> ResourcePool:
+    """
+    Returns the process-wide pool. Streamlit reruns and sessions share it,
+    because the module is imported once per server process.
+    """
+    return _pool
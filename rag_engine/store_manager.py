@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import threading
+from rag_engine.utils import directory_size
+from rag_engine.vector_store import CHROMA_DB_FILE, MMAP_META_FILE, store_backend
+from rag_engine import metrics
+
+STORE_ROOT = "chroma_store"
+STORE_INFO_FILE = "devhelper_store.json"
+DEFAULT_QUOTA_MB = int(os.getenv("STORE_QUOTA_MB", "0"))  # 0: no quota
+MB = 1000 * 1000  # quotas and sizes shown in the app and CLI are decimal megabytes
+# Stores used more recently than this are never evicted (another session may have them open)
+DEFAULT_MIN_IDLE = float(os.getenv("STORE_MIN_IDLE_SECONDS", "300"))
+# VACUUM only when at least this share of the database file is free pages
+COMPACT_MIN_FREE = float(os.getenv("STORE_COMPACT_MIN_FREE", "0.05"))
+TOUCH_INTERVAL = 60
+
+_lock = threading.Lock()
+
+def _info_path(persist_path):
+    return os.path.join(persist_path, STORE_INFO_FILE)
+
+def read_store_info(persist_path):
+    """
+    Returns the recorded info of a store ({} for stores built before the
+    store manager existed).
+    """
+    try:
+        with open(_info_path(persist_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_store_info(persist_path, info):
+    path = _info_path(persist_path)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(tmp_path, path)
+
+def _manifest_counts(persist_path):
+    from rag_engine.vector_store import read_manifest
+    files = (read_manifest(persist_path) or {}).get("files", {})
+    return len(files), sum(entry.get("chunks", 0) for entry in files.values())
+
+def touch(persist_path):
+    """
+    Marks a store as just used (for LRU eviction). Writes at most once a
+    minute per store, so it is cheap to call on every rerun.
+    """
+    if not os.path.isdir(persist_path):
+        return
+    with _lock:
+        info = read_store_info(persist_path)
+        now = time.time()
+        if now - info.get("last_access", 0) < TOUCH_INTERVAL:
+            return
+        info["last_access"] = now
+        _write_store_info(persist_path, info)
+
+def _record_size(persist_path):
+    with _lock:
+        info = read_store_info(persist_path)
+        if info:
+            info["size_bytes"] = directory_size(persist_path)
+            _write_store_info(persist_path, info)
+
+def _compact_mmap(persist_path, min_free):
+    from rag_engine.mmap_store import MmapVectorStore
+    store = MmapVectorStore(persist_path, None)
+    rows = store.row_count()
+    if not rows or (rows - store.count()) / rows < min_free:
+        return 0
+    before = directory_size(persist_path)
+    with metrics.span("compact"):
+        store.compact()
+    return max(0, before - directory_size(persist_path))
+
+def compact_store(persist_path, min_free=COMPACT_MIN_FREE):
+    """
+    VACUUMs a store's Chroma database when at least min_free of it is free
+    pages (left behind by deleted chunks). Returns the bytes reclaimed.
+    - min_free=0 always compacts.
+    - A store busy in another process is skipped (0 bytes).
+    - Memory-mapped stores are rewritten without their deleted rows once
+      at least min_free of the rows are deleted.
+    """
+    if os.path.exists(os.path.join(persist_path, MMAP_META_FILE)):
+        reclaimed = _compact_mmap(persist_path, min_free)
+        if reclaimed:
+            _record_size(persist_path)
+        metrics.count("store_bytes_reclaimed", reclaimed)
+        return reclaimed
+    db_path = os.path.join(persist_path, CHROMA_DB_FILE)
+    if not os.path.exists(db_path):
+        return 0
+    before = directory_size(persist_path)
+    try:
+        conn = sqlite3.connect(db_path, timeout=5)
+        try:
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not page_count or free_pages / page_count < min_free:
+                return 0
+            with metrics.span("compact"):
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return 0
+    reclaimed = max(0, before - directory_size(persist_path))
+    if reclaimed:
+        _record_size(persist_path)
+    metrics.count("store_bytes_reclaimed", reclaimed)
+    return reclaimed
+
+def record_build(persist_path, source=None, engine=None, chunk_size=None, chunk_overlap=None, mode=None,
+                 compact=True, quota_mb=None):
+    """
+    Records a (re)built or synced store: settings, build time, size, file
+    and chunk counts. Then compacts it (if worthwhile) and enforces the disk
+    quota, never evicting this store. Returns (info, pruned stores).
+    """
+    reclaimed = compact_store(persist_path) if compact else 0
+    with _lock:
+        info = read_store_info(persist_path)
+        now = time.time()
+        settings = {"source": source, "engine": engine, "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap, "mode": mode}
+        info.update({k: v for k, v in settings.items() if v is not None})
+        info.setdefault("created", now)
+        files, chunks = _manifest_counts(persist_path)
+        info["backend"] = store_backend(persist_path)
+        info.update({"built": now, "last_access": now, "files": files, "chunks": chunks,
+                     "size_bytes": directory_size(persist_path)})
+        info["bytes_reclaimed"] = info.get("bytes_reclaimed", 0) + reclaimed
+        _write_store_info(persist_path, info)
+    root = os.path.dirname(os.path.abspath(persist_path))
+    pruned = prune(root, quota_mb=quota_mb, keep=[persist_path])
+    return info, pruned
+
+def _describe(persist_path, measure=False):
+    """
+    A store's listing entry. Its size is the one recorded at its last build
+    (or compaction), so listing stores doesn't walk them; stores without a
+    recorded size, or measure=True, are walked.
+    """
+    info = read_store_info(persist_path)
+    size = info.get("size_bytes")
+    try:
+        modified = os.path.getmtime(persist_path)
+    except OSError:
+        modified = 0.0
+    return {
+        "name": os.path.basename(os.path.normpath(persist_path)),
+        "path": persist_path,
+        "size_bytes": directory_size(persist_path) if measure or size is None else size,
+        "source": info.get("source"),
+        "engine": info.get("engine"),
+        "chunk_size": info.get("chunk_size"),
+        "chunk_overlap": info.get("chunk_overlap"),
+        "mode": info.get("mode"),
+        "backend": info.get("backend") or store_backend(persist_path),
+        "files": info.get("files"),
+        "chunks": info.get("chunks"),
+        "built": info.get("built", modified),
+        "last_access": info.get("last_access", modified),
+    }
+
+def list_stores(root=STORE_ROOT):
+    """
+    Every store under root, most recently used first. Cache databases kept
+    next to the stores (embedding/answer/crawl caches) are not stores.
+    """
+    if not os.path.isdir(root):
+        return []
+    stores = [_describe(os.path.join(root, name)) for name in os.listdir(root)
+              if os.path.isdir(os.path.join(root, name))]
+    return sorted(stores, key=lambda s: -s["last_access"])
+
+def inspect_store(persist_path):
+    """
+    One store's info plus where its bytes go (vector DB, vector index
+    segments, lexical index, summary, ...), its database free space and
+    how many duplicate chunks it did not embed.
+    """
+    if not os.path.isdir(persist_path):
+        raise ValueError(f"❌ No store at {persist_path}")
+    from rag_engine.vector_store import store_version
+    report = _describe(persist_path, measure=True)
+    files, chunks = _manifest_counts(persist_path)
+    report.update({"files": files, "chunks": chunks, "version": store_version(persist_path),
+                   "bytes_reclaimed": read_store_info(persist_path).get("bytes_reclaimed", 0)})
+    components = {}
+    for name in os.listdir(persist_path):
+        path = os.path.join(persist_path, name)
+        size = directory_size(path) if os.path.isdir(path) else os.path.getsize(path)
+        # Chroma keeps each vector index segment in a UUID-named folder
+        key = "vector_index_segments" if os.path.isdir(path) else name
+        components[key] = components.get(key, 0) + size
+    report["components"] = dict(sorted(components.items(), key=lambda item: -item[1]))
+    from rag_engine.dedup import DedupIndex
+    dedup_index = DedupIndex.load(persist_path)
+    if dedup_index is not None:
+        report["dedup"] = dedup_index.stats()
+    db_path = os.path.join(persist_path, CHROMA_DB_FILE)
+    if os.path.exists(db_path):
+        try:
+            conn = sqlite3.connect(db_path, timeout=5)
+            try:
+                page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                report["db_free_bytes"] = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+    return report
+
+def _release_chroma(persist_path):
+    """
+    Stops Chroma's in-process client for a store about to be deleted;
+    otherwise a new store built at the same path would reuse it and fail
+    ("attempt to write a readonly database").
+    """
+    import sys
+    if "chromadb" not in sys.modules:
+        return
+    try:
+        from chromadb.api.shared_system_client import SharedSystemClient
+        target = os.path.abspath(persist_path)
+        for identifier in list(SharedSystemClient._identifier_to_system):
+            if identifier != "ephemeral" and os.path.abspath(identifier) == target:
+                SharedSystemClient._identifier_to_refcount.pop(identifier, None)
+                SharedSystemClient._identifier_to_system.pop(identifier).stop()
+    except (ImportError, AttributeError):
+        pass  # other Chroma versions: nothing cached to release
+
+def delete_store(persist_path):
+    """
+    Removes a store from disk and drops everything derived from it: pooled
+    store handles and chains, and its cached answers. Returns bytes freed.
+    """
+    from rag_engine.resource_pool import get_resource_pool
+    from rag_engine.answer_cache import get_answer_cache
+    if not os.path.isdir(persist_path):
+        return 0
+    size = directory_size(persist_path)
+    target = os.path.abspath(persist_path)
+    get_resource_pool().invalidate(
+        lambda key: isinstance(key, tuple) and len(key) > 1 and isinstance(key[1], str)
+        and key[0] in ("store", "chain") and os.path.abspath(key[1]) == target
+    )
+    get_answer_cache().invalidate(os.path.basename(os.path.normpath(persist_path)))
+    _release_chroma(persist_path)
+    shutil.rmtree(persist_path, ignore_errors=True)
+    metrics.count("stores_deleted")
+    return size
+
+def prune(root=STORE_ROOT, quota_mb=None, keep=(), min_idle=DEFAULT_MIN_IDLE, dry_run=False):
+    """
+    Evicts least recently used stores until those under root fit in
+    quota_mb (default STORE_QUOTA_MB, in MB of 10^6 bytes; 0 means no quota).
+    - Stores in keep, and stores used within min_idle seconds, are never evicted.
+    - dry_run=True only reports what would be removed.
+    Returns the evicted stores (as listed by list_stores).
+    """
+    quota_mb = DEFAULT_QUOTA_MB if quota_mb is None else quota_mb
+    if not quota_mb:
+        return []
+    quota = quota_mb * MB
+    kept = {os.path.abspath(path) for path in keep}
+    stores = list_stores(root)
+    total = sum(store["size_bytes"] for store in stores)
+    now = time.time()
+    evicted = []
+    for store in reversed(stores):  # least recently used first
+        if total <= quota:
+            break
+        if os.path.abspath(store["path"]) in kept or now - store["last_access"] < min_idle:
+            continue
+        if not dry_run:
+            delete_store(store["path"])
+        total -= store["size_bytes"]
+        evicted.append(store)
+    return evicted
+
+def usage(root=STORE_ROOT, quota_mb=None):
+    """
+    Total store size under root against the quota.
+    """
+    quota_mb = DEFAULT_QUOTA_MB if quota_mb is None else quota_mb
+    stores = list_stores(root)
+    return {"stores": len(stores), "size_bytes": sum(s["size_bytes"] for s in stores),
+            "quota_bytes": quota_mb * MB}
@@ -0,0 +1,152 @@
+import os
+import json
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
+from rag_engine.vector_store import content_hash
+from rag_engine import metrics
+
+SUMMARY_FILE = "devhelper_summary.json"
+MAX_FILE_CHARS = 6000
+MAX_CHILD_CHARS = 400
+
+FILE_PROMPT = """Summarize what this file does in 2-3 sentences for a developer new to the project. Mention its main functions/classes.
+
+File: {source}
+
+{content}
+"""
+
+DIRECTORY_PROMPT = """Below are summaries of the files and subfolders in the folder `{path}` of a software project.
+
+{children}
+
+In 2-4 sentences, summarize what this folder is responsible for.
+"""
+
+REPO_PROMPT = """Below are summaries of the top-level files and folders of a software project.
+
+{children}
+
+Give a clear, practical summary of what this repository does, what kind of project it is, and its main components.
+"""
+
+def _text(response):
+    return response.content if hasattr(response, "content") else str(response)
+
+def _dirname(source: str) -> str:
+    return posixpath.dirname(source.replace(os.sep, "/"))
+
+def load_summary_tree(persist_path):
+    """
+    Returns the precomputed summary tree of a store, or None.
+    {"files": {source: {"hash", "summary"}}, "dirs": {path: summary}, "repo": summary}
+    """
+    path = os.path.join(persist_path, SUMMARY_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def summary_version(persist_path):
+    """
+    Identifies the current summary tree of a store ("" without one); changes
+    whenever it is rebuilt. Part of the version of cached answers, which may
+    come from it. Cheap enough to check on every rerun (a stat).
+    """
+    try:
+        return str(os.stat(os.path.join(persist_path, SUMMARY_FILE)).st_mtime_ns)
+    except OSError:
+        return ""
+
+def _save_summary_tree(persist_path, tree):
+    os.makedirs(persist_path, exist_ok=True)
+    path = os.path.join(persist_path, SUMMARY_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(tree, f)
+    os.replace(path + ".tmp", path)
+
+def build_summary_tree(docs, llm, persist_path, max_workers=4, progress=None):
+    """
+    Map-reduce summary of a codebase, persisted next to its store.
+    - Map: one summary per file, run in parallel; files whose content hash is
+      unchanged since the last build reuse their summary.
+    - Reduce: per-directory summaries bottom-up, then a repo-level summary.
+      Only directories with a changed descendant are re-summarized.
+    Returns (tree, stats).
+    """
+    with metrics.span("summarize"):
+        tree, stats = _build_summary_tree(docs, llm, persist_path, max_workers, progress)
+    metrics.count("llm_calls", stats["files_summarized"] + stats["dirs_summarized"])
+    return tree, stats
+
+def _build_summary_tree(docs, llm, persist_path, max_workers, progress):
+    old = load_summary_tree(persist_path) or {"files": {}, "dirs": {}, "repo": ""}
+    files, todo = {}, []
+    for doc in docs:
+        if not isinstance(doc, Document):
+            doc = Document(page_content=doc.get("page_content", ""), metadata=doc.get("metadata", {}))
+        source = doc.metadata.get("source", "")
+        digest = content_hash(doc.page_content)
+        previous = old["files"].get(source)
+        if previous and previous["hash"] == digest:
+            files[source] = previous
+        else:
+            todo.append((source, digest, doc.page_content[:MAX_FILE_CHARS]))
+
+    def summarize_file(item):
+        source, digest, content = item
+        prompt = FILE_PROMPT.format(source=source, content=content)
+        return source, {"hash": digest, "summary": _text(llm.invoke(prompt)).strip()}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for done, (source, entry) in enumerate(pool.map(summarize_file, todo), start=1):
+            files[source] = entry
+            if progress:
+                progress({"files": done, "total": len(todo)})
+
+    removed = set(old["files"]) - set(files)
+    dirty = {_dirname(source) for source, _, _ in todo} | {_dirname(source) for source in removed}
+    for path in list(dirty):
+        while path:
+            path = _dirname(path)
+            dirty.add(path)
+
+    # Every directory that holds a file, plus all of its ancestors
+    children = {}
+    for source in files:
+        path, child = _dirname(source), source
+        children.setdefault(path, set()).add(child)
+        while path:
+            parent = _dirname(path)
+            children.setdefault(parent, set()).add(path)
+            path = parent
+
+    dirs = {}
+    for path in sorted(children, key=lambda p: -p.count("/") if p else 1):
+        if path not in dirty and path in old["dirs"]:
+            dirs[path] = old["dirs"][path]
+            continue
+        lines = []
+        for child in sorted(children[path]):
+            summary = files[child]["summary"] if child in files else dirs.get(child, "")
+            lines.append(f"- {child}: {summary[:MAX_CHILD_CHARS]}")
+        template = REPO_PROMPT if path == "" else DIRECTORY_PROMPT
+        dirs[path] = _text(llm.invoke(template.format(path=path, children="\n".join(lines)))).strip()
+
+    tree = {"files": files, "dirs": dirs, "repo": dirs.get("", "")}
+    _save_summary_tree(persist_path, tree)
+    stats = {"files_summarized": len(todo), "files_reused": len(files) - len(todo),
+             "dirs_summarized": len([p for p in dirs if p in dirty or p not in old["dirs"]])}
+    return tree, stats
+
+def overview_context(tree, max_dirs=30):
+    """
+    Compact text of the tree for one small LLM call: repo summary plus the
+    shallowest directory summaries.
+    """
+    dirs = sorted((p for p in tree["dirs"] if p), key=lambda p: (p.count("/"), p))[:max_dirs]
+    lines = [f"Repository: {tree['repo']}", ""]
+    lines += [f"- {p}/: {tree['dirs'][p][:MAX_CHILD_CHARS]}" for p in dirs]
+    return "\n".join(lines)
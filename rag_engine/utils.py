@@ -1,10 +1,45 @@
 import os
+import json
 import requests
 import zipfile
-import io
+import time
 import shutil
-from bs4 import BeautifulSoup
+import hashlib
+import tempfile
+from requests.adapters import HTTPAdapter
 from langchain_core.documents import Document
+from rag_engine.loader import VALID_EXTENSIONS
+
+GITHUB_API = os.getenv("GITHUB_API_URL", "https://api.github.com")
+HTTP_TIMEOUT = 30
+SOURCE_MARKER = ".devhelper_source.json"
+# A checkout verified against GitHub this recently is reused without any API call
+REPO_CHECK_TTL = float(os.getenv("REPO_CHECK_TTL", "300"))
+
+_session = None
+
+def make_db_name(source, chunk_size, chunk_overlap, chunk_mode="text"):
+    """
+    Store directory name under chroma_store for a source (path or URL as
+    entered) and chunk settings. The app and the CLI share it, so a store
+    built headless is the one the UI loads.
+    """
+    hash_part = hashlib.md5(source.encode()).hexdigest()[:8]
+    suffix = "" if chunk_mode == "text" else f"_{chunk_mode}"
+    return f"{hash_part}_c{chunk_size}_o{chunk_overlap}{suffix}"
+
+def directory_size(path: str) -> int:
+    """
+    Total size in bytes of all files under path.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                continue
+    return total
 
 def is_valid_github_repo_url(repo_url: str):
     if not repo_url.startswith("https://github.com/"):
@@ -12,63 +47,176 @@ def is_valid_github_repo_url(repo_url: str):
     parts = repo_url[len("https://github.com/"):].strip("/").split("/")
     return len(parts) == 2 and all(parts)
 
-def get_default_branch(repo_url):
+def http_session() -> requests.Session:
+    """
+    Process-wide pooled HTTP session (keep-alive, connection reuse).
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _session = session
+    return _session
+
+def _github_headers(extra=None):
+    headers = {"Accept": "application/vnd.github.v3+json"}
+    if os.getenv("GITHUB_TOKEN"):
+        headers["Authorization"] = f"Bearer {os.getenv('GITHUB_TOKEN')}"
+    headers.update(extra or {})
+    return headers
+
+def get_default_branch(repo_url, api_base=None, session=None):
     parts = repo_url.rstrip("/").split("/")
     if len(parts) < 2:
         raise ValueError("❌ Invalid GitHub repo URL.")
     user, repo = parts[-2], parts[-1]
-    api_url = f"https://api.github.com/repos/{user}/{repo}"
-    response = requests.get(api_url, headers={"Accept": "application/vnd.github.v3+json"})
+    api_url = f"{(api_base or GITHUB_API).rstrip('/')}/repos/{user}/{repo}"
+    response = (session or http_session()).get(api_url, headers=_github_headers(), timeout=HTTP_TIMEOUT)
     if response.status_code != 200:
         raise ValueError("❌ Could not access repo details. Is it public?")
     return response.json().get("default_branch", "main")
 
-def clone_github_repo(repo_url: str, dest_folder="cloned_repo", force_delete=False):
+def get_head_commit(repo_url, branch, api_base=None, session=None, etag=None):
+    """
+    Resolves a branch to its commit SHA. Sends If-None-Match with a known
+    ETag, so an unchanged branch costs a 304 (which GitHub doesn't count
+    against the rate limit).
+    Returns (sha, etag); sha is None on 304.
+    """
+    user, repo = repo_url.rstrip("/").split("/")[-2:]
+    api_url = f"{(api_base or GITHUB_API).rstrip('/')}/repos/{user}/{repo}/commits/{branch}"
+    headers = _github_headers({"Accept": "application/vnd.github.sha"})
+    if etag:
+        headers["If-None-Match"] = etag
+    response = (session or http_session()).get(api_url, headers=headers, timeout=HTTP_TIMEOUT)
+    if response.status_code == 304:
+        return None, etag
+    if response.status_code != 200:
+        raise ValueError(f"❌ Could not resolve the latest commit of branch '{branch}'.")
+    return response.text.strip(), response.headers.get("ETag")
+
+def _read_source_marker(dest_folder):
+    try:
+        with open(os.path.join(dest_folder, SOURCE_MARKER), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_source_marker(dest_folder, marker):
+    marker["checked"] = time.time()
+    with open(os.path.join(dest_folder, SOURCE_MARKER), "w", encoding="utf-8") as f:
+        json.dump(marker, f)
+
+def _member_target(name, include_exts, excluded):
+    """
+    Relative path to extract a ZIP member to (top-level folder stripped),
+    or None if the loader would skip it anyway.
+    """
+    parts = [p for p in name.split("/") if p]
+    if len(parts) < 2 or name.endswith("/"):
+        return None
+    parts = parts[1:]
+    if any(p in ("..", ".") for p in parts) or any(p in excluded for p in parts[:-1]):
+        return None
+    if not parts[-1].lower().endswith(include_exts):
+        return None
+    return os.path.join(*parts)
+
+def clone_github_repo(repo_url: str, dest_folder="cloned_repo", force_delete=False,
+                      include_exts=None, exclude_dirs=None, api_base=None, archive_base=None, session=None,
+                      refresh=False):
+    """
+    Fetches a GitHub repo's default branch into dest_folder.
+    - Resolves the branch to a commit SHA first; if dest_folder already holds
+      that commit of that repo (with the same filters), nothing is downloaded.
+    - The default branch and the commit's ETag are kept in dest_folder's
+      marker: a re-check costs one conditional request (a 304 when nothing
+      changed), and none at all within REPO_CHECK_TTL seconds of the last
+      unless refresh=True (an explicit sync or re-index).
+    - Streams the archive to a temp file in chunks over a pooled session.
+    - Extracts only members the loader would index (extension and exclude rules).
+    api_base/archive_base override the GitHub endpoints (e.g. a local test server).
+    """
     if not is_valid_github_repo_url(repo_url):
         raise ValueError("❌ Please enter a valid GitHub **repository** URL: https://github.com/<user>/<repo>")
 
-    # Always clean dest folder before cloning to avoid stale files
-    if os.path.exists(dest_folder):
-        shutil.rmtree(dest_folder)
-
     repo_url = repo_url.rstrip("/")
-    repo_name = repo_url.split("/")[-1]
+    session = session or http_session()
+    include_exts = tuple(include_exts or VALID_EXTENSIONS)
+    excluded = sorted({d.strip() for d in (exclude_dirs or []) if d.strip()})
 
-    try:
-        default_branch = get_default_branch(repo_url)
-    except Exception as e:
-        raise ValueError(str(e))
+    marker = _read_source_marker(dest_folder)
+    same_source = (
+        not force_delete and marker is not None and marker.get("url") == repo_url and marker.get("branch")
+        and marker.get("include_exts") == list(include_exts) and marker.get("exclude_dirs") == excluded
+    )
+    if same_source and not refresh and time.time() - marker.get("checked", 0) < REPO_CHECK_TTL:
+        return dest_folder
 
-    zip_url = f"{repo_url}/archive/refs/heads/{default_branch}.zip"
+    if same_source:
+        default_branch = marker["branch"]
+        try:
+            sha, etag = get_head_commit(repo_url, default_branch, api_base=api_base, session=session,
+                                        etag=marker.get("etag"))
+        except ValueError:
+            same_source = False  # branch gone (e.g. renamed default branch): resolve it again
+        else:
+            if sha is None or sha == marker.get("sha"):
+                _write_source_marker(dest_folder, dict(marker, etag=etag))
+                return dest_folder
+    if not same_source:
+        try:
+            default_branch = get_default_branch(repo_url, api_base=api_base, session=session)
+        except Exception as e:
+            raise ValueError(str(e))
+        sha, etag = get_head_commit(repo_url, default_branch, api_base=api_base, session=session)
 
-    response = requests.get(zip_url)
-    if response.status_code != 200:
-        raise ValueError(
-            f"❌ Could not fetch repo ZIP for branch '{default_branch}'. "
-            "Please check that the repository exists and is public."
-        )
-
-    try:
-        with zipfile.ZipFile(io.BytesIO(response.content)) as zip_ref:
-            zip_ref.extractall(dest_folder)
-    except zipfile.BadZipFile:
-        raise ValueError("❌ Failed to extract ZIP file from GitHub. The repo might be empty or private.")
+    zip_url = f"{(archive_base or repo_url).rstrip('/')}/archive/{sha}.zip"
+    with tempfile.TemporaryFile() as archive:
+        try:
+            with session.get(zip_url, stream=True, timeout=HTTP_TIMEOUT) as response:
+                if response.status_code != 200:
+                    raise ValueError(
+                        f"❌ Could not fetch repo ZIP for branch '{default_branch}'. "
+                        "Please check that the repository exists and is public."
+                    )
+                for block in response.iter_content(chunk_size=1024 * 1024):
+                    archive.write(block)
+        except requests.RequestException as e:
+            raise ValueError(f"❌ Download failed: {e}")
+        archive.seek(0)
 
-    inner_folder = os.path.join(dest_folder, f"{repo_name}-{default_branch}")
-    if not os.path.isdir(inner_folder):
-        raise ValueError("❌ Failed to find extracted repo folder inside ZIP.")
+        # Always clean dest folder before extracting to avoid stale files
+        if os.path.exists(dest_folder):
+            shutil.rmtree(dest_folder)
+        os.makedirs(dest_folder)
+        try:
+            with zipfile.ZipFile(archive) as zip_ref:
+                for member in zip_ref.infolist():
+                    target = _member_target(member.filename, include_exts, excluded)
+                    if target is None:
+                        continue
+                    path = os.path.join(dest_folder, target)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with zip_ref.open(member) as src, open(path, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+        except zipfile.BadZipFile:
+            raise ValueError("❌ Failed to extract ZIP file from GitHub. The repo might be empty or private.")
 
-    for root, _, files in os.walk(inner_folder):
-        for file in files:
-            src = os.path.join(root, file)
-            dst_dir = root.replace(inner_folder, dest_folder)
-            os.makedirs(dst_dir, exist_ok=True)
-            shutil.move(src, os.path.join(dst_dir, file))
-    shutil.rmtree(inner_folder)
+    _write_source_marker(dest_folder, {
+        "url": repo_url, "branch": default_branch, "sha": sha, "etag": etag,
+        "include_exts": list(include_exts), "exclude_dirs": excluded,
+    })
     return dest_folder
 
 def load_webpage_as_document(url: str) -> Document:
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    text = soup.get_text()
-    return Document(page_content=text, metadata={"source": url})
+    """
+    Fetches a single page and keeps its main content (see
+    rag_engine.crawler.crawl_site to follow links).
+    """
+    from rag_engine.crawler import extract_main_content
+    response = http_session().get(url, timeout=HTTP_TIMEOUT)
+    title, text, _ = extract_main_content(response.text, response.url or url)
+    return Document(page_content=text, metadata={"source": url, "title": title})
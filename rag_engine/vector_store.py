@@ -1,17 +1,18 @@
 import os
-from langchain_chroma import Chroma
+import json
+import uuid
+import hashlib
 from langchain_core.documents import Document
+from rag_engine.resource_pool import get_resource_pool
+from rag_engine import metrics
 
-# Optional imports, guarded for environments where not installed
-try:
-    from langchain_openai import OpenAIEmbeddings
-except ImportError:
-    OpenAIEmbeddings = None
-
-try:
-    from langchain_ollama import OllamaEmbeddings
-except ImportError:
-    OllamaEmbeddings = None
+MANIFEST_FILE = "devhelper_manifest.json"
+VERSION_FILE = "devhelper_version.txt"
+CHROMA_DB_FILE = "chroma.sqlite3"
+MMAP_META_FILE = "devhelper_vectors.json"
+DEFAULT_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "256"))
+VECTOR_BACKENDS = ("chroma", "mmap")
+DEFAULT_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
 
 def is_render():
     """
@@ -22,53 +23,410 @@ def is_render():
         or "onrender.com" in os.environ.get("RENDER_EXTERNAL_HOSTNAME", "")
     )
 
-def _get_embedding(engine: str = "openai"):
+def _get_embedding(engine: str = "openai", cache: bool = True, model: str = None):
     """
     Returns the correct embedding instance.
     - Always uses OpenAI on Render/cloud, regardless of user choice.
     - Locally, uses OpenAI or Ollama as requested.
+    - model overrides OPENAI_EMBEDDING_MODEL / OLLAMA_EMBEDDING_MODEL.
+    - With cache=True, wraps it in the shared on-disk embedding cache.
+    Clients are shared process-wide through the resource pool.
     """
-    if is_render() or engine == "openai":
-        if OpenAIEmbeddings is None:
-            raise ImportError("OpenAIEmbeddings is not installed. Please install langchain_openai.")
-        return OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-    elif engine == "ollama":
-        if OllamaEmbeddings is None:
-            raise ImportError("OllamaEmbeddings is not installed. Please install langchain_ollama.")
-        return OllamaEmbeddings(model="llama3")
-    else:
+    if is_render():
+        engine = "openai"
+    if engine not in ("openai", "ollama"):
         raise ValueError("Unknown embedding engine: choose 'openai' or 'ollama'.")
 
-def store_in_chroma(chunks, persist_path="chroma_store", embedding_engine="openai"):
+    def build():
+        from rag_engine.embedding_cache import CachedEmbeddings
+        from rag_engine.embeddings import make_embeddings
+        embedding = make_embeddings(engine, model=model)
+        if not cache:
+            return embedding
+        return CachedEmbeddings(embedding, namespace=f"{engine}:{embedding.model}")
+
+    return get_resource_pool().get_or_create(("embedding", engine, model, cache), build)
+
+def _to_document(doc):
+    """
+    Normalizes a chunk (Document or dict) into a Document.
+    """
+    if isinstance(doc, Document):
+        return doc
+    if isinstance(doc, dict):
+        return Document(
+            page_content=doc.get("page_content", ""),
+            metadata=doc.get("metadata", {})
+        )
+    raise ValueError("Chunk must be a Document or dict.")
+
+def _batched(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def store_backend(persist_path, backend=None):
+    """
+    The vector backend of the store at persist_path: an existing store keeps
+    the one it was built with; a new one uses backend (default VECTOR_BACKEND).
+    """
+    if os.path.exists(os.path.join(persist_path, MMAP_META_FILE)):
+        return "mmap"
+    if os.path.exists(os.path.join(persist_path, CHROMA_DB_FILE)):
+        return "chroma"
+    backend = backend or DEFAULT_BACKEND
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend: choose one of {VECTOR_BACKENDS}.")
+    return backend
+
+def _dedup_stats():
+    return {"duplicates": 0, "near_duplicates": 0, "bytes_saved": 0}
+
+def _skip_duplicate(dedup_index, chunk_id, doc, stats):
+    """
+    Checks a chunk against the store's dedup index; duplicates are counted
+    in stats and must not be stored.
+    """
+    with metrics.span("dedup"):
+        kept_id, kind = dedup_index.match(chunk_id, doc)
+    if kept_id is None:
+        return False
+    stats["near_duplicates" if kind == "near" else "duplicates"] += 1
+    stats["bytes_saved"] += len(doc.page_content.encode("utf-8", errors="replace"))
+    return True
+
+def _count_dedup(stats):
+    metrics.count("chunks_deduplicated", stats["duplicates"] + stats["near_duplicates"])
+    metrics.count("dedup_bytes_saved", stats["bytes_saved"])
+
+def store_in_chroma(chunks, persist_path="chroma_store", embedding_engine="openai",
+                    batch_size=DEFAULT_BATCH_SIZE, progress=None, backend=None, dedup=None):
     """
     Stores document chunks in a Chroma vector DB using the correct embedding engine.
+    - chunks may be any iterable (e.g. a generator); they are embedded and
+      written in batches of batch_size, so memory is bounded by the batch.
+    - progress(stats) is called after each batch with {"chunks": written so far}
+      plus the dedup counts and "failed": chunks skipped because their
+      embedding still failed after retries.
+    - backend picks the vector backend of a new store (see load_chroma).
+    - dedup (default DEDUP) skips chunks that duplicate a stored one (see
+      rag_engine.dedup); retrieval still cites the skipped chunks' sources.
     """
-    embedding = _get_embedding(embedding_engine)
+    from rag_engine.lexical_index import LexicalIndex
+    from rag_engine.dedup import DedupIndex, DEFAULT_DEDUP
+    from rag_engine.embeddings import RetryableEmbeddingError
+    dedup = DEFAULT_DEDUP if dedup is None else dedup
+    vectordb = load_chroma(persist_path, embedding_engine=embedding_engine, backend=backend)
+    index = LexicalIndex.load(persist_path) or LexicalIndex()
+    dedup_index = DedupIndex.load(persist_path) or (DedupIndex() if dedup else None)
+    stats = _dedup_stats()
 
-    valid_docs = []
-    for doc in chunks:
-        if isinstance(doc, Document):
-            valid_docs.append(doc)
-        elif isinstance(doc, dict):
-            valid_docs.append(Document(
-                page_content=doc.get("page_content", ""),
-                metadata=doc.get("metadata", {})
-            ))
-        else:
-            raise ValueError("Chunk must be a Document or dict.")
-
-    return Chroma.from_documents(
-        documents=valid_docs,
-        embedding=embedding,
-        persist_directory=persist_path
-    )
+    def kept(docs):
+        for doc in docs:
+            doc_id = uuid.uuid4().hex
+            if dedup and _skip_duplicate(dedup_index, doc_id, doc, stats):
+                continue
+            yield doc_id, doc
+
+    written = 0
+    stats["failed"] = 0
+    for batch in _batched(kept(_to_document(doc) for doc in chunks), batch_size):
+        ids, docs = [doc_id for doc_id, _ in batch], [doc for _, doc in batch]
+        try:
+            with metrics.span("store"):
+                vectordb.add_documents(docs, ids=ids)
+                for doc_id, doc in batch:
+                    index.add(doc_id, doc)
+        except RetryableEmbeddingError:
+            # Still failing after retries: skip the batch, store the rest
+            stats["failed"] += len(batch)
+            metrics.count("chunks_failed", len(batch))
+            if dedup_index is not None:
+                for doc_id in ids:
+                    dedup_index.forget(doc_id)
+            continue
+        metrics.count("chunks_written", len(batch))
+        written += len(batch)
+        if progress:
+            progress(dict(stats, chunks=written))
+    with metrics.span("store"):
+        index.save(persist_path)
+        if dedup_index is not None:
+            dedup_index.save(persist_path)
+    _count_dedup(stats)
+    bump_store_version(persist_path)
+    return vectordb
 
-def load_chroma(persist_path="chroma_store", embedding_engine="openai"):
+def load_chroma(persist_path="chroma_store", embedding_engine="openai", backend=None):
     """
     Loads a Chroma vector DB using the correct embedding engine.
+    - backend="mmap" opens (or creates) an in-process memory-mapped store
+      instead (rag_engine.mmap_store), with the same interface.
+    - An existing store always opens with the backend it was built with.
     """
     embedding = _get_embedding(embedding_engine)
+    if store_backend(persist_path, backend) == "mmap":
+        from rag_engine.mmap_store import MmapVectorStore
+        return MmapVectorStore(persist_path, embedding)
+    # Chroma takes about a second to import: only pay for it once a store is opened
+    from langchain_chroma import Chroma
     return Chroma(
         embedding_function=embedding,
         persist_directory=persist_path
     )
+
+def load_retriever(vectordb, persist_path="chroma_store", k=4):
+    """
+    Returns the hybrid BM25/symbol + vector retriever for a store, or the
+    plain vector retriever if the store has no lexical index yet.
+    Retrieved chunks cite the sources of their deduplicated copies in
+    metadata["duplicate_sources"].
+    """
+    from rag_engine.lexical_index import LexicalIndex, HybridRetriever
+    from rag_engine.dedup import DedupIndex
+    index = LexicalIndex.load(persist_path)
+    if index is None:
+        return vectordb.as_retriever(search_kwargs={"k": k})
+    return HybridRetriever(vectordb=vectordb, index=index, k=k, dedup=DedupIndex.load(persist_path))
+
+# ─────────── Incremental sync ───────────
+
+def content_hash(text: str) -> str:
+    """
+    Hash of a file's content, used to detect changed files between syncs.
+    """
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+def chunk_id(source: str, index: int) -> str:
+    """
+    Stable chunk ID: the same file position always maps to the same ID,
+    so a changed file's old chunks can be deleted without a lookup.
+    """
+    return f"{hashlib.sha1(source.encode()).hexdigest()[:16]}-{index}"
+
+def read_manifest(persist_path):
+    """
+    Returns the per-file manifest of a store, or None if it has none.
+    """
+    path = os.path.join(persist_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(persist_path, manifest):
+    os.makedirs(persist_path, exist_ok=True)
+    path = os.path.join(persist_path, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def store_version(persist_path):
+    """
+    Identifies the current build of a store; changes whenever its content does.
+    Used to invalidate caches and pooled chains derived from the store.
+    Kept in its own small file so it is cheap to check on every rerun.
+    """
+    try:
+        with open(os.path.join(persist_path, VERSION_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+def bump_store_version(persist_path):
+    os.makedirs(persist_path, exist_ok=True)
+    with open(os.path.join(persist_path, VERSION_FILE), "w", encoding="utf-8") as f:
+        f.write(uuid.uuid4().hex)
+
+def sync_chroma(docs, persist_path="chroma_store", embedding_engine="openai", chunker=None, reset=False,
+                batch_size=DEFAULT_BATCH_SIZE, progress=None, backend=None, dedup=None):
+    """
+    Incrementally syncs a Chroma store with a stream of file documents.
+    - Compares each file's content hash against the store's manifest.
+    - Chunks and embeds only added or changed files (upsert by stable chunk IDs),
+      writing in batches of batch_size so memory is bounded by the batch.
+    - Deletes the chunks of changed and removed files.
+    - reset=True clears the store first (full re-index); with a backend
+      other than the store's, the store is rebuilt on that backend.
+    - progress(stats) is called after each batch with files/chunks processed so far.
+    - dedup (default DEDUP) skips chunks that duplicate a stored one, exactly
+      or nearly (see rag_engine.dedup). When a kept chunk goes away, its
+      remaining duplicates are stored in its place.
+    - A batch whose embedding still fails after retries is skipped: its
+      files are listed in delta["failed"] and re-embedded on the next sync.
+    Returns (vectordb, delta) where delta lists files added/changed/removed/failed,
+    counts chunks written/deleted, and counts the duplicate chunks skipped
+    and the bytes of text they would have added.
+    """
+    from rag_engine.lexical_index import LexicalIndex
+    from rag_engine.dedup import DedupIndex, DEFAULT_DEDUP
+    from rag_engine.embeddings import RetryableEmbeddingError
+    dedup = DEFAULT_DEDUP if dedup is None else dedup
+    if reset and backend and os.path.exists(persist_path) and store_backend(persist_path) != backend:
+        from rag_engine.store_manager import delete_store
+        delete_store(persist_path)
+    had_store = os.path.exists(persist_path)
+    manifest = read_manifest(persist_path)
+    vectordb = load_chroma(persist_path, embedding_engine=embedding_engine, backend=backend)
+
+    index = LexicalIndex.load(persist_path)
+    dedup_index = DedupIndex.load(persist_path)
+    if manifest is None or reset or index is None:
+        # Stores built before the manifest (or lexical index) existed can't
+        # be updated in place: start from empty.
+        if had_store:
+            vectordb.reset_collection()
+        manifest = {"files": {}}
+        index = LexicalIndex()
+        dedup_index = None
+    # Stores built without dedup only deduplicate chunks written from now on
+    dedup_index = dedup_index or (DedupIndex() if dedup else None)
+    files = manifest["files"]
+
+    delta = {
+        "added": [], "changed": [], "removed": [], "unchanged": 0,
+        "chunks_written": 0, "chunks_deleted": 0,
+    }
+    delta.update(_dedup_stats())
+    delta["failed"] = []
+    seen = set()
+    batch_ids, batch_docs = [], []
+
+    def fail(metadatas):
+        # Left to the next sync, which embeds these files again
+        for metadata in metadatas:
+            source = metadata.get("source", "")
+            if source not in delta["failed"]:
+                delta["failed"].append(source)
+
+    def flush():
+        if batch_docs:
+            try:
+                with metrics.span("store"):
+                    vectordb.add_documents(batch_docs, ids=batch_ids)
+                    for doc_id, doc in zip(batch_ids, batch_docs):
+                        index.add(doc_id, doc)
+                metrics.count("chunks_written", len(batch_docs))
+                delta["chunks_written"] += len(batch_docs)
+            except RetryableEmbeddingError:
+                # Still failing after retries: leave these files to the next sync, index the rest.
+                # The chunks were never stored, so they can't stand in for duplicates.
+                fail(doc.metadata for doc in batch_docs)
+                if dedup_index is not None:
+                    for doc_id in batch_ids:
+                        fail(dedup_index.forget(doc_id))
+                metrics.count("chunks_failed", len(batch_docs))
+            batch_ids.clear()
+            batch_docs.clear()
+        if progress:
+            progress({"files": len(seen), "chunks": delta["chunks_written"]})
+
+    def delete(stale_ids):
+        """
+        Deletes chunks; duplicates of deleted kept chunks that remain are
+        stored in their place. An exact duplicate reuses the deleted chunk's
+        text (so its embedding comes from the cache); a near duplicate is
+        stored with its own text.
+        """
+        restored = dedup_index.remove(stale_ids) if dedup_index is not None else []
+        texts = {}
+        reused = [old_id for _, old_id, text, _ in restored if old_id is not None and text is None]
+        if reused:
+            old = vectordb.get(ids=reused)
+            texts = dict(zip(old["ids"], old["documents"]))
+        replacements, lost = [], []
+        for new_id, old_id, text, metadata in restored:
+            text = text if text is not None else texts.get(old_id)
+            if text is None:
+                lost.append((new_id, metadata))
+            else:
+                replacements.append((new_id, Document(page_content=text, metadata=metadata)))
+        with metrics.span("store"):
+            vectordb.delete(ids=stale_ids)
+            index.remove(stale_ids)
+            if replacements:
+                try:
+                    vectordb.add_documents([doc for _, doc in replacements],
+                                           ids=[new_id for new_id, _ in replacements])
+                except RetryableEmbeddingError:
+                    metrics.count("chunks_failed", len(replacements))
+                    for new_id, doc in replacements:
+                        fail([doc.metadata] + dedup_index.forget(new_id))
+                    replacements = []
+                for new_id, doc in replacements:
+                    index.add(new_id, doc)
+        delta["chunks_written"] += len(replacements)
+        for new_id, metadata in lost:
+            # Nothing to store it from (the kept chunk was already missing, or
+            # the duplicate was recorded without its text): re-chunk its files
+            for lost_metadata in [metadata] + dedup_index.forget(new_id):
+                if lost_metadata.get("source") in files:
+                    files[lost_metadata["source"]]["hash"] = None
+
+    for doc in docs:
+        doc = _to_document(doc)
+        source = doc.metadata.get("source", "")
+        seen.add(source)
+        digest = content_hash(doc.page_content)
+        entry = files.get(source)
+        if entry and entry.get("hash") == digest:
+            delta["unchanged"] += 1
+            continue
+        delta["changed" if entry else "added"].append(source)
+
+        if entry:
+            stale_ids = [chunk_id(source, i) for i in range(entry.get("chunks", 0))]
+            if stale_ids:
+                delete(stale_ids)
+            delta["chunks_deleted"] += len(stale_ids)
+
+        count = 0
+        for chunk in (chunker([doc]) if chunker else [doc]):
+            chunk = _to_document(chunk)
+            chunk.metadata["chunk"] = count
+            doc_id = chunk_id(source, count)
+            count += 1
+            if dedup and _skip_duplicate(dedup_index, doc_id, chunk, delta):
+                continue
+            batch_ids.append(doc_id)
+            batch_docs.append(chunk)
+            if len(batch_docs) >= batch_size:
+                flush()
+        files[source] = {"hash": digest, "chunks": count}
+    flush()
+
+    delta["removed"] = [source for source in files if source not in seen]
+    stale_ids = [
+        chunk_id(source, i)
+        for source in delta["removed"]
+        for i in range(files[source].get("chunks", 0))
+    ]
+    for source in delta["removed"]:
+        del files[source]
+    if stale_ids:
+        delete(stale_ids)
+    delta["chunks_deleted"] += len(stale_ids)
+    for source in delta["failed"]:
+        if source in files:
+            files[source]["hash"] = None  # re-embedded (as changed) on the next sync
+
+    with metrics.span("store"):
+        index.save(persist_path)
+        if dedup_index is not None:
+            dedup_index.save(persist_path)
+        write_manifest(persist_path, manifest)
+    _count_dedup(delta)
+    metrics.count("chunks_deleted", delta["chunks_deleted"])
+    metrics.count("files_unchanged", delta["unchanged"])
+    if delta["added"] or delta["changed"] or delta["removed"] or not store_version(persist_path):
+        bump_store_version(persist_path)
+    return vectordb, delta
@@ -0,0 +1,58 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def fake_backends(tmp_path, monkeypatch):
+    """
+    Runs a test in its own directory with the offline embedding and LLM
+    fakes of the benchmarks in the resource pool. Returns the fake
+    embedding client (for call counts). The pool is emptied afterwards, so
+    no fake (or store opened in the test directory) outlives the test.
+    """
+    from benchmarks.fakes import install_fake_backends
+    from rag_engine.resource_pool import get_resource_pool
+    monkeypatch.chdir(tmp_path)
+    yield install_fake_backends(str(tmp_path))
+    get_resource_pool().invalidate(lambda key: True)
+
+@pytest.fixture
+def http_server():
+    """
+    Starts local HTTP servers: start(respond) serves every GET and POST with
+    respond(request, body) -> (status, body bytes, headers) and returns the
+    server's base URL (no trailing slash). Servers stop after the test.
+    """
+    servers = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            status, body, headers = self.server.respond(self, self.rfile.read(length) if length else b"")
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = _respond
+
+    def start(respond):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.respond = respond
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
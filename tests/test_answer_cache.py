@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+from benchmarks.fakes import ENGINE
+from rag_engine.answer_cache import AnswerCache
+from rag_engine.query_engine import get_llm_chain
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, query):
+        self.calls += 1
+        return [1.0, float(len(query))]
+
+def test_exact_hit_does_not_embed(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"))
+    cache.put("db", "What does it do?", "It helps.", "v1", [1.0, 0.0])
+    embed_calls = []
+    assert cache.get("db", "what does it do", "v1", lambda: embed_calls.append(1)) == ("It helps.", "exact")
+    assert embed_calls == []
+    assert cache.get("db", "what is it for", "v1", lambda: [1.0, 0.0]) == ("It helps.", "semantic")
+
+def test_chain_embeds_only_on_exact_miss(fake_backends, tmp_path):
+    embeddings = CountingEmbeddings()
+    retriever = SimpleNamespace(invoke=lambda query: [])
+    chain = get_llm_chain(SimpleNamespace(embeddings=embeddings), engine=ENGINE, retriever=retriever, db_name="db",
+                          store_version="v1", answer_cache=AnswerCache(str(tmp_path / "answers.sqlite")))
+    first = chain.invoke({"query": "How is it configured?"})
+    assert first["cached"] is None and embeddings.calls == 1
+    second = chain.invoke({"query": "how is it configured"})
+    assert second["cached"] == "exact" and second["result"] == first["result"]
+    assert embeddings.calls == 1
+
+def test_answers_are_cached_per_model(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"))
+    cache.put("db", "What does it do?", "GPT says", "v1", [1.0, 0.0], model="openai:gpt-4")
+    assert cache.get("db", "what does it do", "v1", [1.0, 0.0], model="ollama:llama3") is None
+    assert cache.get("db", "what does it do", "v1", [1.0, 0.0], model="openai:gpt-4") == ("GPT says", "exact")
+
+def test_semantic_tier_sees_new_and_replaced_answers(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"), threshold=0.9)
+    cache.put("db", "first", "one", "v1", [1.0, 0.0, 0.0])
+    assert cache.get("db", "other", "v1", [0.0, 1.0, 0.0]) is None  # loads the matrix
+    cache.put("db", "second", "two", "v1", [0.0, 1.0, 0.0])
+    assert cache.get("db", "near second", "v1", [0.1, 1.0, 0.0]) == ("two", "semantic")
+    cache.put("db", "second", "two again", "v1", [0.0, 0.0, 1.0])
+    assert cache.get("db", "near second", "v1", [0.1, 1.0, 0.0]) is None
+    assert cache.get("db", "near third", "v1", [0.0, 0.1, 1.0]) == ("two again", "semantic")
+    # A new store build drops the old answers and their vectors
+    assert cache.get("db", "near third", "v2", [0.0, 0.1, 1.0]) is None
+
+def test_empty_retrieval_is_not_cached(fake_backends, tmp_path):
+    from rag_engine.query_engine import NO_FILES_MESSAGE
+    retriever = SimpleNamespace(invoke=lambda query: [])
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"))
+    chain = get_llm_chain(SimpleNamespace(embeddings=CountingEmbeddings()), engine=ENGINE, retriever=retriever,
+                          db_name="db", store_version="v1", answer_cache=cache)
+    assert chain.invoke({"query": "what does this repo do"})["result"] == NO_FILES_MESSAGE
+    assert cache.stats()["entries"] == 0
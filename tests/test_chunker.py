@@ -0,0 +1,18 @@
+import os
+from rag_engine.chunker import chunk_config_key
+
+def test_chunk_config_key_follows_nested_files(tmp_path):
+    nested = tmp_path / "src" / "pkg"
+    nested.mkdir(parents=True)
+    (nested / "module.py").write_text("x = 1\n")
+    (tmp_path / "image.png").write_bytes(b"\x89PNG")
+    key = chunk_config_key(str(tmp_path))
+    top_mtime = os.path.getmtime(tmp_path)
+
+    (nested / "module.py").write_text("x = 1\n" * 2000)
+    assert os.path.getmtime(tmp_path) == top_mtime  # what the old cache key missed
+    assert chunk_config_key(str(tmp_path)) != key
+
+    key = chunk_config_key(str(tmp_path))
+    (tmp_path / "image.png").write_bytes(b"\x89PNG changed")
+    assert chunk_config_key(str(tmp_path)) == key
@@ -0,0 +1,77 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from rag_engine.code_splitter import split_code_document, _js_units
+
+FALLBACK = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=0, add_start_index=True)
+
+def _split(source, text, budget=1):
+    return split_code_document(Document(page_content=text, metadata={"source": source}), budget, FALLBACK)
+
+def _spans(chunks):
+    return [(c.metadata["start_line"], c.metadata["end_line"], c.metadata["symbol"]) for c in chunks]
+
+def _js(text):
+    return [tuple(unit) for unit in _js_units(text, text.splitlines(keepends=True))]
+
+@pytest.mark.parametrize("tricky", [
+    "const tpl = `a { ${ {b: `{`}.b } ;\n\nc`;",
+    "const re = /[{(]+\\/{/g;",
+    "const re = (x) => x.replace(/{/, '');",
+    "function f(x) { return /[/{]/.test(x); }",
+    "const nested = { a: { b: [ { c: '{' } ] } };",
+])
+def test_js_braces_in_literals_do_not_end_units(tricky):
+    text = f"{tricky}\nfunction after() {{\n  return 1;\n}}\n"
+    last = tricky.count("\n") + 1
+    assert _js(text)[0][:2] == (1, last)
+    assert _js(text)[1] == (last + 1, last + 3, "after")
+
+def test_js_division_is_not_a_regex():
+    text = "const half = total / 2; const third = total / 3;\nfunction f() {\n  return 1;\n}\n"
+    assert _js(text) == [(1, 1, "half"), (2, 4, "f")]
+
+def test_python_decorators_stay_with_their_function():
+    text = (
+        "import functools\n"
+        "\n"
+        "@functools.lru_cache()\n"
+        "@staticmethod\n"
+        "def cached():\n"
+        "    return 1\n"
+        "\n"
+        "class Thing:\n"
+        "    pass\n"
+    )
+    assert _spans(_split("mod.py", text, budget=12)) == [(1, 2, ""), (3, 6, "cached"), (8, 9, "Thing")]
+
+def test_python_oversized_class_splits_into_methods_and_long_functions_fall_back():
+    body = "".join(f"        value_{i} = {i} * 2\n" for i in range(40))
+    text = f"class Big:\n    def small(self):\n        return 1\n\n    def long(self):\n{body}        return value_0\n"
+    chunks = _split("mod.py", text, budget=60)
+    symbols = [c.metadata["symbol"] for c in chunks]
+    assert symbols[0] == "Big, Big.small"  # class line and small method merged
+    assert set(symbols[1:]) == {"Big.long"} and len(symbols) > 2  # cut by the fallback splitter
+    assert chunks[1].metadata["start_line"] == 5
+    assert chunks[-1].metadata["end_line"] == text.count("\n")
+
+def test_markdown_sections_ignore_headings_in_code_fences():
+    text = (
+        "Intro\n"
+        "# Install\n"
+        "pip install x\n"
+        "```\n"
+        "# not a heading\n"
+        "```\n"
+        "## Usage ##\n"
+        "run it\n"
+    )
+    assert _spans(_split("README.md", text)) == [(1, 1, ""), (2, 6, "Install"), (7, 8, "Usage")]
+
+def test_small_units_merge_up_to_the_budget():
+    text = "def a():\n    return 1\n\ndef b():\n    return 2\n"
+    assert _spans(_split("mod.py", text, budget=100)) == [(1, 5, "a, b")]
+
+def test_unhandled_or_unparseable_files_fall_back():
+    assert _split("notes.txt", "plain text") is None
+    assert _split("broken.py", "def (:\n") is None
@@ -0,0 +1,72 @@
+from langchain_core.documents import Document
+from rag_engine.context import assemble_context, count_tokens
+
+def _words(start, count):
+    # Distinct lowercase identifiers: "aab", "bab", ...
+    return " ".join("".join(chr(97 + (i // 26 ** k) % 26) for k in range(3)) + "x" for i in range(start, start + count))
+
+def _doc(text, source="a.py", **metadata):
+    return Document(page_content=text, metadata={"source": source, **metadata})
+
+def _texts(docs):
+    return [d.page_content for d in docs]
+
+def test_exact_copies_and_contained_chunks_are_dropped():
+    long = _doc(_words(0, 60), "a.py")
+    inside = _doc(_words(10, 40), "b.py")
+    other = _doc(_words(100, 30), "c.py")
+    docs, report = assemble_context([long, _doc(long.page_content, "copy.py"), inside, other])
+    assert _texts(docs) == [long.page_content, other.page_content]
+    assert report["duplicates"] == 2
+
+def test_short_chunks_are_only_dropped_when_identical():
+    long = _doc(_words(0, 60), "a.py")
+    short = _doc(_words(10, 6), "b.py")      # every shingle of it is in the long chunk
+    other_short = _doc(_words(200, 3), "c.py")
+    docs, report = assemble_context([long, short, other_short, _doc(short.page_content, "d.py")])
+    assert _texts(docs) == [long.page_content, short.page_content, other_short.page_content]
+    assert report["duplicates"] == 1
+
+def test_a_chunk_is_not_dropped_for_containing_a_smaller_one():
+    small = _doc(_words(10, 20), "a.py")
+    large = _doc(_words(0, 60), "b.py")
+    docs, _ = assemble_context([small, large])
+    assert _texts(docs) == [small.page_content, large.page_content]
+
+def test_mmr_moves_redundant_chunks_down():
+    first = _doc(_words(0, 30), "a.py")
+    reshuffled = _doc(" ".join(reversed(first.page_content.split())), "b.py")  # same terms, no shared shingles
+    distinct = _doc(_words(100, 30), "c.py")
+    docs, _ = assemble_context([first, reshuffled, distinct])
+    assert _texts(docs) == [first.page_content, distinct.page_content, reshuffled.page_content]
+    docs, _ = assemble_context([first, reshuffled, distinct], mmr_lambda=1.0)
+    assert _texts(docs) == [first.page_content, reshuffled.page_content, distinct.page_content]
+
+def test_neighbouring_chunks_merge_without_their_overlap():
+    head, shared, tail = _words(0, 20), _words(20, 5), _words(40, 20)
+    first = _doc(f"{head} {shared}", chunk=3, start_line=10, end_line=14)
+    second = _doc(f"{shared} {tail}", chunk=4, start_line=14, end_line=20)
+    docs, report = assemble_context([second, first])
+    assert _texts(docs) == [f"{head} {shared} {tail}"]
+    assert (docs[0].metadata["chunk"], docs[0].metadata["chunk_end"]) == (3, 4)
+    assert (docs[0].metadata["start_line"], docs[0].metadata["end_line"]) == (10, 20)
+    assert report["merged"] == 1
+
+def test_only_touching_chunks_of_the_same_file_and_store_merge():
+    first = _doc(_words(0, 20), chunk=0)
+    touching = _doc(_words(40, 20), chunk=1)
+    far = _doc(_words(80, 20), chunk=5)
+    other_store = _doc(_words(120, 20), chunk=1, store="docs")
+    docs, report = assemble_context([first, touching, far, other_store])
+    assert _texts(docs)[0] == f"{first.page_content}\n{touching.page_content}"  # no overlap: joined by a newline
+    assert len(docs) == 3 and report["merged"] == 1
+
+def test_packing_skips_chunks_over_the_budget_and_keeps_smaller_ones():
+    big, large, small = _doc(_words(0, 40), "a.py"), _doc(_words(100, 80), "b.py"), _doc(_words(300, 10), "c.py")
+    cost = {d.metadata["source"]: count_tokens(d.page_content) for d in (big, large, small)}
+    budget = cost["a.py"] + cost["c.py"]
+    docs, report = assemble_context([big, large, small], budget_tokens=budget)
+    assert [d.metadata["source"] for d in docs] == ["a.py", "c.py"]
+    assert report["over_budget"] == 1
+    assert report["tokens_out"] == budget
+    assert report["tokens_saved"] == cost["b.py"]
@@ -0,0 +1,75 @@
+import time
+import pytest
+from rag_engine.crawler import PageCache, crawl_site
+
+PAGES = {
+    "/": '<html><head><title>Home</title></head><body><nav><a href="/nav-only">Menu</a></nav>'
+         '<main>Welcome home. <a href="/guide">Guide</a> <a href="/private/secret">Secret</a> '
+         '<a href="/logo.png">Logo</a></main></body></html>',
+    "/guide": "<html><head><title>Guide</title></head><body><main>Install it with pip.</main>"
+              "<footer>Copyright</footer></body></html>",
+    "/private/secret": "<html><body><main>Do not index.</main></body></html>",
+}
+ROBOTS = "User-agent: *\nDisallow: /private/\n"
+
+class FakeSite:
+    """
+    Small site with robots.txt and ETags that answers conditional GETs
+    with 304 and records when each page was requested.
+    """
+
+    def __init__(self):
+        self.requests = []  # (path, monotonic time, status)
+
+    def respond(self, request, body):
+        if request.path == "/robots.txt":
+            status, body, content_type = 200, ROBOTS, "text/plain"
+        elif request.path in PAGES:
+            status, body, content_type = 200, PAGES[request.path], "text/html"
+        else:
+            status, body, content_type = 404, "", "text/html"
+        etag = f'"{hash(body)}"'
+        if status == 200 and request.headers.get("If-None-Match") == etag:
+            status, body = 304, ""
+        self.requests.append((request.path, time.monotonic(), status))
+        return status, body.encode(), [("Content-Type", content_type), ("ETag", etag)]
+
+    def page_requests(self):
+        return [(path, at, status) for path, at, status in self.requests if path != "/robots.txt"]
+
+@pytest.fixture
+def site(http_server):
+    fake = FakeSite()
+    fake.url = http_server(fake.respond) + "/"
+    return fake
+
+def test_crawl_honours_robots_and_extracts_main_content(site, tmp_path):
+    docs, stats = crawl_site(site.url, host_delay=0, cache=PageCache(str(tmp_path / "pages.sqlite")),
+                             return_stats=True)
+    assert [doc.metadata["source"] for doc in docs] == [site.url, site.url + "guide"]
+    assert stats["skipped_robots"] == 1
+    assert "/private/secret" not in [path for path, _, _ in site.requests]
+    assert "/logo.png" not in [path for path, _, _ in site.requests]
+    guide = docs[1]
+    assert guide.metadata["title"] == "Guide"
+    assert guide.page_content == "Install it with pip."
+
+def test_recrawl_sends_conditional_gets(site, tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    first = crawl_site(site.url, host_delay=0, cache=cache)
+    docs, stats = crawl_site(site.url, host_delay=0, cache=cache, return_stats=True)
+    assert (stats["fetched"], stats["not_modified"]) == (0, 2)
+    assert [doc.page_content for doc in docs] == [doc.page_content for doc in first]
+    statuses = {path: status for path, _, status in site.page_requests()}
+    assert (statuses["/"], statuses["/guide"]) == (304, 304)
+
+def test_requests_to_a_host_are_spaced(site):
+    crawl_site(site.url, host_delay=0.3, concurrency=4, cache=False)
+    times = sorted(at for _, at, _ in site.page_requests())
+    assert len(times) == 3  # home, guide and the 404 linked from the nav
+    assert all(later - earlier >= 0.25 for earlier, later in zip(times, times[1:]))
+
+def test_page_cache_is_shared(tmp_path):
+    from rag_engine.crawler import get_page_cache
+    path = str(tmp_path / "pages.sqlite")
+    assert get_page_cache(path) is get_page_cache(path)
@@ -0,0 +1,120 @@
+import os
+import pytest
+from rag_engine.dedup import DedupIndex
+from rag_engine.vector_store import sync_chroma
+from benchmarks.fakes import ENGINE
+from langchain_core.documents import Document
+
+BODY = " ".join(f"word{i}" for i in range(80))
+
+def _sync(path="store", backend="mmap"):
+    from rag_engine.loader import iter_codebase
+    # Absolute: Chroma caches its client per path string across tests
+    return sync_chroma(iter_codebase("repo", verbose=0), persist_path=os.path.abspath(path), embedding_engine=ENGINE, backend=backend)
+
+def _write(name, text):
+    os.makedirs("repo", exist_ok=True)
+    with open(os.path.join("repo", name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+def _stored(vectordb):
+    found = vectordb.get()
+    return {meta["source"]: text for text, meta in zip(found["documents"], found["metadatas"])}
+
+def test_exact_and_near_duplicates_are_skipped(fake_backends):
+    _write("a.py", BODY + " ORIGINAL_A_TAIL")
+    _write("b.py", BODY + " COPY_B_TAIL")
+    _write("c.py", BODY + " ORIGINAL_A_TAIL")
+    vectordb, delta = _sync()
+    assert delta["chunks_written"] == 1
+    assert (delta["duplicates"], delta["near_duplicates"]) == (1, 1)
+    assert list(_stored(vectordb)) == ["a.py"]
+
+@pytest.mark.parametrize("backend", ["mmap", "chroma"])
+def test_removed_original_hands_over_to_near_duplicate_with_its_own_text(fake_backends, backend):
+    _write("a.py", BODY + " ORIGINAL_A_TAIL")
+    _write("b.py", BODY + " COPY_B_TAIL")
+    _sync(backend=backend)
+    os.remove(os.path.join("repo", "a.py"))
+    vectordb, delta = _sync(backend=backend)
+    stored = _stored(vectordb)
+    assert list(stored) == ["b.py"]
+    assert stored["b.py"].endswith("COPY_B_TAIL")
+    # The next sync has nothing left to fix
+    _, delta = _sync(backend=backend)
+    assert delta["chunks_written"] == 0 and delta["unchanged"] == 1
+
+def test_removed_original_hands_over_to_exact_duplicate(fake_backends):
+    _write("a.py", BODY)
+    _write("b.py", BODY)
+    _write("c.py", BODY + " COPY_C_TAIL")
+    _sync()
+    calls = fake_backends.calls
+    os.remove(os.path.join("repo", "a.py"))
+    vectordb, _ = _sync()
+    assert sorted(_stored(vectordb)) == ["b.py"]
+    assert fake_backends.calls == calls  # same text: the embedding comes from the cache
+    index = DedupIndex.load("store")
+    assert [dup["metadata"]["source"] for entry in index.chunks.values() for dup in entry["duplicates"].values()] == ["c.py"]
+
+def test_legacy_near_duplicate_without_text_is_rechunked():
+    index = DedupIndex()
+    index.match("a", Document(page_content=BODY + " A", metadata={"source": "a.py"}))
+    index.match("b", Document(page_content=BODY + " B", metadata={"source": "b.py"}))
+    del index.chunks["a"]["duplicates"]["b"]["text"]
+    assert index.remove(["a"]) == [("b", None, None, {"source": "b.py"})]
+
+class FailingEmbeddings:
+    """
+    The pooled fake embedding, except that batches with a text containing
+    marker keep failing (as after all retries).
+    """
+
+    def __init__(self, embedding, marker):
+        self.embedding, self.marker = embedding, marker
+
+    def embed_documents(self, texts):
+        from rag_engine.embeddings import RetryableEmbeddingError
+        if self.marker and any(self.marker in text for text in texts):
+            raise RetryableEmbeddingError("still failing")
+        return self.embedding.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embedding.embed_query(text)
+
+@pytest.fixture
+def failing_embeddings(fake_backends):
+    from rag_engine.resource_pool import get_resource_pool
+    key = ("embedding", ENGINE, None, True)
+    embedding = FailingEmbeddings(get_resource_pool().get_or_create(key, None), None)
+    get_resource_pool().put(key, embedding)
+    return embedding
+
+def test_failed_batch_does_not_keep_chunks_for_its_duplicates(failing_embeddings):
+    _write("a.py", BODY + " FAIL")
+    _write("b.py", BODY + " FAIL")
+    failing_embeddings.marker = "FAIL"
+    vectordb, delta = _sync()
+    assert sorted(delta["failed"]) == ["a.py", "b.py"]
+    assert _stored(vectordb) == {}
+    assert DedupIndex.load("store").chunks == {}
+
+    failing_embeddings.marker = None
+    vectordb, delta = _sync()
+    assert sorted(delta["changed"]) == ["a.py", "b.py"] and delta["failed"] == []
+    assert list(_stored(vectordb)) == ["a.py"] and delta["duplicates"] == 1
+
+def test_failed_handover_is_retried_on_the_next_sync(failing_embeddings):
+    _write("a.py", BODY + " ORIGINAL_A_TAIL")
+    _write("b.py", BODY + " COPY_B_TAIL")
+    _sync()
+    os.remove(os.path.join("repo", "a.py"))
+    failing_embeddings.marker = "COPY_B_TAIL"
+    vectordb, delta = _sync()
+    assert delta["removed"] == ["a.py"] and delta["failed"] == ["b.py"]
+    assert _stored(vectordb) == {}
+
+    failing_embeddings.marker = None
+    vectordb, delta = _sync()
+    assert delta["changed"] == ["b.py"]
+    assert _stored(vectordb)["b.py"].endswith("COPY_B_TAIL")
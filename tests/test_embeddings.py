@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import socket
+import hashlib
+import threading
+import pytest
+from rag_engine.embeddings import OpenAIEmbeddingClient, ParallelEmbeddings
+
+def _vector(text):
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    return [b / 255 for b in digest[:8]]
+
+class FakeEmbeddingServer:
+    """
+    Local stand-in for an OpenAI-compatible /embeddings endpoint.
+    - latency: seconds each request takes.
+    - rate_limited: this many requests get 429 with Retry-After first.
+    - fail_marker: requests with an input containing it always get 500.
+    """
+
+    def __init__(self, latency=0.0, rate_limited=0, retry_after=0.2, fail_marker=None):
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.fail_marker = fail_marker
+        self.requests = 0
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def respond(self, request, body):
+        texts = json.loads(body)["input"]
+        with self.lock:
+            self.requests += 1
+            limited = self.rate_limited > 0
+            self.rate_limited -= limited
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if limited:
+                return 429, b"", [("Retry-After", str(self.retry_after))]
+            if self.fail_marker and any(self.fail_marker in t for t in texts):
+                return 500, b"", []
+            # Rows out of order, as the API allows
+            rows = [{"index": i, "embedding": _vector(t)} for i, t in reversed(list(enumerate(texts)))]
+            return 200, json.dumps({"data": rows}).encode(), []
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+@pytest.fixture
+def server(http_server):
+    def start(**kwargs):
+        fake = FakeEmbeddingServer(**kwargs)
+        fake.url = http_server(fake.respond) + "/v1"
+        return fake
+
+    return start
+
+def _embedder(url, **kwargs):
+    client = OpenAIEmbeddingClient(model="fake", api_key="test", base_url=url, timeout=5)
+    return ParallelEmbeddings(client, **kwargs)
+
+def test_rate_limits_are_retried_after_retry_after(server):
+    fake = server(rate_limited=2, retry_after=0.3)
+    embedder = _embedder(fake.url, max_workers=4, max_batch_size=2)
+    texts = [f"text {i}" for i in range(10)]
+    started = time.monotonic()
+    vectors = embedder.embed_documents(texts)
+    assert vectors == [_vector(t) for t in texts]
+    assert embedder.retries == 2
+    assert time.monotonic() - started >= 0.3
+
+def test_batches_run_concurrently(server):
+    fake = server(latency=0.2)
+    embedder = _embedder(fake.url, max_workers=4, max_batch_size=1)
+    started = time.monotonic()
+    embedder.embed_documents([f"text {i}" for i in range(8)])
+    assert fake.max_in_flight == 4
+    assert time.monotonic() - started < 8 * 0.2 / 2
+
+def test_connection_refused_fails_fast():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    embedder = _embedder(f"http://127.0.0.1:{port}/v1")
+    started = time.monotonic()
+    with pytest.raises(ConnectionError):
+        embedder.embed_documents(["text"])
+    assert time.monotonic() - started < 2
+
+def test_failed_batch_is_skipped_and_retried_on_next_sync(server, tmp_path, monkeypatch, request):
+    from benchmarks.fakes import ENGINE
+    from rag_engine.resource_pool import get_resource_pool
+    from rag_engine.loader import iter_codebase
+    from rag_engine.vector_store import sync_chroma
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("repo")
+    for name, text in (("good.py", "def good():\n    return 1\n"), ("bad.py", "def bad():\n    return 'FAIL'\n")):
+        with open(os.path.join("repo", name), "w", encoding="utf-8") as f:
+            f.write(text)
+    fake = server(fail_marker="FAIL")
+    key = ("embedding", ENGINE, None, True)
+    get_resource_pool().put(key, _embedder(fake.url, max_retries=1, backoff=0.01))
+    request.addfinalizer(lambda: get_resource_pool().invalidate(key))
+
+    def sync():
+        return sync_chroma(iter_codebase("repo", verbose=0), persist_path=os.path.abspath("store"),
+                           embedding_engine=ENGINE, backend="mmap", batch_size=1)
+
+    vectordb, delta = sync()
+    assert delta["failed"] == ["bad.py"]
+    assert [m["source"] for m in vectordb.get()["metadatas"]] == ["good.py"]
+
+    fake.fail_marker = None
+    vectordb, delta = sync()
+    assert (delta["changed"], delta["failed"]) == (["bad.py"], [])
+    assert sorted(m["source"] for m in vectordb.get()["metadatas"]) == ["bad.py", "good.py"]
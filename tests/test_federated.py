@@ -0,0 +1,112 @@
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from langchain_core.documents import Document
+from rag_engine import federated
+from rag_engine.federated import FederatedRetriever
+
+class SlowRetriever:
+    def __init__(self, name, delay, score=0.5):
+        self.name, self.delay, self.score = name, delay, score
+        self.calls = 0
+
+    def scored(self, query):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [(Document(page_content=f"{self.name} answer", metadata={"source": f"{self.name}.py"}), self.score)]
+
+@pytest.fixture
+def workers(monkeypatch):
+    executors = []
+
+    def use(count):
+        executors.append(ThreadPoolExecutor(max_workers=count))
+        monkeypatch.setattr(federated, "_executor", executors[-1])
+
+    yield use
+    for executor in executors:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _federated(retrievers, timeout):
+    return FederatedRetriever(stores=[{"label": r.name, "retriever": r} for r in retrievers], k=10, timeout=timeout)
+
+def test_timeout_counts_from_when_a_store_starts(workers):
+    workers(1)
+    # "c" finishes 0.36 s after the query starts: past its timeout, but only
+    # 0.12 s after it started running
+    stores = [SlowRetriever(name, 0.12) for name in ("a", "b", "c")]
+    docs = _federated(stores, timeout=0.3).invoke("question")
+    assert sorted(doc.metadata["store"] for doc in docs) == ["a", "b", "c"]
+
+def test_hung_store_is_left_out_and_queued_ones_cancelled(workers):
+    workers(1)
+    hung, queued = SlowRetriever("hung", 1.0), SlowRetriever("queued", 0.0)
+    started = time.monotonic()
+    assert _federated([hung, queued], timeout=0.2).invoke("question") == []
+    assert time.monotonic() - started < 0.6
+    time.sleep(1.0)
+    assert queued.calls == 0
+
+def test_results_merge_by_score(workers):
+    workers(4)
+    stores = [SlowRetriever("low", 0.0, score=0.2), SlowRetriever("high", 0.05, score=0.9),
+              SlowRetriever("slow", 1.0, score=1.0)]
+    docs = _federated(stores, timeout=0.3).invoke("question")
+    assert [doc.metadata["store"] for doc in docs] == ["high", "low"]
+
+class StubVectorStore:
+    """
+    Vector side of a store with fixed cosine similarities per chunk.
+    """
+
+    def __init__(self, texts, relevance):
+        self.texts, self.relevance = texts, relevance
+        self.embeddings = SimpleNamespace(embed_query=lambda query: [1.0])
+
+    def _doc(self, chunk_id):
+        return Document(id=chunk_id, page_content=self.texts[chunk_id], metadata={"source": f"{chunk_id}.py"})
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        ranked = sorted(self.relevance, key=lambda cid: -self.relevance[cid])[:k]
+        return [(self._doc(cid), self.relevance[cid]) for cid in ranked]
+
+    def get(self, ids):
+        return {"ids": ids, "documents": [self.texts[cid] for cid in ids],
+                "metadatas": [{"source": f"{cid}.py"} for cid in ids]}
+
+def test_hybrid_scores_are_cosine_similarity():
+    from rag_engine.lexical_index import HybridRetriever, LexicalIndex
+    texts = {"a": "parse the invoice totals", "b": "render the invoice page", "c": "unrelated words here",
+             "d": "invoice invoice invoice"}
+    index = LexicalIndex()
+    for chunk_id, text in texts.items():
+        index.add(chunk_id, Document(page_content=text, metadata={"source": f"{chunk_id}.py"}))
+    vectordb = StubVectorStore(texts, {"a": 0.82, "b": 0.64, "c": 0.31})
+    retriever = HybridRetriever(vectordb=vectordb, index=index, k=4)
+    scored = {doc.id: score for doc, score in retriever.scored("invoice")}
+    assert (scored["a"], scored["b"], scored["c"]) == (0.82, 0.64, 0.31)
+    assert scored["d"] == 0.31  # BM25 only: no better than the weakest vector hit
+
+def test_merge_across_backends_ranks_by_cosine(fake_backends, tmp_path):
+    import numpy as np
+    from benchmarks.fakes import ENGINE
+    from rag_engine.vector_store import load_chroma
+    texts = {
+        "chroma": ["retry the request with backoff", "render the settings page", "parse invoice totals"],
+        "mmap": ["retry failed uploads later", "draw the login form", "sum the ledger rows"],
+    }
+    stores = []
+    for backend, store_texts in texts.items():
+        vectordb = load_chroma(str(tmp_path / backend), embedding_engine=ENGINE, backend=backend)
+        vectordb.add_texts(store_texts, metadatas=[{"source": f"{backend}/{i}.md"} for i in range(3)],
+                           ids=[f"{backend}-{i}" for i in range(3)])
+        stores.append({"label": backend, "retriever": vectordb.as_retriever()})
+    query = "retry the request"
+    docs = FederatedRetriever(stores=stores, k=6).invoke(query)
+
+    vectors = np.asarray(fake_backends.embed([query] + [doc.page_content for doc in docs]))
+    cosines = vectors[1:] @ vectors[0]
+    assert len(docs) == 6
+    assert list(cosines) == sorted(cosines, reverse=True)
+    assert {doc.metadata["store"] for doc in docs[:3]} == {"chroma", "mmap"}
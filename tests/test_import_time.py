@@ -0,0 +1,9 @@
+import pytest
+from benchmarks.import_time import DEFAULT_BUDGET_MS, measure, targets
+
+@pytest.mark.parametrize("name", sorted(targets()))
+def test_import_time_within_budget(name):
+    result = measure(targets()[name], repeat=3)
+    slowest = ", ".join(f"{row['module']} {row['ms']} ms" for row in result["slowest"])
+    assert not result["heavy"], f"heavy modules imported at startup: {', '.join(result['heavy'])}"
+    assert result["median_ms"] <= DEFAULT_BUDGET_MS, f"{result['median_ms']} ms median; slowest: {slowest}"
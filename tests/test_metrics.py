@@ -0,0 +1,34 @@
+import socket
+import urllib.request
+import pytest
+from rag_engine import metrics
+
+@pytest.fixture
+def fresh_server(monkeypatch):
+    monkeypatch.setattr(metrics, "_server", None)
+    monkeypatch.setattr(metrics, "_server_failed", set())
+    yield
+    if metrics._server is not None:
+        metrics._server.shutdown()
+        metrics._server.server_close()
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_server_binds_localhost_by_default(fresh_server):
+    server = metrics.start_metrics_server(port=_free_port())
+    assert server.server_address[0] == "127.0.0.1"
+    assert metrics.start_metrics_server(port=server.server_address[1]) is server
+    with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics.json") as response:
+        assert response.status == 200
+
+def test_taken_port_warns_instead_of_failing(fresh_server, caplog):
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        assert metrics.start_metrics_server(port=port) is None
+        assert metrics.start_metrics_server(port=port) is None
+    assert len([r for r in caplog.records if "Metrics server not started" in r.getMessage()]) == 1
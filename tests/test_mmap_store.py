@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from rag_engine import mmap_store
+from rag_engine.mmap_store import MmapVectorStore, DTYPES
+
+ROWS, DIM, K = 2000, 64, 10
+
+def _unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+@pytest.fixture(scope="module")
+def data():
+    """
+    Clustered unit vectors (like embeddings of a codebase: many close
+    neighbours) and queries near the clusters.
+    """
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((20, DIM))
+    vectors = _unit(centers[rng.integers(0, 20, ROWS)] + 0.5 * rng.standard_normal((ROWS, DIM)))
+    queries = _unit(centers[rng.integers(0, 20, 50)] + 0.5 * rng.standard_normal((50, DIM)))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+def _store(path, vectors, dtype, rerank=False):
+    store = MmapVectorStore(str(path), None, dtype=dtype, rerank=rerank)
+    store.add_embeddings([str(i) for i in range(len(vectors))], vectors, ids=[f"c{i}" for i in range(len(vectors))])
+    return store
+
+def _search(store, query, k=K):
+    return [(int(doc.page_content), score) for doc, score in store.similarity_search_by_vector_with_score(query, k)]
+
+@pytest.mark.parametrize("dtype, rerank, min_recall", [
+    ("float32", False, 1.0),
+    ("float16", False, 0.98),
+    ("int8", False, 0.9),
+    ("float16", True, 1.0),
+    ("int8", True, 1.0),
+])
+def test_top_k_recall_against_exact_float32_search(tmp_path, monkeypatch, data, dtype, rerank, min_recall):
+    monkeypatch.setattr(mmap_store, "SCAN_BYTES", 4 * DIM * 100)  # score in several blocks
+    vectors, queries = data
+    store = _store(tmp_path, vectors, dtype, rerank)
+    recalls = []
+    for query in queries:
+        exact = set(np.argsort(-(vectors @ query))[:K].tolist())
+        found = _search(store, query)
+        assert len(found) == K
+        assert [score for _, score in found] == sorted((score for _, score in found), reverse=True)
+        recalls.append(len(exact & {row for row, _ in found}) / K)
+        # Scores are cosine: exact after re-ranking, within quantization error otherwise
+        tolerance = 1e-5 if rerank or dtype == "float32" else 1e-2
+        assert all(abs(score - float(vectors[row] @ query)) < tolerance for row, score in found)
+    assert np.mean(recalls) >= min_recall
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_deleted_rows_are_never_returned(tmp_path, data, dtype):
+    vectors, queries = data
+    store = _store(tmp_path, vectors[:200], dtype, rerank=True)
+    deleted = {row for query in queries[:5] for row, _ in _search(store, query, 3)}
+    store.delete(ids=[f"c{row}" for row in deleted])
+    assert store.count() == 200 - len(deleted) and store.row_count() == 200
+    for query in queries[:5]:
+        assert not deleted & {row for row, _ in _search(store, query)}
+        # Asking for more than is left returns only live rows
+        assert {row for row, _ in _search(store, query, 500)} == set(range(200)) - deleted
+    store.compact()
+    assert store.row_count() == store.count() == 200 - len(deleted)
+    assert not deleted & {row for row, _ in _search(store, queries[0], 500)}
+
+def test_store_persists_and_reopens(tmp_path, data):
+    vectors, queries = data
+    store = _store(tmp_path, vectors[:300], "int8", rerank=True)
+    store.delete(ids=["c0", "c1"])
+    store.add_embeddings(["5"], vectors[7:8], ids=["c5"])  # upsert in place
+    expected = [_search(store, query) for query in queries[:5]]
+
+    reopened = MmapVectorStore(str(tmp_path), None, dtype="float32", rerank=False)
+    assert reopened._meta["dtype"] == "int8" and reopened._meta["rerank"]  # fixed at creation
+    assert reopened.count() == 298 and reopened.row_count() == 300
+    assert [_search(reopened, query) for query in queries[:5]] == expected
+    assert reopened.get(ids=["c0", "c5"])["documents"] == ["5"]
+
+    reopened.compact()
+    again = MmapVectorStore(str(tmp_path), None)
+    assert again.row_count() == 298
+    assert [_search(again, query) for query in queries[:5]] == expected
@@ -0,0 +1,30 @@
+import pytest
+from rag_engine.lexical_index import LexicalIndex, query_identifiers
+from rag_engine.query_engine import is_summary_query
+from langchain_core.documents import Document
+
+@pytest.mark.parametrize("query", [
+    "What does this repo do?", "Summarize the README", "Describe this repository",
+    "what is the project about", "give me an overview of this codebase", "give me a project overview",
+    "overview of the project", "what's in this repo", "summary of the README",
+])
+def test_overview_questions_are_summary_queries(query):
+    assert is_summary_query(query)
+
+@pytest.mark.parametrize("query", [
+    "where is clone_github_repo defined", "what does the report module export",
+    "how are projections computed", "which repos does the crawler skip",
+    "overview of the retry logic in the project", "give me an overview of the retry logic",
+    "how does caching work in this codebase",
+])
+def test_specific_questions_are_not_summary_queries(query):
+    assert not is_summary_query(query)
+
+def test_named_symbol_is_not_a_summary_query():
+    index = LexicalIndex()
+    index.add("c1", Document(page_content="def project_summary():\n    return 1\n", metadata={"source": "app.py"}))
+    assert is_summary_query("what does project_summary do for the project")
+    assert not is_summary_query("what does project_summary do for the project", index)
+
+def test_called_names_are_identifiers():
+    assert query_identifiers("what does load() return for `Store.get`") == {"load", "Store", "get"}
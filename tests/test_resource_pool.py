@@ -0,0 +1,31 @@
+from rag_engine.resource_pool import ResourcePool
+
+STORE = ("store", "chroma_store/a", "openai")
+CHAIN = ("chain", "chroma_store/a", "openai", "openai", "v1")
+
+def test_evicting_a_store_drops_its_chains():
+    pool = ResourcePool(max_items=10, max_bytes=1000)
+    pool.put(STORE, "store", 600)
+    pool.get_or_create(CHAIN, lambda: "chain", depends_on=[STORE])
+    pool.put(("store", "chroma_store/b", "openai"), "other", 600)
+    assert pool.stats()["items"] == 1
+    assert pool.stats()["evictions"] == 2
+    assert pool.get_or_create(CHAIN, lambda: "rebuilt", depends_on=[STORE]) == "rebuilt"
+
+def test_replacing_or_invalidating_a_store_drops_its_chains():
+    pool = ResourcePool()
+    pool.put(STORE, "store", 10)
+    pool.put(CHAIN, "chain", depends_on=[STORE])
+    pool.put(STORE, "reindexed", 10)
+    assert pool.get_or_create(CHAIN, lambda: "rebuilt", depends_on=[STORE]) == "rebuilt"
+    pool.invalidate(STORE)
+    assert pool.stats()["items"] == 0
+    assert pool.stats()["bytes"] == 0
+
+def test_dropping_a_chain_keeps_its_store():
+    pool = ResourcePool()
+    pool.put(STORE, "store", 10)
+    pool.put(CHAIN, "chain", depends_on=[STORE])
+    pool.invalidate(CHAIN)
+    assert pool.get_or_create(STORE, lambda: "reloaded") == "store"
+    assert pool.stats()["bytes"] == 10
@@ -0,0 +1,33 @@
+import os
+import json
+from rag_engine import store_manager
+from rag_engine.store_manager import STORE_INFO_FILE, list_stores, prune, usage
+
+def _store(root, name, size, info=None):
+    path = os.path.join(root, name)
+    os.makedirs(path)
+    with open(os.path.join(path, "data.bin"), "wb") as f:
+        f.write(b"x" * size)
+    if info is not None:
+        with open(os.path.join(path, STORE_INFO_FILE), "w", encoding="utf-8") as f:
+            json.dump(info, f)
+    return path
+
+def test_listing_uses_recorded_sizes(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    _store(root, "recorded", 10, {"size_bytes": 5000, "last_access": 2})
+    _store(root, "legacy", 700)
+    walked = []
+    real_size = store_manager.directory_size
+    monkeypatch.setattr(store_manager, "directory_size", lambda path: walked.append(path) or real_size(path))
+    sizes = {s["name"]: s["size_bytes"] for s in list_stores(root)}
+    assert sizes == {"recorded": 5000, "legacy": 700}
+    assert [os.path.basename(p) for p in walked] == ["legacy"]
+
+def test_quota_is_in_decimal_megabytes(tmp_path):
+    root = str(tmp_path)
+    _store(root, "old", 0, {"size_bytes": 1_200_000, "last_access": 1})
+    _store(root, "new", 0, {"size_bytes": 600_000, "last_access": 2})
+    assert usage(root, quota_mb=2) == {"stores": 2, "size_bytes": 1_800_000, "quota_bytes": 2_000_000}
+    assert prune(root, quota_mb=2, min_idle=0, dry_run=True) == []
+    assert [s["name"] for s in prune(root, quota_mb=1, min_idle=0, dry_run=True)] == ["old"]
@@ -0,0 +1,14 @@
+import os
+import time
+from rag_engine.summarizer import _save_summary_tree, load_summary_tree, summary_version
+
+def test_summary_version_changes_with_each_build(tmp_path):
+    store = str(tmp_path)
+    assert summary_version(store) == ""
+    _save_summary_tree(store, {"files": {}, "dirs": {}, "repo": "First."})
+    first = summary_version(store)
+    assert first
+    time.sleep(0.01)
+    _save_summary_tree(store, {"files": {}, "dirs": {}, "repo": "Second."})
+    assert summary_version(store) not in ("", first)
+    assert load_summary_tree(store)["repo"] == "Second."
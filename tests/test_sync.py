@@ -0,0 +1,58 @@
+import os
+import pytest
+from rag_engine.chunker import chunk_repo_texts
+from rag_engine.vector_store import sync_chroma, read_manifest, chunk_id
+from benchmarks.fakes import ENGINE
+
+def _chunker(docs):
+    return chunk_repo_texts(docs, chunk_size=120, overlap=0)
+
+def _sync(path, backend, reset=False):
+    from rag_engine.loader import iter_codebase
+    # Absolute: Chroma caches its client per path string across tests
+    return sync_chroma(iter_codebase("repo", verbose=0), persist_path=os.path.abspath(path),
+                       embedding_engine=ENGINE, chunker=_chunker, reset=reset, backend=backend)
+
+def _write(name, words):
+    os.makedirs("repo", exist_ok=True)
+    with open(os.path.join("repo", name), "w", encoding="utf-8") as f:
+        f.write(" ".join(f"{name.split('.')[0]}_{i}" for i in range(words)) + "\n")
+
+def _contents(vectordb):
+    found = vectordb.get()
+    return {i: (text, meta["source"], meta["chunk"])
+            for i, text, meta in zip(found["ids"], found["documents"], found["metadatas"])}
+
+@pytest.mark.parametrize("backend", ["mmap", "chroma"])
+def test_sync_applies_only_the_delta_and_matches_a_full_rebuild(fake_backends, backend, monkeypatch):
+    _write("edited.py", 60)
+    _write("removed.py", 30)
+    _write("kept.py", 30)
+    _, delta = _sync("store", backend)
+    assert sorted(delta["added"]) == ["edited.py", "kept.py", "removed.py"]
+    before = {source: entry["chunks"] for source, entry in read_manifest(os.path.abspath("store"))["files"].items()}
+    assert before["edited.py"] > 1
+
+    _write("edited.py", 10)  # shrinks to one chunk: the others must go
+    os.remove(os.path.join("repo", "removed.py"))
+    _write("added.py", 30)
+    embedded, embed = [], fake_backends.embed
+    monkeypatch.setattr(fake_backends, "embed", lambda texts: embedded.extend(texts) or embed(texts))
+    vectordb, delta = _sync("store", backend)
+    assert (delta["added"], delta["changed"], delta["removed"]) == (["added.py"], ["edited.py"], ["removed.py"])
+    assert delta["unchanged"] == 1 and delta["failed"] == []
+    assert delta["chunks_deleted"] == before["edited.py"] + before["removed.py"]
+    after = {source: entry["chunks"] for source, entry in read_manifest(os.path.abspath("store"))["files"].items()}
+    assert after["edited.py"] == 1 and after["kept.py"] == before["kept.py"]
+    assert delta["chunks_written"] == len(embedded) == after["added.py"] + 1
+    assert not any("kept_" in text for text in embedded)
+
+    stored = _contents(vectordb)
+    assert chunk_id("edited.py", 1) not in stored
+    assert not any(source == "removed.py" for _, source, _ in stored.values())
+    rebuilt, _ = _sync("rebuilt", backend)
+    assert stored == _contents(rebuilt)
+    assert read_manifest(os.path.abspath("store")) == read_manifest(os.path.abspath("rebuilt"))
+
+    _, delta = _sync("store", backend)
+    assert delta["unchanged"] == 3 and delta["chunks_written"] == delta["chunks_deleted"] == 0
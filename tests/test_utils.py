@@ -0,0 +1,99 @@
+import io
+import json
+import zipfile
+import pytest
+from rag_engine import utils
+from rag_engine.utils import SOURCE_MARKER, clone_github_repo
+
+REPO_URL = "https://github.com/octo/demo"
+FILES = {
+    "demo-abc/README.md": "# Demo",
+    "demo-abc/src/app.py": "print('hi')",
+    "demo-abc/src/logo.png": "binary",
+    "demo-abc/node_modules/lib/index.js": "module.exports = 1",
+    "demo-abc/../escape.py": "print('no')",
+}
+
+def _archive():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, text in FILES.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+class FakeGitHub:
+    """
+    Serves the repo API (default branch, head commit with ETag/304) and the
+    archive of one commit, recording every request path.
+    """
+
+    def __init__(self):
+        self.sha = "abc123"
+        self.requests = []
+
+    def respond(self, request, body):
+        self.requests.append(request.path)
+        etag = f'"{self.sha}"'
+        if request.path == "/repos/octo/demo":
+            return 200, json.dumps({"default_branch": "main"}).encode(), []
+        if request.path == "/repos/octo/demo/commits/main":
+            if request.headers.get("If-None-Match") == etag:
+                return 304, b"", []
+            return 200, self.sha.encode(), [("ETag", etag)]
+        if request.path == f"/octo/demo/archive/{self.sha}.zip":
+            return 200, _archive(), []
+        return 404, b"", []
+
+@pytest.fixture
+def github(http_server):
+    fake = FakeGitHub()
+    fake.url = http_server(fake.respond)
+    return fake
+
+def _clone(github, dest, refresh=False):
+    return clone_github_repo(REPO_URL, dest_folder=str(dest), exclude_dirs=["node_modules"],
+                             api_base=github.url, archive_base=f"{github.url}/octo/demo", refresh=refresh)
+
+def test_clone_extracts_indexable_members_and_writes_marker(github, tmp_path):
+    dest = tmp_path / "clone"
+    _clone(github, dest)
+    extracted = sorted(str(p.relative_to(dest)) for p in dest.rglob("*") if p.is_file())
+    assert extracted == [SOURCE_MARKER, "README.md", "src/app.py"]
+    marker = json.loads((dest / SOURCE_MARKER).read_text())
+    assert (marker["url"], marker["branch"], marker["sha"], marker["etag"]) == (REPO_URL, "main", "abc123", '"abc123"')
+    assert marker["exclude_dirs"] == ["node_modules"]
+
+def test_fresh_marker_skips_the_api(github, tmp_path):
+    dest = tmp_path / "clone"
+    _clone(github, dest)
+    github.requests.clear()
+    _clone(github, dest)
+    assert github.requests == []
+
+def test_stale_marker_costs_one_conditional_request(github, tmp_path, monkeypatch):
+    dest = tmp_path / "clone"
+    _clone(github, dest)
+    monkeypatch.setattr(utils, "REPO_CHECK_TTL", 0)
+    github.requests.clear()
+    (dest / "README.md").write_text("local edit")
+    _clone(github, dest)
+    assert github.requests == ["/repos/octo/demo/commits/main"]  # answered with 304
+    assert (dest / "README.md").read_text() == "local edit"
+
+    github.sha = "def456"
+    github.requests.clear()
+    _clone(github, dest)
+    assert github.requests == ["/repos/octo/demo/commits/main", "/octo/demo/archive/def456.zip"]
+    assert (dest / "README.md").read_text() == "# Demo"
+    assert json.loads((dest / SOURCE_MARKER).read_text())["sha"] == "def456"
+
+def test_refresh_checks_upstream_within_the_ttl(github, tmp_path):
+    dest = tmp_path / "clone"
+    _clone(github, dest)
+    github.sha = "def456"
+    github.requests.clear()
+    _clone(github, dest)
+    assert github.requests == []  # fresh marker: the new commit isn't seen yet
+    _clone(github, dest, refresh=True)
+    assert github.requests == ["/repos/octo/demo/commits/main", "/octo/demo/archive/def456.zip"]
+    assert json.loads((dest / SOURCE_MARKER).read_text())["sha"] == "def456"